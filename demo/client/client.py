@@ -11,6 +11,12 @@ import openai
 import ffmpeg
 import time
 import subprocess
+import sys
+import wave
+
+# 서버와 같은 음성 인식 캐시를 사용
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "server"))
+from transcription_cache import TranscriptionCache, cache_entry, pcm_key
 
 # Constants
 API_BASE_URL = "http://localhost:5000/api"
@@ -142,34 +148,61 @@ class SessionManager:
             return None
     
     def get_sessions(self):
-        """사용자의 모든 세션을 가져옵니다."""
+        """사용자의 모든 세션을 가져옵니다 (X-Next-Cursor가 없을 때까지 페이지를 이어서 요청)."""
+        try:
+            sessions_data = []
+            cursor = None
+            while True:
+                params = {"limit": 100}
+                if cursor:
+                    params["cursor"] = cursor
+                response = requests.get(
+                    f"{API_BASE_URL}/sessions",
+                    params=params,
+                    headers=st.session_state.user_manager._get_auth_headers()
+                )
+
+                if response.status_code != 200:
+                    print(f"Failed to get sessions: {response.status_code}")
+                    return []
+                sessions_data.extend(response.json())
+                cursor = response.headers.get("X-Next-Cursor")
+                if not cursor:
+                    break
+
+            st.session_state.sessions = [
+                Session(
+                    session_id=session["session_id"],
+                    conversation_history=session.get("conversation_history", []),
+                    generated_complaint=session.get("generated_content"),
+                    rating=session.get("rating"),
+                    feedback=session.get("feedback"),
+                    timestamp=session.get("created_at")
+                )
+                for session in sessions_data
+            ]
+            return st.session_state.sessions
+        except Exception as e:
+            print(f"Error getting sessions: {str(e)}")
+            return []
+    
+    def get_session_detail(self, session_id):
+        """세션 목록에는 요약만 포함되므로 소장 본문을 별도로 가져옵니다."""
         try:
             response = requests.get(
-                f"{API_BASE_URL}/sessions",
+                f"{API_BASE_URL}/sessions/{session_id}",
                 headers=st.session_state.user_manager._get_auth_headers()
             )
-            
+
             if response.status_code == 200:
-                sessions_data = response.json()
-                st.session_state.sessions = [
-                    Session(
-                        session_id=session["session_id"],
-                        conversation_history=session.get("conversation_history", []),
-                        generated_complaint=session.get("generated_content"),
-                        rating=session.get("rating"),
-                        feedback=session.get("feedback"),
-                        timestamp=session.get("timestamp")
-                    )
-                    for session in sessions_data
-                ]
-                return st.session_state.sessions
+                return response.json()
             else:
-                print(f"Failed to get sessions: {response.status_code}")
-                return []
+                print(f"Failed to get session detail: {response.status_code}")
+                return None
         except Exception as e:
-            print(f"Error getting sessions: {str(e)}")
-            return []
-    
+            print(f"Error getting session detail: {str(e)}")
+            return None
+
     def update_session(self, session_id, rating=None, feedback=None):
         """세션을 업데이트합니다."""
         if not session_id:
@@ -266,6 +299,15 @@ class AudioTranscriber:
             print(f"음성 인식 중 오류 발생: {str(e)}")
             return None
 
+@st.cache_resource
+def get_transcription_cache():
+    """프로세스에서 공유하는 음성 인식 캐시를 반환합니다."""
+    try:
+        return TranscriptionCache()
+    except Exception as e:
+        print(f"음성 인식 캐시 초기화 실패: {str(e)}")
+        return None
+
 def process_audio_file(audio_file):
     """오디오 파일을 처리하고 텍스트로 변환합니다."""
     try:
@@ -307,11 +349,20 @@ def process_audio_file(audio_file):
                 print(f"FFmpeg 오류: {stderr.decode()}")
                 raise Exception("오디오 변환 실패")
             
+            # 서버와 같은 16kHz mono PCM으로 캐시 조회
+            with wave.open(output_path, "rb") as wav_file:
+                cache_key = pcm_key(wav_file.readframes(wav_file.getnframes()), "api", "ko")
+            cache = get_transcription_cache()
+            cached = cache.get(cache_key) if cache else None
+            if cached is not None:
+                return cached["text"]
+
             # 변환된 파일로 Whisper API 호출
-            with open(output_path, "rb") as audio_file:
-                transcriber = AudioTranscriber()
-                transcribed_text = transcriber.transcribe_audio(output_path)
-                
+            transcriber = AudioTranscriber()
+            transcribed_text = transcriber.transcribe_audio(output_path)
+            if cache and transcribed_text:
+                cache.put(cache_key, cache_entry(transcribed_text, "api"))
+
             return transcribed_text
             
         finally:
@@ -706,6 +757,12 @@ def display_sessions():
                 else:
                     st.write("시스템: " + message["content"])
             
+            # 목록에는 본문이 없으므로 필요할 때 상세 조회
+            if not session.generated_complaint and st.button("소장 불러오기", key=f"load_{session.session_id}"):
+                detail = st.session_state.session_manager.get_session_detail(session.session_id)
+                if detail:
+                    session.generated_complaint = detail.get("complaint")
+
             # 생성된 소장이 있는 경우 표시
             if session.generated_complaint:
                 st.write("생성된 소장:")
@@ -176,21 +176,33 @@ function updateRatingUI(rating) {
     }
 }
 
-// 세션 목록 로드
+// 세션 목록 로드 (X-Next-Cursor가 없을 때까지 페이지를 이어서 요청)
 async function loadSessions() {
     try {
-        const response = await fetch(`${API_BASE_URL}/sessions`, {
-            headers: {
-                'Authorization': `Bearer ${localStorage.getItem('token')}`
+        const sessions = [];
+        let cursor = null;
+        do {
+            const params = new URLSearchParams({ limit: 100 });
+            if (cursor) params.set('cursor', cursor);
+            const response = await fetch(`${API_BASE_URL}/sessions?${params}`, {
+                headers: {
+                    'Authorization': `Bearer ${localStorage.getItem('token')}`
+                }
+            });
+
+            if (response.status === 401) {
+                logout();
+                return;
             }
-        });
-        
-        if (response.ok) {
-            const sessions = await response.json();
-            displaySessions(sessions);
-        } else if (response.status === 401) {
-            logout();
-        }
+            if (!response.ok) {
+                console.error('세션 로드 실패:', response.status);
+                return;
+            }
+            sessions.push(...await response.json());
+            cursor = response.headers.get('X-Next-Cursor');
+        } while (cursor);
+
+        displaySessions(sessions);
     } catch (error) {
         console.error('세션 로드 중 오류:', error);
     }
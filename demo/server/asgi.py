@@ -0,0 +1,324 @@
+"""
+API 서버의 ASGI 진입점입니다.
+
+    gunicorn -c gunicorn.conf.py asgi:app
+
+소장 생성(/api/generate-complaint)과 세션(/api/sessions) 라우트는 AsyncOpenAI와
+AsyncMongoDBManager를 사용하는 비동기 핸들러로 처리하여, 워커 하나가 여러 OpenAI/Mongo
+호출을 동시에 기다릴 수 있습니다. 나머지 /api/* 라우트는 기존 Flask 앱(server.app)을
+스레드 풀에서 실행합니다.
+
+WebSocket 라우트(/api/ws/*)는 Flask 서버와 같은 처리 함수(run_complaint_socket,
+run_transcribe_socket)를 별도 스레드 풀(WS_THREADS)에서 실행합니다.
+"""
+import asyncio
+import contextlib
+import functools
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import openai
+from asgiref.sync import sync_to_async
+from asgiref.wsgi import WsgiToAsgi, WsgiToAsgiInstance
+from starlette.applications import Starlette
+from starlette.middleware import Middleware
+from starlette.middleware.cors import CORSMiddleware
+from starlette.responses import JSONResponse
+from starlette.routing import Mount, Route, WebSocketRoute
+from starlette.websockets import WebSocketState
+
+import server
+from async_db import get_async_mongodb_manager
+from server import (CORS_ORIGINS, JobQueueFull, authenticate_bearer, run_complaint_socket, run_transcribe_socket,
+                    services, session_detail, session_detail_query)
+
+
+class FlaskJSONResponse(JSONResponse):
+    """Flask의 jsonify와 같은 형식(날짜 표기, 키 정렬)으로 직렬화합니다."""
+
+    def render(self, content) -> bytes:
+        return server.app.json.dumps(content).encode("utf-8")
+
+
+def error_response(message: str, status_code: int) -> FlaskJSONResponse:
+    return FlaskJSONResponse({"error": message}, status_code=status_code)
+
+
+async def read_json(request):
+    """요청 본문을 JSON으로 읽습니다. 본문이 없거나 JSON이 아니면 None을 반환합니다."""
+    try:
+        return await request.json()
+    except ValueError:
+        return None
+
+
+def jwt_required(func):
+    """server.jwt_required()의 ASGI 버전입니다. 사용자 정보를 request.state에 설정합니다."""
+    @functools.wraps(func)
+    async def decorated_function(request):
+        payload, error = authenticate_bearer(request.headers.get('Authorization'))
+        if error == 'missing':
+            return error_response('인증이 필요합니다.', 401)
+        if error:
+            return error_response('유효하지 않은 토큰입니다.', 401)
+
+        request.state.user_id = payload['user_id']
+        request.state.user_role = payload.get('role', 'user')
+        request.state.user_level = payload.get('level', 1)
+        return await func(request)
+    return decorated_function
+
+
+@jwt_required
+async def get_sessions(request):
+    """사용자의 세션 요약 목록을 페이지 단위로 반환합니다 (?limit=, ?cursor=)."""
+    try:
+        limit = min(max(int(request.query_params.get('limit', 20)), 1), 100)
+        sessions, next_cursor = await get_async_mongodb_manager().get_user_sessions(
+            request.state.user_id,
+            limit=limit,
+            cursor=request.query_params.get('cursor')
+        )
+        response = FlaskJSONResponse(sessions)
+        if next_cursor:
+            response.headers['X-Next-Cursor'] = next_cursor
+        return response
+    except ValueError as ve:
+        return error_response(str(ve), 400)
+    except Exception as e:
+        return error_response(str(e), 500)
+
+
+@jwt_required
+async def create_session(request):
+    """새 세션을 생성합니다."""
+    try:
+        data = await read_json(request)
+        consultation_text = data.get('consultation_text')
+        generated_content = data.get('generated_content')
+
+        if not all([consultation_text, generated_content]):
+            return error_response("필 필드가 누락되었습니다.", 400)
+
+        session_id = await get_async_mongodb_manager().save_session(
+            request.state.user_id,
+            consultation_text,
+            generated_content
+        )
+
+        return FlaskJSONResponse({
+            "message": "세션이 생성되었습니다.",
+            "session_id": session_id
+        })
+    except Exception as e:
+        return error_response(str(e), 500)
+
+
+@jwt_required
+async def update_session(request):
+    """세션을 업데이트합니다."""
+    try:
+        data = await read_json(request)
+        rating = data.get('rating')
+        feedback = data.get('feedback')
+
+        if await get_async_mongodb_manager().update_session(request.path_params['session_id'], rating, feedback):
+            return FlaskJSONResponse({"message": "세션이 업데이트되었습니다."})
+        return error_response("세션 업데이트에 실패했습니다.", 400)
+    except Exception as e:
+        return error_response(str(e), 500)
+
+
+@jwt_required
+async def get_session_details(request):
+    """특정 세션의 상세 정보를 반환합니다."""
+    session_id = request.path_params['session_id']
+    try:
+        if not session_id or session_id == 'undefined':
+            return error_response("유효하지 않은 세션 ID입니다.", 400)
+
+        session = await get_async_mongodb_manager().sessions.find_one(session_detail_query(session_id, request.state.user_id))
+        if not session:
+            return error_response("세션을 찾을 수 없습니다.", 404)
+
+        return FlaskJSONResponse(session_detail(session))
+
+    except Exception as e:
+        print(f"세션 상세 정보 조회 중 오류: {str(e)}")
+        return error_response(f"세션 정보를 불러오는 중 오류가 발생했습니다: {str(e)}", 500)
+
+
+@jwt_required
+async def generate_complaint(request):
+    try:
+        complaint_generator = await asyncio.to_thread(services.get_complaint_generator)
+        data = await read_json(request)
+        if not data:
+            return error_response("요청 데이터가 없습니다.", 400)
+
+        user_input = data.get('user_input')
+        if not user_input:
+            return error_response("사용자 입력이 없습니다.", 400)
+
+        current_user = request.state.user_id
+
+        # 비동기 모드: 작업을 대기열에 넣고 즉시 job_id 반환
+        if data.get('async') or request.query_params.get('async') in ('1', 'true'):
+            try:
+                job = await asyncio.to_thread(services.job_queue.submit, current_user, user_input)
+            except JobQueueFull as e:
+                response = error_response("요청이 많아 잠시 후 다시 시도해주세요.", 429)
+                response.headers['Retry-After'] = str(e.retry_after)
+                return response
+            job["status_url"] = f"/api/jobs/{job['job_id']}"
+            return FlaskJSONResponse(job, status_code=202)
+
+        try:
+            cache_info = {}
+            generated_complaint = await complaint_generator.agenerate_complaint(
+                user_input,
+                request.app.state.openai_client,
+                user_id=current_user,
+                cache_info=cache_info
+            )
+
+            session_id = None
+            try:
+                session_id = await get_async_mongodb_manager().save_session(
+                    current_user,
+                    user_input,
+                    {
+                        "complaint": generated_complaint
+                    }
+                )
+            except Exception as db_error:
+                print(f"데이터베이스 저장 오류: {str(db_error)}")
+
+            return FlaskJSONResponse({
+                "complaint": generated_complaint,
+                "session_id": session_id,
+                "cache": cache_info
+            })
+
+        except Exception as e:
+            print(f"소장 생성 오류: {str(e)}")
+            return error_response(f"소장 생성 중 오류가 발생했습니다: {str(e)}", 500)
+
+    except Exception as e:
+        print(f"서버 오류: {str(e)}")
+        return error_response(str(e), 500)
+
+
+class ThreadedWebSocket:
+    """Starlette WebSocket을 flask_sock의 ws처럼 다른 스레드에서 동기적으로 쓰도록 감쌉니다.
+
+    receive()는 텍스트 또는 바이너리 메시지를 반환하고, 연결이 끊기면 None을 반환합니다.
+    """
+
+    def __init__(self, websocket, loop: asyncio.AbstractEventLoop):
+        self.websocket = websocket
+        self.loop = loop
+
+    def _call(self, coro):
+        return asyncio.run_coroutine_threadsafe(coro, self.loop).result()
+
+    def send(self, data):
+        if isinstance(data, str):
+            self._call(self.websocket.send_text(data))
+        else:
+            self._call(self.websocket.send_bytes(data))
+
+    def receive(self):
+        if self.websocket.client_state != WebSocketState.CONNECTED:
+            return None
+        message = self._call(self.websocket.receive())
+        if message["type"] == "websocket.disconnect":
+            return None
+        return message.get("text") if message.get("text") is not None else message.get("bytes")
+
+
+ws_executor = ThreadPoolExecutor(max_workers=int(os.getenv('WS_THREADS', '64')), thread_name_prefix="ws")
+
+
+def threaded_websocket(handler):
+    """run_*_socket(ws, auth_header) 처리 함수를 WebSocket 엔드포인트로 만듭니다."""
+    async def endpoint(websocket):
+        await websocket.accept()
+        loop = asyncio.get_running_loop()
+        try:
+            await loop.run_in_executor(
+                ws_executor, handler, ThreadedWebSocket(websocket, loop), websocket.headers.get('Authorization', '')
+            )
+        except Exception as e:
+            print(f"WebSocket 처리 중 오류: {str(e)}")
+        finally:
+            if websocket.client_state == WebSocketState.CONNECTED and websocket.application_state == WebSocketState.CONNECTED:
+                await websocket.close()
+    return endpoint
+
+
+class ThreadPoolWsgiToAsgi(WsgiToAsgi):
+    """WsgiToAsgi와 같지만 WSGI 요청을 전용 스레드 풀에서 동시에 실행합니다.
+
+    asgiref의 기본 구현은 thread_sensitive 모드라서 프로세스의 모든 WSGI 요청이
+    한 스레드에서 차례로 실행됩니다.
+    """
+
+    def __init__(self, wsgi_application, max_threads: int = 32):
+        super().__init__(wsgi_application)
+        self.executor = ThreadPoolExecutor(max_workers=max_threads, thread_name_prefix="wsgi")
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "websocket":
+            # WebSocket 라우트는 app의 WebSocketRoute에서 처리
+            await send({"type": "websocket.close", "code": 1003})
+            return
+        await _ThreadPoolWsgiInstance(self.wsgi_application, self.executor)(scope, receive, send)
+
+
+class _ThreadPoolWsgiInstance(WsgiToAsgiInstance):
+    # sync_to_async로 감싸기 전의 run_wsgi_app
+    _run_wsgi_app = WsgiToAsgiInstance.__dict__["run_wsgi_app"].func
+
+    def __init__(self, wsgi_application, executor: ThreadPoolExecutor):
+        super().__init__(wsgi_application)
+        self.executor = executor
+
+    async def run_wsgi_app(self, body):
+        await sync_to_async(self._run_wsgi_app, thread_sensitive=False, executor=self.executor)(body)
+
+
+@contextlib.asynccontextmanager
+async def lifespan(app):
+    # 워커 프로세스의 이벤트 루프에서 OpenAI 비동기 클라이언트를 만듦
+    app.state.openai_client = openai.AsyncOpenAI(
+        api_key=os.getenv("OPENAI_API_KEY"),
+        max_retries=int(os.getenv('OPENAI_MAX_RETRIES', '2'))
+    )
+    yield
+    await app.state.openai_client.close()
+
+
+cors = [Middleware(
+    CORSMiddleware,
+    allow_origins=CORS_ORIGINS,
+    allow_credentials=True,
+    allow_methods=["*"],
+    allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"]
+)]
+
+# Flask 앱에는 Flask-CORS가 적용되어 있으므로 비동기 라우트에만 CORS 미들웨어를 붙임
+app = Starlette(
+    routes=[
+        Route('/api/generate-complaint', generate_complaint, methods=['POST', 'OPTIONS'], middleware=cors),
+        Route('/api/sessions', get_sessions, methods=['GET', 'OPTIONS'], middleware=cors),
+        Route('/api/sessions', create_session, methods=['POST'], middleware=cors),
+        Route('/api/sessions/{session_id}', get_session_details, methods=['GET', 'OPTIONS'], middleware=cors),
+        Route('/api/sessions/{session_id}', update_session, methods=['PUT'], middleware=cors),
+        WebSocketRoute('/api/ws/generate-complaint', threaded_websocket(run_complaint_socket)),
+        WebSocketRoute('/api/ws/transcribe', threaded_websocket(run_transcribe_socket)),
+        Mount('/', app=ThreadPoolWsgiToAsgi(server.app, max_threads=int(os.getenv('WSGI_THREADS', '32'))))
+    ],
+    lifespan=lifespan
+)
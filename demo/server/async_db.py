@@ -0,0 +1,533 @@
+"""
+MongoDBManager / UserManager / SessionManager의 asyncio 버전입니다.
+
+ASGI 서버에서 Mongo 왕복 시간 동안 워커를 붙잡지 않도록 pymongo의 AsyncMongoClient를
+사용하며, 메서드 이름과 반환값은 동기 클래스와 같습니다. 기존 동기 클래스는 그대로
+두고, 인덱스 생성과 벡터 인덱스 적재(load_vector_index, save_chunks_bulk) 같은 시작/적재
+작업은 동기 MongoDBManager가 계속 담당합니다.
+
+AsyncMongoClient는 하나의 이벤트 루프에서만 사용할 수 있으므로 프로세스(워커)마다
+하나를 만들어 공유하며, fork 이후에는 reset_async_clients로 버려야 합니다.
+"""
+import asyncio
+import hashlib
+import os
+import threading
+import time
+import uuid
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from pymongo import AsyncMongoClient
+
+from server import (
+    JWTManager, MongoDBManager, finish_session_page, mongodb_manager, password_hasher, session_page_pipeline
+)
+
+_clients: Dict[str, AsyncMongoClient] = {}
+_clients_pid = os.getpid()
+_clients_lock = threading.Lock()
+
+
+def get_async_client(uri: str) -> AsyncMongoClient:
+    """URI별로 프로세스당 하나의 AsyncMongoClient(커넥션 풀)를 반환합니다."""
+    global _clients_pid
+    with _clients_lock:
+        if _clients_pid != os.getpid():
+            # fork된 자식은 부모의 소켓과 락을 쓰면 안 됨
+            _clients.clear()
+            _clients_pid = os.getpid()
+        client = _clients.get(uri)
+        if client is None:
+            client = _clients[uri] = AsyncMongoClient(
+                uri,
+                maxPoolSize=int(os.getenv('MONGO_MAX_POOL_SIZE', '100')),
+                minPoolSize=int(os.getenv('MONGO_MIN_POOL_SIZE', '0'))
+            )
+        return client
+
+
+def reset_async_clients():
+    """공유 클라이언트를 버립니다. 다음 get_async_client 호출 때 새로 연결합니다."""
+    global _async_mongodb_manager
+    with _clients_lock:
+        _clients.clear()
+    _async_mongodb_manager = None
+
+
+class AsyncMongoDBManager:
+    """MongoDBManager와 같은 메서드를 코루틴으로 제공합니다.
+
+    동기 매니저의 권한 캐시와 벡터 인덱스를 함께 사용하므로, 어느 쪽에서 권한을
+    바꾸어도 같은 프로세스의 캐시가 무효화됩니다.
+    """
+
+    def __init__(self, sync_manager: MongoDBManager):
+        self.sync = sync_manager
+        self.client = get_async_client(sync_manager.uri)
+        self.db = self.client[sync_manager.db.name]
+        self.conversations = self.db[sync_manager.conversations.name]
+        self.documents = self.db['document_chunks']
+        self.feedback = self.db['feedback']
+        self.feedback_stats = self.db['feedback_stats']
+        self.users = self.db['users']
+        self.sessions = self.db['sessions']
+        self.logs = self.db['logs']
+        self.principal_cache = sync_manager.principal_cache
+        self.vector_search_backend = sync_manager.vector_search_backend
+        self.vector_index = sync_manager.vector_index
+
+    async def ping(self) -> float:
+        """MongoDB 왕복 시간(ms)을 측정합니다."""
+        started = time.perf_counter()
+        await self.client.admin.command('ping')
+        return (time.perf_counter() - started) * 1000
+
+    def pool_status(self) -> dict:
+        """커넥션 풀 설정과 연결된 노드 정보를 반환합니다."""
+        pool_options = self.client.options.pool_options
+        return {
+            "max_pool_size": pool_options.max_pool_size,
+            "min_pool_size": pool_options.min_pool_size,
+            "nodes": [f"{host}:{port}" for host, port in self.client.nodes]
+        }
+
+    async def get_principal(self, user_id: str) -> Optional[dict]:
+        """PrincipalCache.get의 비동기 버전입니다."""
+        hit, principal = self.principal_cache.cached(user_id)
+        if hit:
+            return principal
+        user = await self.users.find_one({"user_id": user_id}, self.principal_cache.PRINCIPAL_PROJECTION)
+        return self.principal_cache.store(user_id, user)
+
+    async def resolve_principal(self, payload: dict) -> Optional[dict]:
+        """JWTManager.resolve_principal의 비동기 버전입니다."""
+        return JWTManager.apply_principal(payload, await self.get_principal(payload['user_id']))
+
+    async def create_user(self, username: str, password: str, email: str) -> Optional[str]:
+        """새 사용자를 생성합니다."""
+        # 해시 풀이 가득 차면 PasswordHasherBusy를 그대로 전달
+        password_hash = await password_hasher.hash_async(password)
+        try:
+            print(f"사용자 생성 시도: {username}")
+            user_id = str(uuid.uuid4())
+            result = await self.users.insert_one({
+                "user_id": user_id,
+                "username": username,
+                "email": email,
+                "password": password_hash,
+                "created_at": datetime.utcnow(),
+                "last_login": None,
+                "role": "user",
+                "level": 1,
+                "status": "active",
+                "role_version": 0
+            })
+            print(f"사용자 생성 결과: {result.inserted_id}")
+            return user_id
+        except Exception as e:
+            print(f"사용자 생성 중 오류 발생: {str(e)}")
+            return None
+
+    async def get_user_by_username(self, username: str) -> Optional[dict]:
+        """사용자명으로 사용자를 조회합니다."""
+        return await self.users.find_one({"username": username})
+
+    async def get_user_by_id(self, user_id: str) -> Optional[dict]:
+        """사용자 ID로 사용자를 조회합니다."""
+        return await self.users.find_one({"user_id": user_id})
+
+    async def verify_user(self, username: str, password: str) -> Optional[dict]:
+        """사용자 인증을 수행합니다."""
+        user = await self.get_user_by_username(username)
+        if user and await password_hasher.verify_async(user["password"], password):
+            await self.users.update_one(
+                {"user_id": user["user_id"]},
+                {"$set": {"last_login": datetime.utcnow()}}
+            )
+            return user
+        return None
+
+    async def save_session(self, user_id: str, consultation_text: str, generated_content: str) -> str:
+        """사용자 세션을 저장합니다."""
+        session_id = str(uuid.uuid4())
+        await self.sessions.insert_one({
+            "session_id": session_id,
+            "user_id": user_id,
+            "consultation_text": consultation_text,
+            "generated_content": generated_content,
+            "created_at": datetime.utcnow(),
+            "rating": None,
+            "feedback": None
+        })
+        return session_id
+
+    async def get_user_sessions(self, user_id: str, limit: int = 20,
+                                cursor: Optional[str] = None) -> Tuple[List[dict], Optional[str]]:
+        """사용자의 세션 요약을 최신순으로 한 페이지 조회합니다. (세션 목록, 다음 커서)"""
+        return await query_session_page_async(self.sessions, user_id, limit, cursor)
+
+    async def update_session(self, session_id: str, rating: Optional[int] = None,
+                             feedback: Optional[str] = None) -> bool:
+        """세션을 업데이트합니다."""
+        update_data = {}
+        if rating is not None:
+            update_data["rating"] = rating
+        if feedback is not None:
+            update_data["feedback"] = feedback
+
+        if update_data:
+            result = await self.sessions.update_one(
+                {"session_id": session_id},
+                {"$set": update_data}
+            )
+            return result.modified_count > 0
+        return False
+
+    async def save_chunk(self, content: str, doc_type: str, embedding: Optional[List[float]] = None):
+        """청크를 저장합니다. embedding이 없으면 중복 확인 후 캐시를 거쳐 계산합니다."""
+        chunk_hash = hashlib.md5(content.encode()).hexdigest()
+        if not await self.documents.find_one({"chunk_hash": chunk_hash}):
+            if embedding is None:
+                embedding = (await asyncio.to_thread(self.sync.get_chunk_embeddings().embed_documents, [content]))[0]
+            result = await self.documents.insert_one({
+                "content": content,
+                "doc_type": doc_type,
+                "chunk_hash": chunk_hash,
+                "embedding": embedding,
+                "created_at": datetime.now()
+            })
+            self.vector_index.add(doc_type, chunk_hash, content, embedding, doc_id=result.inserted_id)
+
+    async def save_conversation(self, session_id: str, user_input: str, generated_content: Dict):
+        conversation = {
+            "session_id": session_id,
+            "created_at": datetime.now(),
+            "user_input": user_input,
+            "generated_content": generated_content
+        }
+        await self.conversations.insert_one(conversation)
+        return conversation
+
+    async def get_similar_chunks(self, query_embedding: List[float], doc_type: str, k: int = 3):
+        """벡터 유사도 검색을 수행합니다."""
+        if self.vector_search_backend == 'local':
+            # 행렬 연산(과 주기적인 인덱스 갱신)이므로 이벤트 루프 밖에서 실행
+            return await asyncio.to_thread(self.sync.get_similar_chunks, query_embedding, doc_type, k)
+
+        pipeline = [
+            {
+                "$vectorSearch": {
+                    "index": "vector_index",
+                    "path": "embedding",
+                    "queryVector": query_embedding,
+                    "numCandidates": k * 20,
+                    "limit": k,
+                    "filter": {"doc_type": doc_type}
+                }
+            }
+        ]
+        return await (await self.documents.aggregate(pipeline)).to_list(None)
+
+    async def save_feedback(self, feedback_doc):
+        """피드백을 저장하고 통계 카운터를 갱신합니다."""
+        try:
+            if not isinstance(feedback_doc.get('rating'), (int, float)):
+                raise ValueError("rating must be a number")
+
+            result = await self.feedback.insert_one(feedback_doc)
+
+            if result.inserted_id:
+                print(f"피드백 저장 성공: {result.inserted_id}")
+            else:
+                raise Exception("피드백 저장 실패")
+
+        except Exception as e:
+            print(f"피드백 저장 중 오류: {str(e)}")
+            raise e
+
+        try:
+            if await self.feedback_stats.find_one({"_id": "global"}, {"_id": 1}) is None:
+                await self.rebuild_feedback_statistics()
+            else:
+                await self.feedback_stats.bulk_write(
+                    MongoDBManager._feedback_counter_operations(feedback_doc), ordered=False
+                )
+        except Exception as e:
+            print(f"피드백 통계 갱신 중 오류: {str(e)}")
+        return result.inserted_id
+
+    async def rebuild_feedback_statistics(self):
+        """feedback 컬렉션 전체로부터 카운터 문서를 서버 측 집계로 다시 만듭니다."""
+        for pipeline in MongoDBManager._feedback_statistics_pipelines():
+            await (await self.feedback.aggregate(pipeline)).to_list(None)
+
+    async def get_feedback_statistics(self, user_id: Optional[str] = None, days: int = 30):
+        """카운터 문서만 읽어 피드백 통계를 반환합니다."""
+        ids, day_ids = MongoDBManager._feedback_counter_ids(user_id, days)
+        counters = {doc["_id"]: doc async for doc in self.feedback_stats.find({"_id": {"$in": ids}})}
+        if "global" not in counters:
+            if not await self.feedback.find_one({"rating": {"$type": "number"}}, {"_id": 1}):
+                return None
+            await self.rebuild_feedback_statistics()
+            counters = {doc["_id"]: doc async for doc in self.feedback_stats.find({"_id": {"$in": ids}})}
+        return MongoDBManager._build_feedback_statistics(counters, day_ids, user_id)
+
+    async def save_log(self, log_data):
+        """로그를 백그라운드 저장 대기열에 넣습니다 (동기 매니저와 같은 LogWriter 사용)."""
+        return self.sync.log_writer.write(log_data)
+
+    async def get_user_logs(self, user_id: str, start: Optional[datetime] = None,
+                            end: Optional[datetime] = None, limit: int = 100) -> List[dict]:
+        """사용자의 로그를 created_at 범위 [start, end)에서 최신순으로 조회합니다."""
+        cursor = self.logs.find(MongoDBManager._log_query(user_id, start, end)).sort("created_at", -1).limit(limit)
+        return await cursor.to_list(None)
+
+
+async def query_session_page_async(collection, user_id: str, limit: int = 20,
+                                   cursor: Optional[str] = None) -> Tuple[List[dict], Optional[str]]:
+    """query_session_page의 비동기 버전입니다."""
+    pipeline = session_page_pipeline(user_id, limit, cursor)
+    docs = await (await collection.aggregate(pipeline)).to_list(None)
+    return finish_session_page(docs, limit)
+
+
+class AsyncUserManager:
+    """UserManager와 같은 메서드를 코루틴으로 제공합니다."""
+
+    def __init__(self, mongodb_manager: AsyncMongoDBManager):
+        self.mongodb = mongodb_manager
+        self.users_collection = self.mongodb.users
+
+    async def create_user(self, username: str, password: str, email: str) -> Optional[str]:
+        """새 사용자를 생성합니다."""
+        try:
+            if await self.users_collection.find_one({"username": username}):
+                raise ValueError("이미 존재하는 사용자명입니다.")
+            if await self.users_collection.find_one({"email": email}):
+                raise ValueError("이미 등록된 이메일입니다.")
+
+            user_id = str(uuid.uuid4())
+            user_doc = {
+                "user_id": user_id,
+                "username": username,
+                "email": email,
+                "password": await password_hasher.hash_async(password),
+                "created_at": datetime.utcnow(),
+                "last_login": None,
+                "role": "user",
+                "status": "active",
+                "level": 1,
+                "settings": {
+                    "notification_enabled": True,
+                    "theme": "light"
+                }
+            }
+
+            result = await self.users_collection.insert_one(user_doc)
+            if result.inserted_id:
+                return user_id
+            return None
+
+        except Exception as e:
+            print(f"사용자 생성 중 오류: {str(e)}")
+            raise
+
+    async def get_user(self, user_id: str) -> Optional[dict]:
+        """사용자 정보를 조회합니다."""
+        try:
+            user = await self.users_collection.find_one({"user_id": user_id})
+            if user:
+                user.pop('password', None)
+                return user
+            return None
+        except Exception as e:
+            print(f"사용자 조회 중 오류: {str(e)}")
+            return None
+
+    async def update_user(self, user_id: str, updates: dict) -> bool:
+        """사용자 정보를 업데이트합니다."""
+        try:
+            updates.pop('user_id', None)
+            updates.pop('password', None)
+            updates.pop('role', None)
+
+            update = {"$set": updates}
+            if any(field in updates for field in ('level', 'status')):
+                update["$inc"] = {"role_version": 1}
+            result = await self.users_collection.update_one({"user_id": user_id}, update)
+            if "$inc" in update:
+                self.mongodb.principal_cache.invalidate(user_id)
+            return result.modified_count > 0
+        except Exception as e:
+            print(f"사용자 업데이트 중 오류: {str(e)}")
+            return False
+
+    async def change_password(self, user_id: str, current_password: str, new_password: str) -> bool:
+        """사용자 비밀번호를 변경합니다."""
+        try:
+            user = await self.users_collection.find_one({"user_id": user_id})
+            if not user:
+                return False
+
+            if not await password_hasher.verify_async(user['password'], current_password):
+                return False
+
+            result = await self.users_collection.update_one(
+                {"user_id": user_id},
+                {"$set": {"password": await password_hasher.hash_async(new_password)}}
+            )
+            return result.modified_count > 0
+        except Exception as e:
+            print(f"비밀번호 변경 중 오류: {str(e)}")
+            return False
+
+    async def delete_user(self, user_id: str) -> bool:
+        """사용자 계정을 비활성화합니다."""
+        try:
+            result = await self.users_collection.update_one(
+                {"user_id": user_id},
+                {
+                    "$set": {"status": "inactive", "deactivated_at": datetime.utcnow()},
+                    "$inc": {"role_version": 1}
+                }
+            )
+            self.mongodb.principal_cache.invalidate(user_id)
+            return result.modified_count > 0
+        except Exception as e:
+            print(f"사용자 삭제 중 오류: {str(e)}")
+            return False
+
+    async def verify_user(self, username: str, password: str) -> Optional[dict]:
+        """사용자 인증을 수행합니다."""
+        try:
+            user = await self.users_collection.find_one({"username": username})
+            if user and await password_hasher.verify_async(user['password'], password):
+                await self.users_collection.update_one(
+                    {"user_id": user["user_id"]},
+                    {"$set": {"last_login": datetime.utcnow()}}
+                )
+                user.pop('password', None)
+                return user
+            return None
+        except Exception as e:
+            print(f"사용자 인증 중 오류: {str(e)}")
+            return None
+
+    async def get_user_stats(self, user_id: str) -> dict:
+        """사용자 통계 정보를 조회합니다."""
+        try:
+            pipeline = [
+                {"$match": {"user_id": user_id}},
+                {"$group": {
+                    "_id": None,
+                    "avg_rating": {"$avg": "$rating"},
+                    "total_sessions": {"$sum": 1}
+                }}
+            ]
+            # 세션 수, 평균 평점, 사용자 정보를 동시에 조회
+            session_count, stats, user = await asyncio.gather(
+                self.mongodb.sessions.count_documents({"user_id": user_id}),
+                self._aggregate(self.mongodb.sessions, pipeline),
+                self.get_user(user_id)
+            )
+
+            return {
+                "total_sessions": session_count,
+                "average_rating": stats[0]["avg_rating"] if stats else 0,
+                "last_login": (user or {}).get("last_login")
+            }
+        except Exception as e:
+            print(f"사용자 통계 조회 중 오류: {str(e)}")
+            return {
+                "total_sessions": 0,
+                "average_rating": 0,
+                "last_login": None
+            }
+
+    @staticmethod
+    async def _aggregate(collection, pipeline: List[dict]) -> List[dict]:
+        return await (await collection.aggregate(pipeline)).to_list(None)
+
+    async def update_user_level(self, user_id: str) -> bool:
+        """사용자 레벨을 업데이트합니다."""
+        try:
+            stats = await self.get_user_stats(user_id)
+
+            new_level = 1
+            if stats["total_sessions"] >= 50:
+                new_level = 5
+            elif stats["total_sessions"] >= 30:
+                new_level = 4
+            elif stats["total_sessions"] >= 20:
+                new_level = 3
+            elif stats["total_sessions"] >= 10:
+                new_level = 2
+
+            if new_level > 1:
+                # 레벨이 바뀔 때만 role_version을 올리고 권한 캐시를 비움
+                result = await self.users_collection.update_one(
+                    {"user_id": user_id, "level": {"$ne": new_level}},
+                    {"$set": {"level": new_level}, "$inc": {"role_version": 1}}
+                )
+                if result.modified_count > 0:
+                    self.mongodb.principal_cache.invalidate(user_id)
+                    return True
+            return False
+
+        except Exception as e:
+            print(f"사용자 레벨 업데이트 중 오류: {str(e)}")
+            return False
+
+
+class AsyncSessionManager:
+    """SessionManager와 같은 메서드를 코루틴으로 제공합니다."""
+
+    def __init__(self, mongo_db: AsyncMongoDBManager):
+        self.db = mongo_db.db
+        self.sessions_collection = mongo_db.sessions
+
+    async def create_session(self, user_id: str, consultation_text: str, generated_content: dict = None) -> str:
+        """새 세션을 생성합니다."""
+        session_id = str(uuid.uuid4())
+        session = {
+            'session_id': session_id,
+            'user_id': user_id,
+            'consultation_text': consultation_text,
+            'generated_content': generated_content,
+            'created_at': datetime.utcnow(),
+            'status': 'active'
+        }
+        await self.sessions_collection.insert_one(session)
+        return session_id
+
+    async def get_session(self, session_id: str, user_id: str) -> Optional[dict]:
+        """세션을 조회합니다."""
+        return await self.sessions_collection.find_one({
+            'session_id': session_id,
+            'user_id': user_id
+        })
+
+    async def update_session(self, session_id: str, user_id: str, updates: dict) -> bool:
+        """세션을 업데이트합니다."""
+        result = await self.sessions_collection.update_one(
+            {'session_id': session_id, 'user_id': user_id},
+            {'$set': updates}
+        )
+        return result.modified_count > 0
+
+    async def get_user_sessions(self, user_id: str, limit: int = 20,
+                                cursor: Optional[str] = None) -> Tuple[List[dict], Optional[str]]:
+        """사용자의 세션 요약을 최신순으로 한 페이지 조회합니다. (세션 목록, 다음 커서)"""
+        return await query_session_page_async(self.sessions_collection, user_id, limit, cursor)
+
+
+_async_mongodb_manager: Optional[AsyncMongoDBManager] = None
+
+
+def get_async_mongodb_manager() -> AsyncMongoDBManager:
+    """프로세스 전역 AsyncMongoDBManager를 반환합니다 (server.mongodb_manager 기반)."""
+    global _async_mongodb_manager
+    if _async_mongodb_manager is None or _async_mongodb_manager.client is not get_async_client(mongodb_manager.uri):
+        _async_mongodb_manager = AsyncMongoDBManager(mongodb_manager)
+    return _async_mongodb_manager
@@ -0,0 +1,432 @@
+import io
+import os
+import queue
+import subprocess
+import tempfile
+import threading
+import time
+import wave
+from collections import deque
+from concurrent.futures import Future
+from typing import BinaryIO, Optional
+
+import numpy as np
+from flask import Request
+
+SAMPLE_RATE = 16000
+SAMPLE_WIDTH = 2  # pcm_s16le
+READ_SIZE = 64 * 1024
+
+
+class AudioTooLarge(Exception):
+    """업로드 또는 변환 결과가 허용 크기를 넘을 때 발생합니다."""
+
+
+class AudioConversionError(Exception):
+    """ffmpeg가 입력을 디코딩하지 못했을 때 발생합니다."""
+
+
+class TranscodeQueueFull(Exception):
+    """변환 대기열이 가득 찬 경우 발생합니다."""
+
+    def __init__(self, retry_after: int):
+        super().__init__("오디오 변환 대기열이 가득 찼습니다.")
+        self.retry_after = retry_after
+
+
+class InMemoryUploadRequest(Request):
+    """multipart로 올라온 파일을 임시 파일 대신 메모리에 받습니다.
+
+    Werkzeug는 500KB가 넘는 파일을 TemporaryFile에 저장하므로 업로드마다 디스크를
+    한 번 더 거칩니다. 요청 크기는 MAX_CONTENT_LENGTH로 제한됩니다.
+    """
+
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        return io.BytesIO()
+
+
+def max_audio_seconds() -> float:
+    return float(os.getenv('AUDIO_MAX_SECONDS', '1800'))
+
+
+def transcode_to_pcm(source: BinaryIO, max_input_bytes: Optional[int] = None,
+                     max_seconds: Optional[float] = None, sample_rate: int = SAMPLE_RATE,
+                     threads: int = 0) -> bytes:
+    """입력 스트림을 ffmpeg stdin으로 흘려보내고 stdout에서 16kHz mono PCM을 읽습니다.
+
+    입력은 READ_SIZE 단위로 전달하므로 원본 전체를 메모리에 올리지 않으며,
+    출력은 max_seconds 길이까지만 받습니다. threads가 0이면 ffmpeg가 스레드 수를 정합니다.
+
+    MP4/M4A/MOV(ftyp) 파일은 moov 박스가 끝에 있으면 파이프로 디코딩할 수 없으므로
+    임시 파일에 받아 ffmpeg가 탐색할 수 있게 합니다.
+    """
+    header = source.read(12)
+    if header[4:8] == b'ftyp':
+        path = spool_to_file(header, source, max_input_bytes)
+        try:
+            return _run_ffmpeg(path, None, b'', None, max_seconds, sample_rate, threads)
+        finally:
+            os.remove(path)
+    return _run_ffmpeg('pipe:0', source, header, max_input_bytes, max_seconds, sample_rate, threads)
+
+
+def spool_to_file(header: bytes, source: BinaryIO, max_input_bytes: Optional[int] = None) -> str:
+    """header와 나머지 입력을 임시 파일에 저장하고 경로를 반환합니다. 호출한 쪽에서 파일을 지웁니다."""
+    fd, path = tempfile.mkstemp(suffix='.mp4')
+    size = len(header)
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(header)
+            while True:
+                chunk = source.read(READ_SIZE)
+                if not chunk:
+                    break
+                size += len(chunk)
+                if max_input_bytes and size > max_input_bytes:
+                    raise AudioTooLarge(f"업로드 크기가 최대 {max_input_bytes} bytes를 넘습니다.")
+                f.write(chunk)
+    except BaseException:
+        os.remove(path)
+        raise
+    return path
+
+
+def _run_ffmpeg(input_arg: str, source: Optional[BinaryIO], header: bytes, max_input_bytes: Optional[int],
+                max_seconds: Optional[float], sample_rate: int, threads: int) -> bytes:
+    """ffmpeg로 input_arg를 디코딩합니다. source가 있으면 header 다음에 이어서 stdin으로 보냅니다."""
+    max_seconds = max_seconds or max_audio_seconds()
+    max_output_bytes = int(max_seconds * sample_rate * SAMPLE_WIDTH)
+
+    process = subprocess.Popen(
+        [
+            'ffmpeg', '-hide_banner', '-loglevel', 'error',
+            '-threads', str(threads),
+            '-i', input_arg,
+            '-f', 's16le',
+            '-acodec', 'pcm_s16le',
+            '-ar', str(sample_rate),
+            '-ac', '1',
+            'pipe:1'
+        ],
+        stdin=subprocess.PIPE if source is not None else subprocess.DEVNULL,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE
+    )
+
+    state = {"input_bytes": len(header), "too_large": False, "error": None}
+    stderr_tail = bytearray()
+
+    def feed():
+        try:
+            process.stdin.write(header)
+            while True:
+                chunk = source.read(READ_SIZE)
+                if not chunk:
+                    break
+                state["input_bytes"] += len(chunk)
+                if max_input_bytes and state["input_bytes"] > max_input_bytes:
+                    state["too_large"] = True
+                    break
+                process.stdin.write(chunk)
+        except (BrokenPipeError, ValueError):
+            # ffmpeg가 먼저 종료된 경우 (잘못된 입력 또는 출력 제한으로 종료)
+            pass
+        except Exception as e:
+            state["error"] = e
+        finally:
+            try:
+                process.stdin.close()
+            except (BrokenPipeError, OSError):
+                pass
+
+    def drain_stderr():
+        for line in process.stderr:
+            stderr_tail.extend(line)
+            del stderr_tail[:-4096]
+
+    feeder = threading.Thread(target=feed, daemon=True) if source is not None else None
+    reader = threading.Thread(target=drain_stderr, daemon=True)
+    if feeder is not None:
+        feeder.start()
+    reader.start()
+
+    pcm = bytearray()
+    try:
+        while True:
+            chunk = process.stdout.read(READ_SIZE)
+            if not chunk:
+                break
+            pcm.extend(chunk)
+            if len(pcm) > max_output_bytes:
+                raise AudioTooLarge(f"오디오 길이가 최대 {int(max_seconds)}초를 넘습니다.")
+            if state["too_large"]:
+                raise AudioTooLarge(f"업로드 크기가 최대 {max_input_bytes} bytes를 넘습니다.")
+        process.wait()
+    finally:
+        if process.poll() is None:
+            process.kill()
+            process.wait()
+        if feeder is not None:
+            feeder.join()
+        reader.join()
+        process.stdout.close()
+
+    if state["too_large"]:
+        raise AudioTooLarge(f"업로드 크기가 최대 {max_input_bytes} bytes를 넘습니다.")
+    if state["error"] is not None:
+        raise state["error"]
+    if process.returncode != 0 or not pcm:
+        message = stderr_tail.decode(errors='replace').strip()
+        print(f"FFmpeg conversion error: {message}")
+        raise AudioConversionError(message or "오디오 데이터가 비어 있습니다.")
+
+    # 홀수 바이트로 끝나면 마지막 샘플을 버림
+    return bytes(pcm[:len(pcm) - len(pcm) % SAMPLE_WIDTH])
+
+
+def pcm_duration(pcm: bytes, sample_rate: int = SAMPLE_RATE) -> float:
+    return len(pcm) / (sample_rate * SAMPLE_WIDTH)
+
+
+def split_pcm(pcm: bytes, chunk_seconds: float, sample_rate: int = SAMPLE_RATE) -> list:
+    """PCM을 chunk_seconds 길이의 조각으로 나눕니다."""
+    size = int(chunk_seconds * sample_rate) * SAMPLE_WIDTH
+    return [pcm[start:start + size] for start in range(0, len(pcm), size)] or [pcm]
+
+
+def split_at_silence(pcm: bytes, target_seconds: float, max_seconds: Optional[float] = None,
+                     frame_ms: int = 30, smooth_ms: int = 300, sample_rate: int = SAMPLE_RATE) -> list:
+    """PCM을 target_seconds 근처의 가장 조용한 지점에서 나누어 (시작 초, PCM) 목록을 반환합니다.
+
+    각 조각(마지막 조각 포함)은 target_seconds의 절반 이상, max_seconds 이하 길이가 되도록
+    그 범위에서 smooth_ms 이동 평균 에너지가 가장 낮은 프레임을 경계로 고릅니다.
+    """
+    max_seconds = max_seconds or target_seconds * 1.5
+    samples = np.frombuffer(pcm[:len(pcm) - len(pcm) % SAMPLE_WIDTH], dtype=np.int16)
+    total = len(samples)
+    if total <= max_seconds * sample_rate:
+        return [(0.0, pcm)]
+
+    frame = int(sample_rate * frame_ms / 1000)
+    n_frames = total // frame
+    energy = np.abs(samples[:n_frames * frame].astype(np.float32)).reshape(n_frames, frame).mean(axis=1)
+    width = max(1, smooth_ms // frame_ms)
+    energy = np.convolve(energy, np.ones(width, dtype=np.float32) / width, mode='same')
+
+    target_frames = int(target_seconds * 1000 / frame_ms)
+    max_frames = int(max_seconds * 1000 / frame_ms)
+    boundaries = [0]
+    position = 0
+    while n_frames - position > max_frames:
+        low = position + target_frames // 2
+        # 경계 뒤에 target_seconds의 절반 이상이 남도록 (짧은 꼬리 조각 방지)
+        high = max(low, min(position + max_frames, n_frames - target_frames // 2))
+        position = low + int(np.argmin(energy[low:high + 1]))
+        boundaries.append(position)
+
+    offsets = [b * frame for b in boundaries] + [total]
+    return [
+        (start / sample_rate, samples[start:end].tobytes())
+        for start, end in zip(offsets, offsets[1:]) if end > start
+    ]
+
+
+def preprocess_pcm(pcm: bytes, max_gap_seconds: float = 1.0, gap_seconds: float = 0.5,
+                   pad_seconds: float = 0.15, silence_floor_db: float = -50.0, dynamic_range_db: float = 35.0,
+                   target_db: float = -20.0, max_gain_db: float = 20.0, frame_ms: int = 30,
+                   sample_rate: int = SAMPLE_RATE) -> tuple:
+    """인식 전에 앞뒤 무음을 자르고, 긴 무음을 gap_seconds로 줄이고, 음량을 맞춥니다.
+
+    30ms 프레임 RMS가 silence_floor_db 또는 상위 5% 프레임보다 dynamic_range_db 이상
+    작으면 무음으로 봅니다. 음성 구간 앞뒤로 pad_seconds를 남기고, 음성 RMS가
+    target_db가 되도록 (피크는 -1dBFS 이하로) 이득을 적용합니다.
+
+    (처리된 PCM, 보고서)를 반환하며 보고서의 spans는 map_time에 사용합니다.
+    """
+    samples = np.frombuffer(pcm[:len(pcm) - len(pcm) % SAMPLE_WIDTH], dtype=np.int16)
+    frame = int(sample_rate * frame_ms / 1000)
+    n_frames = len(samples) // frame
+    original_seconds = len(samples) / sample_rate
+    if n_frames == 0:
+        return pcm, {"original_seconds": round(original_seconds, 2), "processed_seconds": round(original_seconds, 2),
+                     "removed_seconds": 0.0, "gain_db": 0.0, "spans": [(0.0, original_seconds, 0.0)]}
+
+    audio = samples.astype(np.float32) / 32768.0
+    rms = np.sqrt(np.mean(audio[:n_frames * frame].reshape(n_frames, frame) ** 2, axis=1))
+    level_db = 20 * np.log10(np.maximum(rms, 1e-10))
+    threshold = max(silence_floor_db, float(np.percentile(level_db, 95)) - dynamic_range_db)
+    voiced = level_db > threshold
+
+    # 음성 프레임 앞뒤로 pad만큼 확장
+    pad = int(pad_seconds * 1000 / frame_ms)
+    if pad:
+        voiced = np.convolve(voiced.astype(np.int32), np.ones(2 * pad + 1, dtype=np.int32), mode='same') > 0
+
+    if not voiced.any():
+        return b"", {"original_seconds": round(original_seconds, 2), "processed_seconds": 0.0,
+                     "removed_seconds": round(original_seconds, 2), "gain_db": 0.0, "spans": []}
+
+    # 음성 구간 [start, end) 프레임 목록
+    edges = np.diff(np.concatenate(([0], voiced.astype(np.int8), [0])))
+    starts = np.flatnonzero(edges == 1)
+    ends = np.flatnonzero(edges == -1)
+
+    # 구간 사이 무음이 max_gap보다 길면 gap만 남김 (앞뒤 무음은 모두 제거)
+    max_gap = int(max_gap_seconds * 1000 / frame_ms)
+    half_gap = int(gap_seconds * 1000 / frame_ms) // 2
+    keep = []
+    for index, (start, end) in enumerate(zip(starts, ends)):
+        if index > 0 and start - ends[index - 1] <= max_gap:
+            keep[-1] = (keep[-1][0], end)  # 짧은 무음은 그대로 둠
+        else:
+            if index > 0:
+                keep[-1] = (keep[-1][0], keep[-1][1] + half_gap)
+                start -= half_gap
+            keep.append((start, end))
+    if n_frames * frame < len(samples) and keep[-1][1] == n_frames:
+        keep[-1] = (keep[-1][0], n_frames + 1)  # 마지막 불완전 프레임 포함
+
+    spans = []
+    pieces = []
+    position = 0
+    for start, end in keep:
+        begin, finish = start * frame, min(end * frame, len(samples))
+        spans.append((float(begin / sample_rate), float(finish / sample_rate), float(position / sample_rate)))
+        pieces.append(audio[begin:finish])
+        position += finish - begin
+    processed = np.concatenate(pieces)
+
+    # 음성 구간 RMS 기준으로 음량 정규화 (피크 제한)
+    speech_rms = float(np.sqrt(np.mean(rms[voiced] ** 2)))
+    peak = float(np.max(np.abs(processed))) or 1.0
+    gain_db = float(min(target_db - 20 * np.log10(max(speech_rms, 1e-10)), max_gain_db, -1.0 - 20 * np.log10(peak)))
+    processed = np.clip(processed * (10 ** (gain_db / 20)), -1.0, 32767 / 32768)
+
+    processed_seconds = len(processed) / sample_rate
+    report = {
+        "original_seconds": round(original_seconds, 2),
+        "processed_seconds": round(processed_seconds, 2),
+        "removed_seconds": round(original_seconds - processed_seconds, 2),
+        "gain_db": round(gain_db, 1),
+        "spans": spans
+    }
+    return (processed * 32768).astype(np.int16).tobytes(), report
+
+
+def map_time(seconds: float, spans: list) -> float:
+    """preprocess_pcm 이후의 시각을 원본 오디오의 시각으로 변환합니다."""
+    for original_start, original_end, processed_start in reversed(spans):
+        if seconds >= processed_start:
+            return min(original_start + seconds - processed_start, original_end)
+    return seconds
+
+
+def pcm_to_wav(pcm: bytes, sample_rate: int = SAMPLE_RATE) -> bytes:
+    """PCM 바이트에 WAV 헤더를 붙여 메모리에서 WAV 파일 내용을 만듭니다."""
+    buffer = io.BytesIO()
+    with wave.open(buffer, 'wb') as wav_file:
+        wav_file.setnchannels(1)
+        wav_file.setsampwidth(SAMPLE_WIDTH)
+        wav_file.setframerate(sample_rate)
+        wav_file.writeframes(pcm)
+    return buffer.getvalue()
+
+
+class TranscodePool:
+    """ffmpeg 변환을 고정된 수의 워커에서만 실행합니다.
+
+    동시에 실행되는 ffmpeg 프로세스 수를 workers로 제한하고, 대기열이 가득 차면
+    TranscodeQueueFull을 발생시켜 요청이 CPU를 과점하지 않도록 합니다.
+    """
+
+    def __init__(self, workers: int = 2, max_queue: int = 8, ffmpeg_threads: int = 1, history: int = 200):
+        self.workers = workers
+        self.ffmpeg_threads = ffmpeg_threads
+        self.queue = queue.Queue(maxsize=max_queue)
+        self._lock = threading.Lock()
+        self._threads = []
+        self._active = 0
+        self._avg_wall = 2.0  # 평균 변환 시간(초), 지수 이동 평균
+        self._history = deque(maxlen=history)  # (wall, queue_wait, real_time_factor)
+        self._counts = {"completed": 0, "failed": 0, "rejected": 0}
+
+    def start(self):
+        """워커 스레드를 시작합니다."""
+        with self._lock:
+            if self._threads:
+                return
+            for i in range(self.workers):
+                thread = threading.Thread(target=self._worker, name=f"transcode-{i}", daemon=True)
+                thread.start()
+                self._threads.append(thread)
+
+    def retry_after(self) -> int:
+        """대기열이 비워질 때까지 예상 시간(초)을 반환합니다."""
+        return max(1, int(self._avg_wall * (self.queue.qsize() + 1) / self.workers))
+
+    def submit(self, source: BinaryIO, **kwargs) -> Future:
+        """변환 작업을 대기열에 추가하고 PCM 바이트를 돌려줄 Future를 반환합니다."""
+        self.start()
+        future = Future()
+        try:
+            self.queue.put_nowait((future, source, kwargs, time.monotonic()))
+        except queue.Full:
+            with self._lock:
+                self._counts["rejected"] += 1
+            raise TranscodeQueueFull(self.retry_after())
+        return future
+
+    def transcode(self, source: BinaryIO, **kwargs) -> bytes:
+        """변환이 끝날 때까지 기다려 PCM 바이트를 반환합니다."""
+        return self.submit(source, **kwargs).result()
+
+    def stats(self) -> dict:
+        with self._lock:
+            history = list(self._history)
+            stats = {
+                "workers": self.workers,
+                "active": self._active,
+                "queue_depth": self.queue.qsize(),
+                "queue_capacity": self.queue.maxsize,
+                "avg_wall_seconds": round(self._avg_wall, 3),
+                **self._counts
+            }
+
+        if history:
+            walls = sorted(h[0] for h in history)
+            stats["p95_wall_seconds"] = round(walls[int(0.95 * (len(walls) - 1))], 3)
+            stats["avg_queue_wait_seconds"] = round(sum(h[1] for h in history) / len(history), 3)
+            factors = [h[2] for h in history if h[2] is not None]
+            stats["avg_real_time_factor"] = round(sum(factors) / len(factors), 4) if factors else None
+        return stats
+
+    def _worker(self):
+        while True:
+            future, source, kwargs, queued_at = self.queue.get()
+            try:
+                if not future.set_running_or_notify_cancel():
+                    continue
+
+                started = time.monotonic()
+                with self._lock:
+                    self._active += 1
+                try:
+                    pcm = transcode_to_pcm(source, threads=self.ffmpeg_threads, **kwargs)
+                except Exception as e:
+                    with self._lock:
+                        self._counts["failed"] += 1
+                    future.set_exception(e)
+                    continue
+                finally:
+                    with self._lock:
+                        self._active -= 1
+
+                wall = time.monotonic() - started
+                duration = pcm_duration(pcm, kwargs.get("sample_rate", SAMPLE_RATE))
+                with self._lock:
+                    self._counts["completed"] += 1
+                    self._avg_wall = 0.8 * self._avg_wall + 0.2 * wall
+                    self._history.append((wall, started - queued_at, wall / duration if duration else None))
+                future.set_result(pcm)
+            finally:
+                self.queue.task_done()
@@ -0,0 +1,108 @@
+"""
+소장 생성 부하가 걸린 상태에서 로그인 지연 시간(p50/p95/p99)을 측정합니다.
+
+사용 예시:
+    python bench_login.py --base-url http://localhost:5000/api \
+        --username bench --password bench-password --register \
+        --logins 200 --login-concurrency 20 --generate-concurrency 8
+
+--generate-concurrency가 0이면 부하 없이 로그인만 측정합니다.
+PASSWORD_HASH_WORKERS 값을 바꿔 가며 실행해 비교합니다.
+"""
+import argparse
+import statistics
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+SAMPLE_INPUT = "남편과 5년 전 결혼했고 2년 전부터 별거 중입니다. 양육권과 재산분할을 원합니다."
+
+
+def percentile(values, q):
+    values = sorted(values)
+    if not values:
+        return 0.0
+    index = min(len(values) - 1, int(round(q / 100 * (len(values) - 1))))
+    return values[index]
+
+
+def login(base_url, username, password):
+    started = time.perf_counter()
+    response = requests.post(f"{base_url}/login", json={"username": username, "password": password}, timeout=60)
+    return time.perf_counter() - started, response.status_code, response
+
+
+def generation_load(base_url, token, stop, counts):
+    """stop이 설정될 때까지 소장 생성 요청을 계속 보냅니다."""
+    headers = {"Authorization": f"Bearer {token}"}
+    while not stop.is_set():
+        try:
+            response = requests.post(
+                f"{base_url}/generate-complaint",
+                json={"user_input": SAMPLE_INPUT},
+                headers=headers,
+                timeout=300
+            )
+            counts[response.status_code] += 1
+        except requests.RequestException:
+            counts["error"] += 1
+
+
+def main():
+    parser = argparse.ArgumentParser(description="소장 생성 부하 중 로그인 지연 시간을 측정합니다.")
+    parser.add_argument("--base-url", default="http://localhost:5000/api")
+    parser.add_argument("--username", required=True)
+    parser.add_argument("--password", required=True)
+    parser.add_argument("--register", action="store_true", help="사용자가 없으면 먼저 등록")
+    parser.add_argument("--logins", type=int, default=200)
+    parser.add_argument("--login-concurrency", type=int, default=20)
+    parser.add_argument("--generate-concurrency", type=int, default=8)
+    parser.add_argument("--warmup-seconds", type=float, default=5.0)
+    args = parser.parse_args()
+
+    if args.register:
+        requests.post(f"{args.base_url}/register",
+                      json={"username": args.username, "password": args.password}, timeout=60)
+
+    _, status, response = login(args.base_url, args.username, args.password)
+    if status != 200:
+        print(f"로그인 실패: {status} {response.text}")
+        return
+    token = response.json()["token"]
+
+    stop = threading.Event()
+    generation_counts = Counter()
+    load_threads = [
+        threading.Thread(target=generation_load, args=(args.base_url, token, stop, generation_counts), daemon=True)
+        for _ in range(args.generate_concurrency)
+    ]
+    for thread in load_threads:
+        thread.start()
+    if load_threads:
+        print(f"소장 생성 부하 {args.generate_concurrency}개 시작, {args.warmup_seconds}초 대기")
+        time.sleep(args.warmup_seconds)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.login_concurrency) as executor:
+        results = list(executor.map(
+            lambda _: login(args.base_url, args.username, args.password)[:2],
+            range(args.logins)
+        ))
+    elapsed = time.perf_counter() - started
+    stop.set()
+
+    latencies = [latency * 1000 for latency, status in results if status == 200]
+    statuses = Counter(status for _, status in results)
+    print(f"로그인 {args.logins}회 (동시 {args.login_concurrency}), {elapsed:.1f}초, 상태 코드: {dict(statuses)}")
+    if latencies:
+        print(f"  p50 {percentile(latencies, 50):.0f}ms  p95 {percentile(latencies, 95):.0f}ms  "
+              f"p99 {percentile(latencies, 99):.0f}ms  max {max(latencies):.0f}ms  "
+              f"mean {statistics.mean(latencies):.0f}ms")
+    print(f"부하 중 완료된 소장 생성 요청: {dict(generation_counts)}")
+
+
+if __name__ == "__main__":
+    main()
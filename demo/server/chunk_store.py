@@ -0,0 +1,99 @@
+import hashlib
+import itertools
+import time
+from datetime import datetime
+from typing import Callable, Optional
+
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+
+
+def save_chunks_bulk(documents, embeddings, chunks, batch_size: int = 256,
+                     on_inserted: Optional[Callable[[dict, object], None]] = None) -> dict:
+    """
+    청크를 배치 단위로 document_chunks에 저장합니다.
+
+    이미 저장된 청크는 임베딩하지 않으며, 새로 저장한 청크마다 on_inserted(doc, _id)를 호출합니다.
+    서버(MongoDBManager.save_chunks_bulk)와 적재 CLI(ingest.py)가 함께 사용합니다.
+
+    Args:
+        documents: document_chunks 컬렉션
+        embeddings: embed_documents를 제공하는 임베딩 모델 (CachedEmbeddings 권장)
+        chunks: (content, doc_type) 튜플 또는 content/doc_type/embedding 키를 가진 dict의 iterator
+        batch_size (int): 한 번에 임베딩하고 bulk_write할 청크 수
+
+    Returns:
+        dict: 처리/저장/건너뛴 청크 수와 처리량
+    """
+    stats = {"processed": 0, "inserted": 0, "skipped": 0, "embedded": 0, "batches": 0}
+    started = time.perf_counter()
+    iterator = iter(chunks)
+
+    while True:
+        batch = list(itertools.islice(iterator, batch_size))
+        if not batch:
+            break
+
+        # 배치 내 중복 제거
+        pending = {}
+        for chunk in batch:
+            if not isinstance(chunk, dict):
+                chunk = {"content": chunk[0], "doc_type": chunk[1]}
+            chunk_hash = hashlib.md5(chunk["content"].encode()).hexdigest()
+            pending.setdefault(chunk_hash, chunk)
+
+        # 이미 저장된 청크는 임베딩하지 않음
+        existing = {
+            doc["chunk_hash"]
+            for doc in documents.find({"chunk_hash": {"$in": list(pending)}}, {"chunk_hash": 1})
+        }
+        new_hashes = [h for h in pending if h not in existing]
+
+        to_embed = [h for h in new_hashes if pending[h].get("embedding") is None]
+        if to_embed:
+            vectors = embeddings.embed_documents([pending[h]["content"] for h in to_embed])
+            for h, vector in zip(to_embed, vectors):
+                pending[h]["embedding"] = vector
+            stats["embedded"] += len(to_embed)
+
+        docs = [
+            {
+                "content": pending[h]["content"],
+                "doc_type": pending[h]["doc_type"],
+                "chunk_hash": h,
+                "embedding": pending[h]["embedding"],
+                "created_at": datetime.now()
+            }
+            for h in new_hashes
+        ]
+
+        upserted_ids = {}
+        if docs:
+            try:
+                result = documents.bulk_write(
+                    [UpdateOne({"chunk_hash": doc["chunk_hash"]}, {"$setOnInsert": doc}, upsert=True) for doc in docs],
+                    ordered=False
+                )
+                upserted_ids = result.upserted_ids
+            except BulkWriteError as e:
+                # 동시에 같은 청크를 적재한 경우의 중복 키 오류만 무시
+                if any(error.get("code") != 11000 for error in e.details.get("writeErrors", [])):
+                    raise
+                upserted_ids = {u["index"]: u["_id"] for u in e.details.get("upserted", [])}
+
+        if on_inserted is not None:
+            for index, doc_id in upserted_ids.items():
+                on_inserted(docs[index], doc_id)
+
+        stats["batches"] += 1
+        stats["processed"] += len(batch)
+        stats["inserted"] += len(upserted_ids)
+        stats["skipped"] += len(batch) - len(upserted_ids)
+
+        elapsed = time.perf_counter() - started
+        print(f"청크 적재 중: {stats['processed']}개 처리, {stats['inserted']}개 저장 "
+              f"({stats['processed'] / elapsed:.1f} chunks/s)")
+
+    stats["elapsed_seconds"] = round(time.perf_counter() - started, 3)
+    stats["chunks_per_second"] = round(stats["processed"] / stats["elapsed_seconds"], 1) if stats["elapsed_seconds"] else 0.0
+    return stats
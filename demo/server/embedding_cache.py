@@ -0,0 +1,163 @@
+import hashlib
+import os
+import sqlite3
+import threading
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+
+def content_hash(text: str) -> str:
+    """MongoDBManager.save_chunk와 같은 방식(MD5)으로 청크 해시를 계산합니다."""
+    return hashlib.md5(text.encode()).hexdigest()
+
+
+class EmbeddingCache:
+    """chunk_hash로 찾는 임베딩 캐시입니다.
+
+    벡터는 float32 바이트로 로컬 SQLite 파일과 (선택적으로) MongoDB의
+    embedding_cache 컬렉션에 저장합니다. 같은 텍스트를 다시 적재할 때
+    임베딩 모델을 호출하지 않도록 모델 호출 전에 조회합니다.
+    """
+
+    def __init__(self, model: str, path: Optional[str] = None, mongo_collection=None):
+        self.model = model
+        self.path = path or os.getenv(
+            'EMBEDDING_CACHE_PATH',
+            os.path.join(os.path.expanduser('~'), '.cache', 'herelaw', 'embeddings.sqlite3')
+        )
+        self.mongo_collection = mongo_collection
+        self._lock = threading.Lock()
+        self._stats = {"lookups": 0, "local_hits": 0, "remote_hits": 0, "misses": 0, "embedded": 0}
+
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            "model TEXT NOT NULL, chunk_hash TEXT NOT NULL, vector BLOB NOT NULL, "
+            "PRIMARY KEY (model, chunk_hash))"
+        )
+        self._conn.commit()
+
+        if self.mongo_collection is not None:
+            self.mongo_collection.create_index([("model", 1), ("chunk_hash", 1)], unique=True)
+
+    @staticmethod
+    def _encode(vector) -> bytes:
+        return np.asarray(vector, dtype=np.float32).tobytes()
+
+    @staticmethod
+    def _decode(blob: bytes) -> List[float]:
+        return np.frombuffer(blob, dtype=np.float32).tolist()
+
+    def get_many(self, hashes: Iterable[str]) -> Dict[str, List[float]]:
+        """해시 목록에 대해 캐시된 벡터를 반환합니다 (로컬 → MongoDB 순)."""
+        hashes = list(dict.fromkeys(hashes))
+        found = {}
+
+        with self._lock:
+            for start in range(0, len(hashes), 500):
+                batch = hashes[start:start + 500]
+                rows = self._conn.execute(
+                    f"SELECT chunk_hash, vector FROM embeddings WHERE model = ? "
+                    f"AND chunk_hash IN ({','.join('?' * len(batch))})",
+                    [self.model, *batch]
+                ).fetchall()
+                found.update((h, self._decode(blob)) for h, blob in rows)
+            local_hits = len(found)
+
+        remote = {}
+        missing = [h for h in hashes if h not in found]
+        if missing and self.mongo_collection is not None:
+            for doc in self.mongo_collection.find(
+                {"model": self.model, "chunk_hash": {"$in": missing}},
+                {"_id": 0, "chunk_hash": 1, "vector": 1}
+            ):
+                remote[doc["chunk_hash"]] = bytes(doc["vector"])
+            if remote:
+                self._put_local(remote)
+                found.update((h, self._decode(blob)) for h, blob in remote.items())
+
+        with self._lock:
+            self._stats["lookups"] += len(hashes)
+            self._stats["local_hits"] += local_hits
+            self._stats["remote_hits"] += len(remote)
+            self._stats["misses"] += len(hashes) - len(found)
+        return found
+
+    def put_many(self, vectors: Dict[str, List[float]]):
+        """벡터를 로컬과 MongoDB에 저장합니다."""
+        if not vectors:
+            return
+        blobs = {h: self._encode(v) for h, v in vectors.items()}
+        self._put_local(blobs)
+
+        if self.mongo_collection is not None:
+            from pymongo import UpdateOne
+            self.mongo_collection.bulk_write([
+                UpdateOne(
+                    {"model": self.model, "chunk_hash": h},
+                    {"$setOnInsert": {"model": self.model, "chunk_hash": h, "vector": blob}},
+                    upsert=True
+                )
+                for h, blob in blobs.items()
+            ], ordered=False)
+
+    def _put_local(self, blobs: Dict[str, bytes]):
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO embeddings (model, chunk_hash, vector) VALUES (?, ?, ?)",
+                [(self.model, h, blob) for h, blob in blobs.items()]
+            )
+            self._conn.commit()
+
+    def embed_documents(self, texts: List[str], embed_fn) -> List[List[float]]:
+        """캐시에 없는 텍스트만 embed_fn으로 임베딩하여 입력 순서대로 반환합니다."""
+        hashes = [content_hash(text) for text in texts]
+        found = self.get_many(hashes)
+
+        missing = {}
+        for h, text in zip(hashes, texts):
+            if h not in found and h not in missing:
+                missing[h] = text
+
+        if missing:
+            computed = embed_fn(list(missing.values()))
+            new_vectors = dict(zip(missing.keys(), computed))
+            self.put_many(new_vectors)
+            found.update(new_vectors)
+            with self._lock:
+                self._stats["embedded"] += len(missing)
+
+        return [list(found[h]) for h in hashes]
+
+    def stats(self) -> dict:
+        with self._lock:
+            hits = self._stats["local_hits"] + self._stats["remote_hits"]
+            return {
+                **self._stats,
+                "model": self.model,
+                "hit_rate": round(hits / self._stats["lookups"], 4) if self._stats["lookups"] else 0.0
+            }
+
+
+class CachedEmbeddings(Embeddings):
+    """LangChain Embeddings를 감싸 EmbeddingCache를 먼저 조회합니다.
+
+    FAISS.from_documents, Chroma.from_documents 등 Embeddings를 받는 곳에
+    그대로 넘길 수 있습니다.
+    """
+
+    def __init__(self, embeddings: Embeddings, cache: Optional[EmbeddingCache] = None, mongo_collection=None):
+        self.embeddings = embeddings
+        model = getattr(embeddings, 'model', None) or getattr(embeddings, 'model_name', None) or type(embeddings).__name__
+        self.cache = cache or EmbeddingCache(model, mongo_collection=mongo_collection)
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self.cache.embed_documents(texts, self.embeddings.embed_documents)
+
+    def embed_query(self, text: str) -> List[float]:
+        # 질의 임베딩은 모델에 따라 문서 임베딩과 다를 수 있으므로 캐시하지 않습니다
+        return self.embeddings.embed_query(text)
@@ -0,0 +1,37 @@
+"""
+ASGI 서버(asgi.py)를 여러 워커 프로세스로 실행하는 gunicorn 설정입니다.
+
+    gunicorn -c gunicorn.conf.py asgi:app
+
+preload_app으로 마스터가 server.py를 한 번만 불러오므로, 시작 시 적재하는 벡터 인덱스와
+모델 설정을 워커들이 copy-on-write로 공유합니다. fork 이후 프로세스별로 다시 만들어야
+하는 자원은 post_fork에서 정리합니다.
+"""
+import multiprocessing
+import os
+
+bind = os.getenv('GUNICORN_BIND', '0.0.0.0:5000')
+workers = int(os.getenv('WEB_CONCURRENCY', str(multiprocessing.cpu_count())))
+worker_class = 'uvicorn.workers.UvicornWorker'
+preload_app = True
+timeout = int(os.getenv('GUNICORN_TIMEOUT', '300'))  # 소장 생성은 수십 초 걸릴 수 있음
+graceful_timeout = int(os.getenv('GUNICORN_GRACEFUL_TIMEOUT', '30'))
+keepalive = 5
+
+# 마스터에서는 로컬 Whisper 워커 프로세스를 띄우지 않음 (워커마다 post_fork에서 띄움)
+os.environ.setdefault('LOCAL_WHISPER_PREWARM', 'false')
+
+
+def post_fork(arbiter, worker):
+    import async_db
+    from server import services
+
+    async_db.reset_async_clients()
+    services.after_fork()
+
+
+def worker_exit(arbiter, worker):
+    from server import mongodb_manager
+
+    # 워커 프로세스가 끝나기 전에 대기열에 남은 로그를 저장
+    mongodb_manager.log_writer.close()
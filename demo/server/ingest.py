@@ -0,0 +1,109 @@
+"""
+참고 문서 디렉토리(.docx/.pdf)를 청크로 나누어 document_chunks에 적재합니다.
+
+사용 예시:
+    python ingest.py ../data --doc-type claim --batch-size 256
+
+doc_type을 지정하지 않으면 파일 이름(확장자 제외)을 doc_type으로 사용합니다.
+이미 저장된 청크와 임베딩 캐시에 있는 청크는 임베딩 모델을 호출하지 않습니다.
+
+서버 모듈을 불러오지 않고 MongoDB와 임베딩 캐시에 직접 연결합니다. 실행 중인 서버는
+VECTOR_INDEX_REFRESH_SECONDS(기본 60초)마다 새 청크를 벡터 인덱스에 추가하므로 재시작할 필요가 없습니다.
+"""
+import argparse
+import os
+import sys
+
+from dotenv import load_dotenv
+from langchain.text_splitter import CharacterTextSplitter
+from langchain_community.embeddings import OpenAIEmbeddings
+from pymongo import MongoClient
+
+from chunk_store import save_chunks_bulk
+from embedding_cache import CachedEmbeddings, EmbeddingCache
+
+
+def read_docx(path: str) -> str:
+    from docx import Document
+    return "\n".join(paragraph.text for paragraph in Document(path).paragraphs)
+
+
+def read_pdf(path: str) -> str:
+    from pypdf import PdfReader
+    return "\n".join(page.extract_text() or "" for page in PdfReader(path).pages)
+
+
+READERS = {
+    ".docx": read_docx,
+    ".pdf": read_pdf,
+}
+
+
+def iter_chunks(directory: str, doc_type: str = None, chunk_size: int = 1000, chunk_overlap: int = 200):
+    """디렉토리의 문서를 하나씩 읽어 (content, doc_type) 청크를 반환합니다."""
+    splitter = CharacterTextSplitter(separator="\n", chunk_size=chunk_size, chunk_overlap=chunk_overlap)
+
+    for root, _, files in os.walk(directory):
+        for filename in sorted(files):
+            extension = os.path.splitext(filename)[1].lower()
+            if extension not in READERS:
+                continue
+
+            path = os.path.join(root, filename)
+            try:
+                text = READERS[extension](path)
+            except Exception as e:
+                print(f"문서 읽기 실패: {path} ({str(e)})")
+                continue
+
+            file_doc_type = doc_type or os.path.splitext(filename)[0]
+            chunks = [chunk for chunk in splitter.split_text(text) if chunk.strip()]
+            print(f"{path}: {len(chunks)}개 청크 (doc_type={file_doc_type})")
+            for chunk in chunks:
+                yield chunk, file_doc_type
+
+
+def main():
+    parser = argparse.ArgumentParser(description="참고 문서를 document_chunks에 적재합니다.")
+    parser.add_argument("directory", help=".docx/.pdf 파일이 있는 디렉토리")
+    parser.add_argument("--doc-type", default=None, help="모든 청크에 사용할 doc_type (기본값: 파일 이름)")
+    parser.add_argument("--chunk-size", type=int, default=1000)
+    parser.add_argument("--chunk-overlap", type=int, default=200)
+    parser.add_argument("--batch-size", type=int, default=256)
+    args = parser.parse_args()
+
+    if not os.path.isdir(args.directory):
+        print(f"디렉토리를 찾을 수 없습니다: {args.directory}")
+        sys.exit(1)
+
+    load_dotenv()
+    mongo_uri = os.getenv('MONGO_URI')
+    if not mongo_uri:
+        print("MONGO_URI 환경 변수가 설정되지 않았습니다.")
+        sys.exit(1)
+
+    # 서버와 같은 컬렉션과 임베딩 캐시를 사용
+    client = MongoClient(mongo_uri)
+    db = client[os.getenv('MONGODB_DB', 'herelaw')]
+    embeddings = OpenAIEmbeddings(api_key=os.getenv("OPENAI_API_KEY"))
+    embedding_cache = EmbeddingCache(embeddings.model, mongo_collection=db['embedding_cache'])
+
+    try:
+        stats = save_chunks_bulk(
+            db['document_chunks'],
+            CachedEmbeddings(embeddings, embedding_cache),
+            iter_chunks(args.directory, args.doc_type, args.chunk_size, args.chunk_overlap),
+            batch_size=args.batch_size
+        )
+    finally:
+        client.close()
+
+    print(f"적재 완료: {stats['processed']}개 처리, {stats['inserted']}개 저장, "
+          f"{stats['skipped']}개 건너뜀, {stats['embedded']}개 임베딩")
+    print(f"소요 시간: {stats['elapsed_seconds']}초 ({stats['chunks_per_second']} chunks/s)")
+    print(f"임베딩 캐시: {embedding_cache.stats()}")
+    print(f"실행 중인 서버는 {os.getenv('VECTOR_INDEX_REFRESH_SECONDS', '60')}초 안에 새 청크를 검색에 반영합니다.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""
+Flask 서버와 ASGI 서버(asgi.py)의 /api/generate-complaint, /api/sessions 처리량과 지연 시간을 비교합니다.
+
+사용 예시:
+    # 터미널 1: SERVER_MODE=flask 로 Flask 서버 (포트 5000)
+    # 터미널 2: GUNICORN_BIND=0.0.0.0:8000 gunicorn -c gunicorn.conf.py asgi:app
+    python loadtest.py --target flask=http://localhost:5000/api --target asgi=http://localhost:8000/api \
+        --username bench --password bench-password --register \
+        --endpoint sessions --concurrency 200 --requests 2000
+
+generate 엔드포인트는 실제로 OpenAI를 호출하므로 --requests를 작게 잡습니다. 응답 캐시에
+적중하지 않도록 요청마다 상담 내용 끝에 번호를 붙이며, 캐시 적중 수도 함께 출력합니다.
+"""
+import argparse
+import asyncio
+import time
+import uuid
+from collections import Counter
+
+import httpx
+
+from bench_login import SAMPLE_INPUT, percentile
+
+
+async def login(client: httpx.AsyncClient, base_url: str, args) -> str:
+    if args.register:
+        await client.post(f"{base_url}/register", json={
+            "username": args.username, "password": args.password, "email": f"{args.username}@example.com"
+        })
+    response = await client.post(f"{base_url}/login", json={"username": args.username, "password": args.password})
+    response.raise_for_status()
+    return response.json()["token"]
+
+
+def make_request(endpoint: str, base_url: str, index: int):
+    """(메서드, URL, JSON 본문)을 반환합니다."""
+    if endpoint == "generate":
+        return "POST", f"{base_url}/generate-complaint", {
+            "user_input": f"{SAMPLE_INPUT}\n(부하 테스트 {index} {uuid.uuid4().hex[:8]})"
+        }
+    return "GET", f"{base_url}/sessions?limit=20", None
+
+
+async def run(name: str, base_url: str, endpoint: str, args) -> dict:
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    async with httpx.AsyncClient(timeout=args.timeout, limits=limits) as client:
+        token = await login(client, base_url, args)
+        headers = {"Authorization": f"Bearer {token}"}
+        latencies, statuses, cache_hits = [], Counter(), 0
+        counter = iter(range(args.requests))
+
+        async def worker():
+            nonlocal cache_hits
+            for index in counter:
+                method, url, body = make_request(endpoint, base_url, index)
+                started = time.perf_counter()
+                try:
+                    response = await client.request(method, url, json=body, headers=headers)
+                    statuses[response.status_code] += 1
+                    if response.status_code == 200:
+                        latencies.append((time.perf_counter() - started) * 1000)
+                        if endpoint == "generate" and response.json().get("cache", {}).get("hit"):
+                            cache_hits += 1
+                except httpx.HTTPError as e:
+                    statuses[type(e).__name__] += 1
+
+        started = time.perf_counter()
+        await asyncio.gather(*[worker() for _ in range(args.concurrency)])
+        elapsed = time.perf_counter() - started
+
+    return {
+        "target": name,
+        "endpoint": endpoint,
+        "requests": args.requests,
+        "seconds": elapsed,
+        "rps": len(latencies) / elapsed if elapsed else 0.0,
+        "statuses": dict(statuses),
+        "cache_hits": cache_hits,
+        "p50": percentile(latencies, 50),
+        "p95": percentile(latencies, 95),
+        "p99": percentile(latencies, 99)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Flask/ASGI 서버의 처리량과 지연 시간을 비교합니다.")
+    parser.add_argument("--target", action="append", required=True, help="이름=기본 URL (여러 번 지정)")
+    parser.add_argument("--username", required=True)
+    parser.add_argument("--password", required=True)
+    parser.add_argument("--register", action="store_true", help="사용자가 없으면 먼저 등록")
+    parser.add_argument("--endpoint", choices=["sessions", "generate", "both"], default="both")
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--timeout", type=float, default=300.0)
+    args = parser.parse_args()
+
+    endpoints = ["sessions", "generate"] if args.endpoint == "both" else [args.endpoint]
+    results = []
+    for target in args.target:
+        name, base_url = target.split("=", 1)
+        for endpoint in endpoints:
+            print(f"{name} {endpoint}: {args.requests}회, 동시 {args.concurrency}")
+            results.append(asyncio.run(run(name, base_url.rstrip("/"), endpoint, args)))
+
+    print(f"\n{'target':<10}{'endpoint':<10}{'rps':>8}{'p50':>9}{'p95':>9}{'p99':>9}  상태 코드")
+    for r in results:
+        print(f"{r['target']:<10}{r['endpoint']:<10}{r['rps']:>8.1f}{r['p50']:>7.0f}ms{r['p95']:>7.0f}ms"
+              f"{r['p99']:>7.0f}ms  {r['statuses']}" + (f" 캐시 적중 {r['cache_hits']}" if r['endpoint'] == "generate" else ""))
+
+
+if __name__ == "__main__":
+    main()
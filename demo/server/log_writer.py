@@ -0,0 +1,259 @@
+import atexit
+import glob
+import os
+import queue
+import threading
+import time
+from datetime import datetime
+from typing import List, Optional
+
+from bson import ObjectId, json_util
+from pymongo.errors import BulkWriteError, PyMongoError
+
+_STOP = object()
+
+
+class LogWriter:
+    """로그 문서를 메모리 대기열에 모았다가 백그라운드 스레드에서 insert_many로 저장합니다.
+
+    batch_size개가 모이거나 flush_interval초가 지나면 순서 없는(unordered) insert_many로
+    저장합니다. MongoDB에 연결할 수 없으면 배치를 spill_dir에 JSON Lines로 남겼다가
+    다시 저장에 성공하면 재전송합니다. _id를 미리 지정하므로 재전송해도 중복 저장되지 않습니다.
+    대기열이 가득 차면 요청을 막지 않도록 로그를 버리고 dropped로 셉니다.
+    """
+
+    def __init__(self, collection, batch_size: int = 500, flush_interval: float = 1.0,
+                 max_queue: int = 10000, spill_dir: Optional[str] = None, max_spill_bytes: int = 512 * 1024 * 1024):
+        self.collection = collection
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_queue = max_queue
+        self.spill_dir = spill_dir
+        self.max_spill_bytes = max_spill_bytes
+        self._lock = threading.Lock()
+        self._pid = None
+        self._queue = None
+        self._thread = None
+        self._stats = {"written": 0, "batches": 0, "dropped": 0, "spilled": 0, "replayed": 0, "failed": 0}
+        self._last_error = None
+        self._last_replay = 0.0
+        self._atexit_registered = False
+
+    def _ensure_started(self):
+        # fork된 자식은 부모의 대기열과 스레드를 쓰지 않고 새로 시작
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._queue = queue.Queue(maxsize=self.max_queue)
+            self._thread = threading.Thread(target=self._run, name="log-writer", daemon=True)
+            self._thread.start()
+            self._pid = os.getpid()
+            if not self._atexit_registered:
+                atexit.register(self.close)
+                self._atexit_registered = True
+
+    def write(self, doc: dict) -> Optional[ObjectId]:
+        """로그를 대기열에 넣고 미리 지정한 _id를 반환합니다. 대기열이 가득 차면 None을 반환합니다."""
+        self._ensure_started()
+        doc.setdefault("_id", ObjectId())
+        doc.setdefault("created_at", datetime.utcnow())
+        try:
+            self._queue.put_nowait(doc)
+        except queue.Full:
+            with self._lock:
+                self._stats["dropped"] += 1
+            return None
+        return doc["_id"]
+
+    def flush(self, timeout: float = 10.0) -> bool:
+        """지금까지 넣은 로그가 저장(또는 spill)될 때까지 기다립니다."""
+        if self._pid != os.getpid():
+            return True
+        done = threading.Event()
+        try:
+            self._queue.put(done, timeout=timeout)
+        except queue.Full:
+            return False
+        return done.wait(timeout)
+
+    def close(self, timeout: float = 10.0):
+        """남은 로그를 저장하고 백그라운드 스레드를 멈춥니다 (atexit에서 호출)."""
+        if self._pid != os.getpid() or not self._thread.is_alive():
+            return
+        try:
+            self._queue.put(_STOP, timeout=timeout)
+        except queue.Full:
+            return
+        self._thread.join(timeout)
+
+    def _run(self):
+        log_queue = self._queue
+        while True:
+            batch: List[dict] = []
+            waiters = []
+            stop = False
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size:
+                try:
+                    item = log_queue.get(timeout=max(0.0, deadline - time.monotonic()))
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    stop = True
+                    break
+                if isinstance(item, threading.Event):
+                    waiters.append(item)
+                    break
+                batch.append(item)
+
+            if stop:
+                # 대기열에 남은 로그까지 모두 저장
+                while True:
+                    try:
+                        item = log_queue.get_nowait()
+                    except queue.Empty:
+                        break
+                    if isinstance(item, threading.Event):
+                        waiters.append(item)
+                    elif item is not _STOP:
+                        batch.append(item)
+
+            try:
+                if batch:
+                    self._write_batch(batch)
+                elif self.spill_dir and time.monotonic() - self._last_replay > 30:
+                    self._replay_spilled()
+            except Exception as e:
+                # 예상하지 못한 오류로 스레드가 멈추면 이후 로그가 모두 쌓이기만 하므로 배치만 버리고 계속
+                print(f"로그 저장 중 예상하지 못한 오류: {str(e)}")
+                with self._lock:
+                    self._stats["failed"] += len(batch)
+                    self._last_error = str(e)
+            for waiter in waiters:
+                waiter.set()
+            if stop:
+                return
+
+    def _write_batch(self, batch: List[dict]):
+        try:
+            self._insert_batch(batch)
+            with self._lock:
+                self._stats["batches"] += 1
+        except PyMongoError as e:
+            print(f"로그 저장 중 오류: {str(e)}")
+            with self._lock:
+                self._last_error = str(e)
+            self._spill(batch)
+            return
+        # 저장에 성공했으면 이전에 남긴 로그도 재전송
+        if self.spill_dir and time.monotonic() - self._last_replay > 30:
+            self._replay_spilled()
+
+    def _insert(self, batch: List[dict]) -> int:
+        """순서 없이 저장하고 이미 저장된 _id(중복 키)는 무시합니다. 저장한 문서 수를 반환합니다."""
+        try:
+            inserted = len(self.collection.insert_many(batch, ordered=False).inserted_ids)
+        except BulkWriteError as e:
+            errors = e.details.get("writeErrors", [])
+            other_errors = [error for error in errors if error.get("code") != 11000]
+            inserted = e.details.get("nInserted", 0)
+            if other_errors:
+                print(f"로그 일부 저장 실패: {len(other_errors)}건, {other_errors[0].get('errmsg')}")
+                with self._lock:
+                    self._stats["failed"] += len(other_errors)
+        with self._lock:
+            self._stats["written"] += inserted
+        return inserted
+
+    def _insert_batch(self, batch: List[dict]):
+        """_insert와 같지만 BSON으로 바꿀 수 없는 문서가 있으면 한 건씩 다시 저장하여 그 문서만 failed로 셉니다.
+
+        MongoDB 연결 오류(PyMongoError)는 그대로 올려 보내 배치를 spill하게 합니다.
+        """
+        try:
+            self._insert(batch)
+            return
+        except PyMongoError:
+            raise
+        except Exception as e:
+            print(f"로그 배치 변환 오류, 한 건씩 다시 저장: {str(e)}")
+        for doc in batch:
+            try:
+                self._insert([doc])
+            except PyMongoError:
+                raise
+            except Exception as e:
+                with self._lock:
+                    self._stats["failed"] += 1
+                    self._last_error = str(e)
+
+    def _spill_size(self) -> int:
+        return sum(os.path.getsize(path) for path in glob.glob(os.path.join(self.spill_dir, "*.jsonl")))
+
+    def _spill(self, batch: List[dict]):
+        if not self.spill_dir:
+            with self._lock:
+                self._stats["dropped"] += len(batch)
+            return
+        try:
+            os.makedirs(self.spill_dir, exist_ok=True)
+            if self._spill_size() >= self.max_spill_bytes:
+                with self._lock:
+                    self._stats["dropped"] += len(batch)
+                return
+            lines = []
+            for doc in batch:
+                try:
+                    lines.append(json_util.dumps(doc, ensure_ascii=False) + "\n")
+                except (TypeError, ValueError) as e:
+                    with self._lock:
+                        self._stats["failed"] += 1
+                        self._last_error = str(e)
+            path = os.path.join(self.spill_dir, f"logs-{os.getpid()}.jsonl")
+            with open(path, "a", encoding="utf-8") as f:
+                f.writelines(lines)
+            with self._lock:
+                self._stats["spilled"] += len(lines)
+        except OSError as e:
+            print(f"로그 디스크 저장 중 오류: {str(e)}")
+            with self._lock:
+                self._stats["dropped"] += len(batch)
+
+    def _replay_spilled(self):
+        """spill_dir에 남은 로그를 다시 저장합니다. 파일 이름을 바꿔 다른 프로세스와 겹치지 않게 합니다."""
+        self._last_replay = time.monotonic()
+        for path in glob.glob(os.path.join(self.spill_dir, "*.jsonl")):
+            claimed = f"{path}.replaying-{os.getpid()}"
+            try:
+                os.rename(path, claimed)
+            except OSError:
+                continue  # 다른 프로세스가 먼저 가져감
+            try:
+                with open(claimed, encoding="utf-8") as f:
+                    docs = [json_util.loads(line) for line in f if line.strip()]
+                for start in range(0, len(docs), self.batch_size):
+                    self._insert_batch(docs[start:start + self.batch_size])
+                os.remove(claimed)
+                with self._lock:
+                    self._stats["replayed"] += len(docs)
+            except (OSError, ValueError, PyMongoError) as e:
+                print(f"로그 재전송 중 오류: {str(e)}")
+                # 다음 재전송 때 다시 시도 (그 사이 같은 이름으로 spill된 파일을 덮어쓰지 않도록 새 이름 사용)
+                try:
+                    os.rename(claimed, os.path.join(self.spill_dir, f"logs-{os.getpid()}-{time.time_ns()}.jsonl"))
+                except OSError:
+                    pass
+                return
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                **self._stats,
+                "queued": self._queue.qsize() if self._queue is not None else 0,
+                "max_queue": self.max_queue,
+                "batch_size": self.batch_size,
+                "flush_interval": self.flush_interval,
+                "last_error": self._last_error
+            }
@@ -1,5 +1,6 @@
-from flask import Flask, request, jsonify
+from flask import Flask, request, jsonify, Response, stream_with_context
 import os
+import openai
 from dotenv import load_dotenv
 from flask_cors import CORS
 from langchain_community.vectorstores import FAISS
@@ -7,7 +8,8 @@ from langchain_community.embeddings import OpenAIEmbeddings
 from langchain.text_splitter import CharacterTextSplitter
 from langchain.chains import RetrievalQA
 from langchain_community.llms import OpenAI
-from pymongo import MongoClient
+from pymongo import MongoClient, ReturnDocument, UpdateOne
+from pymongo.errors import DuplicateKeyError, OperationFailure
 from datetime import datetime, timedelta
 import uuid
 import hashlib
@@ -15,8 +17,9 @@ from sklearn.preprocessing import StandardScaler
 import numpy as np
 from docx import Document
 from langsmith import Client
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Tuple
 import json
+import base64
 from moviepy import AudioFileClip
 import jwt
 from werkzeug.security import generate_password_hash, check_password_hash
@@ -24,8 +27,6 @@ from functools import wraps
 from bson import ObjectId
 import speech_recognition as sr
 import os
-from werkzeug.utils import secure_filename
-import subprocess
 from io import BytesIO
 from flask import send_file
 from bson.errors import InvalidId
@@ -33,29 +34,392 @@ from flask_sock import Sock
 import tempfile
 import wave
 import io
+from vector_index import VectorIndex
+from embedding_cache import CachedEmbeddings, EmbeddingCache
+from chunk_store import save_chunks_bulk
+from log_writer import LogWriter
+from audio_pipeline import (
+    AudioConversionError, AudioTooLarge, InMemoryUploadRequest, TranscodePool, TranscodeQueueFull,
+    map_time, pcm_duration, pcm_to_wav, preprocess_pcm, split_at_silence, split_pcm
+)
+from stt_engine import EngineSaturated, LocalWhisperEngine
+from transcription_cache import TranscriptionCache, cache_entry, complete_entry, pcm_key
+from streaming_stt import FfmpegStreamDecoder, StreamingTranscriptionSession, VadSegmenter
+import threading
+import time
+import queue
+import bisect
+from collections import Counter, OrderedDict
+import unicodedata
+from concurrent.futures import Future, ThreadPoolExecutor
+import asyncio
 
 app = Flask(__name__)
-CORS(app, resources={r"/api/*": {"origins": ["http://herelaw.nomadseoul.com", "http://localhost:3000"], "supports_credentials": True}})
+app.request_class = InMemoryUploadRequest  # 업로드 파일을 임시 파일 없이 메모리에 받음
+CORS_ORIGINS = ["http://herelaw.nomadseoul.com", "http://localhost:3000"]
+CORS(app, resources={r"/api/*": {"origins": CORS_ORIGINS, "supports_credentials": True, "expose_headers": ["X-Next-Cursor"]}})
 app.config['JWT_SECRET_KEY'] = os.getenv('JWT_SECRET_KEY', 'your-secret-key')  # 실제 배포 시에는 반드시 환경 변수로 설정해야 합니다
-app.config['UPLOAD_FOLDER'] = './uploads'
+app.config['MAX_CONTENT_LENGTH'] = int(os.getenv('AUDIO_MAX_UPLOAD_MB', '100')) * 1024 * 1024
 
 sock = Sock(app)
 
 # Load environment variables
 load_dotenv()
 
+def encode_session_cursor(created_at: datetime, doc_id) -> str:
+    """(created_at, _id) 위치를 페이지 커서 문자열로 변환합니다."""
+    payload = {
+        "t": created_at.isoformat(),
+        "id": str(doc_id),
+        "oid": isinstance(doc_id, ObjectId)
+    }
+    return base64.urlsafe_b64encode(json.dumps(payload).encode()).decode().rstrip('=')
+
+def decode_session_cursor(cursor: str) -> Tuple[datetime, object]:
+    """페이지 커서를 (created_at, _id)로 변환합니다. 잘못된 커서는 ValueError를 발생시킵니다."""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        doc_id = ObjectId(payload["id"]) if payload.get("oid") else payload["id"]
+        return datetime.fromisoformat(payload["t"]), doc_id
+    except (KeyError, TypeError, ValueError, InvalidId) as e:
+        raise ValueError(f"잘못된 커서입니다: {cursor}") from e
+
+def query_session_page(collection, user_id: str, limit: int = 20,
+                       cursor: Optional[str] = None) -> Tuple[List[dict], Optional[str]]:
+    """
+    (user_id, created_at, _id) 복합 인덱스를 사용해 세션 요약을 keyset 방식으로 조회합니다.
+
+    본문(consultation_text, generated_content)은 제외하고 미리보기만 반환하므로,
+    전체 내용은 /api/sessions/<id>로 조회해야 합니다.
+    """
+    pipeline = session_page_pipeline(user_id, limit, cursor)
+    return finish_session_page(list(collection.aggregate(pipeline)), limit)
+
+def session_page_pipeline(user_id: str, limit: int = 20, cursor: Optional[str] = None) -> List[dict]:
+    """세션 요약 한 페이지(limit + 1개)를 조회하는 집계 파이프라인을 만듭니다."""
+    query = {"user_id": user_id}
+    if cursor:
+        created_at, doc_id = decode_session_cursor(cursor)
+        query["$or"] = [
+            {"created_at": {"$lt": created_at}},
+            {"created_at": created_at, "_id": {"$lt": doc_id}}
+        ]
+
+    return [
+        {"$match": query},
+        {"$sort": {"created_at": -1, "_id": -1}},
+        {"$limit": limit + 1},
+        {"$project": {
+            "_id": 1,
+            "session_id": 1,
+            "created_at": 1,
+            "title": 1,
+            "rating": 1,
+            "status": 1,
+            "has_feedback": 1,
+            "job_status": "$job.status",
+            "preview": {"$cond": [
+                {"$eq": [{"$type": "$consultation_text"}, "string"]},
+                {"$substrCP": ["$consultation_text", 0, 100]},
+                ""
+            ]}
+        }}
+    ]
+
+def finish_session_page(docs: List[dict], limit: int) -> Tuple[List[dict], Optional[str]]:
+    """session_page_pipeline 결과를 (세션 목록, 다음 커서)로 변환합니다."""
+    next_cursor = None
+    if len(docs) > limit:
+        docs = docs[:limit]
+        next_cursor = encode_session_cursor(docs[-1]["created_at"], docs[-1]["_id"])
+
+    for doc in docs:
+        doc_id = doc.pop("_id")
+        doc.setdefault("session_id", str(doc_id))
+    return docs, next_cursor
+
+class PasswordHasherBusy(Exception):
+    """비밀번호 해시 대기열이 가득 찬 경우 발생합니다."""
+
+    def __init__(self, retry_after: int):
+        super().__init__("비밀번호 처리 요청이 많습니다.")
+        self.retry_after = retry_after
+
+class PasswordHasher:
+    """비밀번호 해시 생성과 검증(느린 KDF)을 전용 스레드 풀에서 실행합니다.
+
+    동시에 실행되는 KDF 수를 workers로 제한하여 로그인이 몰려도 소장 생성 등
+    다른 요청이 CPU를 계속 사용할 수 있게 합니다. 대기 중인 작업이 max_pending을
+    넘으면 PasswordHasherBusy를 발생시킵니다.
+    """
+
+    def __init__(self, workers: int = 2, max_pending: int = 64):
+        self.workers = workers
+        self.max_pending = max_pending
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="password-hasher")
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._avg_seconds = 0.1  # 평균 KDF 시간(초), 지수 이동 평균
+        self._stats = {"hashed": 0, "verified": 0, "rejected": 0}
+
+    def _submit(self, kind: str, func, *args) -> Future:
+        with self._lock:
+            if self._pending >= self.max_pending:
+                self._stats["rejected"] += 1
+                raise PasswordHasherBusy(max(1, int(self._avg_seconds * self._pending / self.workers)))
+            self._pending += 1
+
+        def task():
+            started = time.perf_counter()
+            try:
+                return func(*args)
+            finally:
+                with self._lock:
+                    self._avg_seconds = 0.9 * self._avg_seconds + 0.1 * (time.perf_counter() - started)
+                    self._stats[kind] += 1
+
+        future = self.executor.submit(task)
+        future.add_done_callback(self._release)
+        return future
+
+    def _release(self, _future):
+        with self._lock:
+            self._pending -= 1
+
+    def hash(self, password: str) -> str:
+        return self._submit("hashed", generate_password_hash, password).result()
+
+    def verify(self, password_hash: str, password: str) -> bool:
+        return self._submit("verified", check_password_hash, password_hash, password).result()
+
+    async def hash_async(self, password: str) -> str:
+        """이벤트 루프를 막지 않고 해시를 생성합니다."""
+        return await asyncio.wrap_future(self._submit("hashed", generate_password_hash, password))
+
+    async def verify_async(self, password_hash: str, password: str) -> bool:
+        """이벤트 루프를 막지 않고 비밀번호를 검증합니다."""
+        return await asyncio.wrap_future(self._submit("verified", check_password_hash, password_hash, password))
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                **self._stats,
+                "workers": self.workers,
+                "pending": self._pending,
+                "max_pending": self.max_pending,
+                "avg_ms": round(self._avg_seconds * 1000, 1)
+            }
+
+# 프로세스 전체에서 공유하는 비밀번호 해시 풀
+password_hasher = PasswordHasher(
+    workers=int(os.getenv('PASSWORD_HASH_WORKERS', '2')),
+    max_pending=int(os.getenv('PASSWORD_HASH_MAX_PENDING', '64'))
+)
+
+class LoginAttemptLimiter:
+    """계정별 로그인 실패 횟수를 MongoDB login_attempts 컬렉션에 세어 일정 시간 로그인을 막습니다.
+
+    window_seconds 안에 max_failures번 실패하면 lockout_seconds 동안 차단하며,
+    차단될 때마다 차단 시간이 두 배로 늘어납니다 (최대 max_lockout_seconds).
+    성공하면 기록을 지웁니다. 기록을 MongoDB에 두므로 여러 워커 프로세스가 같은 한도를 공유하며,
+    오래된 기록은 expires_at TTL 인덱스로 지워집니다.
+    """
+
+    def __init__(self, collection, max_failures: int = 5, window_seconds: float = 300.0,
+                 lockout_seconds: float = 60.0, max_lockout_seconds: float = 3600.0):
+        self.collection = collection
+        self.max_failures = max_failures
+        self.window_seconds = window_seconds
+        self.lockout_seconds = lockout_seconds
+        self.max_lockout_seconds = max_lockout_seconds
+
+    @staticmethod
+    def _key(username: str) -> str:
+        return unicodedata.normalize("NFKC", username).strip().lower()
+
+    def _expires_at(self, now: datetime, locked_until: datetime = None) -> datetime:
+        # 연속 차단 횟수(lockouts)를 기억하도록 최대 차단 시간만큼 더 보관
+        keep_until = max(now + timedelta(seconds=self.window_seconds), locked_until or now)
+        return keep_until + timedelta(seconds=self.max_lockout_seconds)
+
+    def retry_after(self, username: str) -> int:
+        """차단 중이면 남은 시간(초)을, 아니면 0을 반환합니다."""
+        entry = self.collection.find_one({"_id": self._key(username)}, {"locked_until": 1})
+        if not entry or not entry.get("locked_until"):
+            return 0
+        remaining = (entry["locked_until"] - datetime.utcnow()).total_seconds()
+        return int(remaining) + 1 if remaining > 0 else 0
+
+    def record_failure(self, username: str) -> int:
+        """실패를 기록하고, 이번 실패로 차단되었으면 차단 시간(초)을 반환합니다."""
+        now = datetime.utcnow()
+        key = self._key(username)
+        window_cutoff = now - timedelta(seconds=self.window_seconds)
+
+        # 현재 창 안이면 실패 횟수를 올리고, 창이 지났거나 기록이 없으면 새 창을 시작
+        entry = self.collection.find_one_and_update(
+            {"_id": key, "window_start": {"$gte": window_cutoff}},
+            {"$inc": {"failures": 1}, "$set": {"expires_at": self._expires_at(now)}},
+            return_document=ReturnDocument.AFTER
+        )
+        if entry is None:
+            try:
+                self.collection.update_one(
+                    {"_id": key, "$or": [{"window_start": {"$lt": window_cutoff}}, {"window_start": {"$exists": False}}]},
+                    {"$set": {"window_start": now, "failures": 1, "expires_at": self._expires_at(now)}},
+                    upsert=True
+                )
+                failures = 1
+            except DuplicateKeyError:
+                # 다른 요청이 먼저 새 창을 시작함
+                entry = self.collection.find_one_and_update(
+                    {"_id": key},
+                    {"$inc": {"failures": 1}},
+                    return_document=ReturnDocument.AFTER
+                )
+                failures = entry["failures"]
+        else:
+            failures = entry["failures"]
+
+        if failures < self.max_failures:
+            return 0
+
+        # 한도에 도달한 요청 중 하나만 차단을 기록
+        before = self.collection.find_one_and_update(
+            {"_id": key, "failures": {"$gte": self.max_failures}},
+            {"$set": {"failures": 0, "window_start": now}, "$inc": {"lockouts": 1}}
+        )
+        if before is None:
+            return 0
+        lockout = min(self.lockout_seconds * 2 ** before.get("lockouts", 0), self.max_lockout_seconds)
+        locked_until = now + timedelta(seconds=lockout)
+        self.collection.update_one(
+            {"_id": key},
+            {"$set": {"locked_until": locked_until, "expires_at": self._expires_at(now, locked_until)}}
+        )
+        return int(lockout)
+
+    def record_success(self, username: str):
+        self.collection.delete_one({"_id": self._key(username)})
+
+class PrincipalCache:
+    """사용자의 권한 정보(role, level, status, role_version)를 TTL 동안 보관합니다.
+
+    권한이 바뀌면 users 문서의 role_version을 올리고 invalidate를 호출합니다.
+    토큰의 rv 클레임이 캐시된 role_version과 다르면 토큰 발급 이후 권한이 바뀐 것입니다.
+    """
+
+    def __init__(self, users_collection, ttl_seconds: float = 60.0, max_entries: int = 10000):
+        self.users = users_collection
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "invalidations": 0}
+
+    PRINCIPAL_PROJECTION = {"_id": 0, "role": 1, "level": 1, "status": 1, "role_version": 1}
+
+    def get(self, user_id: str) -> Optional[dict]:
+        """캐시된 권한 정보를 반환하고, 없거나 만료되었으면 users에서 조회합니다."""
+        hit, principal = self.cached(user_id)
+        if hit:
+            return principal
+        return self.store(user_id, self.users.find_one({"user_id": user_id}, self.PRINCIPAL_PROJECTION))
+
+    def cached(self, user_id: str) -> Tuple[bool, Optional[dict]]:
+        """(캐시 적중 여부, 권한 정보)를 반환합니다. 조회는 하지 않습니다."""
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is not None and entry[0] > time.monotonic():
+                self._entries.move_to_end(user_id)
+                self._stats["hits"] += 1
+                return True, entry[1]
+            self._stats["misses"] += 1
+            return False, None
+
+    def store(self, user_id: str, user: Optional[dict]) -> Optional[dict]:
+        """조회한 users 문서로 권한 정보를 만들어 캐시하고 반환합니다."""
+        principal = None
+        if user:
+            principal = {
+                "role": user.get("role", "user"),
+                "level": user.get("level", 1),
+                "status": user.get("status", "active"),
+                "role_version": user.get("role_version", 0)
+            }
+
+        with self._lock:
+            self._entries[user_id] = (time.monotonic() + self.ttl_seconds, principal)
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return principal
+
+    def invalidate(self, user_id: str):
+        with self._lock:
+            self._entries.pop(user_id, None)
+            self._stats["invalidations"] += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {**self._stats, "entries": len(self._entries), "ttl_seconds": self.ttl_seconds}
+
 class MongoDBManager:
     def __init__(self, uri):
         if not uri:
             raise ValueError("MongoDB URI is required")
-        self.client = MongoClient(uri)
+        self.uri = uri
+        # 프로세스당 하나의 커넥션 풀을 사용합니다 (ServiceContainer 참고)
+        self.client = MongoClient(
+            uri,
+            maxPoolSize=int(os.getenv('MONGO_MAX_POOL_SIZE', '100')),
+            minPoolSize=int(os.getenv('MONGO_MIN_POOL_SIZE', '0'))
+        )
         self.db = self.client[os.getenv('MONGODB_DB', 'herelaw')]
         self.conversations = self.db[os.getenv('MONGODB_COLLECTION', 'divorce_complaint')]
         self.documents = self.db['document_chunks']
         self.feedback = self.db['feedback']
+        self.feedback_stats = self.db['feedback_stats']  # 피드백 통계 카운터
         self.users = self.db['users']
         self.sessions = self.db['sessions']
         self.logs = self.db['logs']  # Add logs collection
+        # 로그는 백그라운드에서 묶어서 저장 (save_log 참고)
+        self.log_writer = LogWriter(
+            self.logs,
+            batch_size=int(os.getenv('LOG_BATCH_SIZE', '500')),
+            flush_interval=float(os.getenv('LOG_FLUSH_INTERVAL_SECONDS', '1.0')),
+            max_queue=int(os.getenv('LOG_QUEUE_SIZE', '10000')),
+            spill_dir=os.getenv('LOG_SPILL_DIR', os.path.join(os.path.expanduser('~'), '.cache', 'herelaw', 'log-spill')),
+            max_spill_bytes=int(os.getenv('LOG_SPILL_MAX_MB', '512')) * 1024 * 1024
+        )
+        self.principal_cache = PrincipalCache(
+            self.users,
+            ttl_seconds=float(os.getenv('PRINCIPAL_CACHE_TTL_SECONDS', '60'))
+        )
+        # 계정별 로그인 실패 제한 (워커 프로세스 간 공유)
+        self.login_attempts = self.db['login_attempts']
+        self.login_limiter = LoginAttemptLimiter(
+            self.login_attempts,
+            max_failures=int(os.getenv('LOGIN_MAX_FAILURES', '5')),
+            window_seconds=float(os.getenv('LOGIN_FAILURE_WINDOW_SECONDS', '300')),
+            lockout_seconds=float(os.getenv('LOGIN_LOCKOUT_SECONDS', '60'))
+        )
+
+        # document_chunks 임베딩에 대한 프로세스 내 벡터 인덱스 (load_vector_index로 적재)
+        self.vector_search_backend = os.getenv('VECTOR_SEARCH_BACKEND', 'local')
+        self.vector_index = VectorIndex(
+            ivf_threshold=int(os.getenv('VECTOR_INDEX_IVF_THRESHOLD', '20000')),
+            nprobe=int(os.getenv('VECTOR_INDEX_NPROBE', '8'))
+        )
+        # 다른 프로세스(ingest.py 등)가 추가한 청크를 반영하는 주기(초)
+        self.vector_index_refresh_seconds = float(os.getenv('VECTOR_INDEX_REFRESH_SECONDS', '60'))
+        self._vector_index_synced_at = None
+        self._vector_index_checked = 0.0
+        self._vector_index_refresh_lock = threading.Lock()
+        # 청크 임베딩용 (EmbeddingCache를 거치는) 임베딩 모델, ServiceContainer가 설정
+        self.chunk_embeddings = None
+        self._uncached_embeddings = None
 
         print(f"MongoDB 연결 정보:")
         print(f"Database: {self.db.name}")
@@ -63,14 +427,40 @@ class MongoDBManager:
 
         # Create indexes
         self.documents.create_index([("chunk_hash", 1)], unique=True)
+        self.documents.create_index([("created_at", 1)])
         self.feedback.create_index([("session_id", 1)])
         self.users.create_index([("username", 1)], unique=True)
         self.users.create_index([("email", 1)], unique=True)
-        self.sessions.create_index([("user_id", 1)])
-        self.logs.create_index([("user_id", 1)])  # Add logs index
+        self.sessions.create_index([("user_id", 1), ("created_at", -1), ("_id", -1)])
+        self.sessions.create_index([("job.job_id", 1)], sparse=True)
+        self.logs.create_index([("user_id", 1), ("created_at", -1)])
+        self.login_attempts.create_index([("expires_at", 1)], expireAfterSeconds=0)
+        log_ttl_seconds = int(float(os.getenv('LOG_RETENTION_DAYS', '90')) * 86400)
+        try:
+            self.logs.create_index([("created_at", 1)], expireAfterSeconds=log_ttl_seconds, name="created_at_ttl")
+        except OperationFailure:
+            # 보존 기간이 바뀌었으면 기존 TTL 인덱스를 수정
+            self.db.command("collMod", "logs", index={"name": "created_at_ttl", "expireAfterSeconds": log_ttl_seconds})
+
+    def ping(self) -> float:
+        """MongoDB 왕복 시간(ms)을 측정합니다."""
+        started = time.perf_counter()
+        self.client.admin.command('ping')
+        return (time.perf_counter() - started) * 1000
+
+    def pool_status(self) -> dict:
+        """커넥션 풀 설정과 연결된 노드 정보를 반환합니다."""
+        pool_options = self.client.options.pool_options
+        return {
+            "max_pool_size": pool_options.max_pool_size,
+            "min_pool_size": pool_options.min_pool_size,
+            "nodes": [f"{host}:{port}" for host, port in self.client.nodes]
+        }
 
     def create_user(self, username: str, password: str, email: str) -> Optional[str]:
         """새 사용자를 생성합니다."""
+        # 해시 풀이 가득 차면 PasswordHasherBusy를 그대로 전달
+        password_hash = password_hasher.hash(password)
         try:
             print(f"사용자 생성 시도: {username}")
             user_id = str(uuid.uuid4())
@@ -78,12 +468,13 @@ class MongoDBManager:
                 "user_id": user_id,
                 "username": username,
                 "email": email,
-                "password": generate_password_hash(password),
+                "password": password_hash,
                 "created_at": datetime.utcnow(),
                 "last_login": None,
                 "role": "user",  # Default role
                 "level": 1,      # Default level
-                "status": "active"
+                "status": "active",
+                "role_version": 0
             })
             print(f"사용자 생성 결과: {result.inserted_id}")
             return user_id
@@ -102,7 +493,7 @@ class MongoDBManager:
     def verify_user(self, username: str, password: str) -> Optional[dict]:
         """사용자 인증을 수행합니다."""
         user = self.get_user_by_username(username)
-        if user and check_password_hash(user["password"], password):
+        if user and password_hasher.verify(user["password"], password):
             self.users.update_one(
                 {"user_id": user["user_id"]},
                 {"$set": {"last_login": datetime.utcnow()}}
@@ -124,12 +515,10 @@ class MongoDBManager:
         })
         return session_id
 
-    def get_user_sessions(self, user_id: str) -> List[dict]:
-        """사용자의 모든 세션을 조회합니다."""
-        return list(self.sessions.find(
-            {"user_id": user_id},
-            {"_id": 0}
-        ).sort("created_at", -1))
+    def get_user_sessions(self, user_id: str, limit: int = 20,
+                          cursor: Optional[str] = None) -> Tuple[List[dict], Optional[str]]:
+        """사용자의 세션 요약을 최신순으로 한 페이지 조회합니다. (세션 목록, 다음 커서)"""
+        return query_session_page(self.sessions, user_id, limit, cursor)
 
     def update_session(self, session_id: str, rating: Optional[int] = None, 
                       feedback: Optional[str] = None) -> bool:
@@ -148,16 +537,45 @@ class MongoDBManager:
             return result.modified_count > 0
         return False
 
-    def save_chunk(self, content: str, doc_type: str, embedding: List[float]):
+    def get_chunk_embeddings(self):
+        """청크 임베딩 모델을 반환합니다. 워밍업 전이면 캐시를 거치지 않는 OpenAIEmbeddings를 사용합니다."""
+        if self.chunk_embeddings is not None:
+            return self.chunk_embeddings
+        if self._uncached_embeddings is None:
+            print("임베딩 캐시가 준비되지 않아 캐시 없이 임베딩합니다.")
+            self._uncached_embeddings = OpenAIEmbeddings(api_key=os.getenv("OPENAI_API_KEY"))
+        return self._uncached_embeddings
+
+    def save_chunk(self, content: str, doc_type: str, embedding: Optional[List[float]] = None):
+        """청크를 저장합니다. embedding이 없으면 중복 확인 후 캐시를 거쳐 계산합니다."""
         chunk_hash = hashlib.md5(content.encode()).hexdigest()
         if not self.documents.find_one({"chunk_hash": chunk_hash}):
-            self.documents.insert_one({
+            if embedding is None:
+                embedding = self.get_chunk_embeddings().embed_documents([content])[0]
+            result = self.documents.insert_one({
                 "content": content,
                 "doc_type": doc_type,
                 "chunk_hash": chunk_hash,
                 "embedding": embedding,
                 "created_at": datetime.now()
             })
+            self.vector_index.add(doc_type, chunk_hash, content, embedding, doc_id=result.inserted_id)
+
+    def save_chunks_bulk(self, chunks, batch_size: int = 256) -> dict:
+        """
+        청크를 배치 단위로 저장하고 새로 저장한 청크를 벡터 인덱스에 추가합니다.
+
+        Args:
+            chunks: (content, doc_type) 튜플 또는 content/doc_type/embedding 키를 가진 dict의 iterator
+            batch_size (int): 한 번에 임베딩하고 bulk_write할 청크 수
+
+        Returns:
+            dict: 처리/저장/건너뛴 청크 수와 처리량
+        """
+        def add_to_index(doc, doc_id):
+            self.vector_index.add(doc["doc_type"], doc["chunk_hash"], doc["content"], doc["embedding"], doc_id=doc_id)
+
+        return save_chunks_bulk(self.documents, self.get_chunk_embeddings(), chunks, batch_size, on_inserted=add_to_index)
 
     def save_conversation(self, session_id: str, user_input: str, generated_content: Dict):
         conversation = {
@@ -169,22 +587,63 @@ class MongoDBManager:
         self.conversations.insert_one(conversation)
         return conversation
 
+    def load_vector_index(self) -> int:
+        """document_chunks의 임베딩으로 벡터 인덱스를 구성합니다."""
+        started = time.perf_counter()
+        synced_at = datetime.now()
+        loaded = self.vector_index.load(self.documents)
+        self._vector_index_synced_at = synced_at
+        self._vector_index_checked = time.monotonic()
+        print(f"벡터 인덱스 적재 완료: {loaded}개 청크, {time.perf_counter() - started:.2f}초")
+        return loaded
+
+    def refresh_vector_index(self) -> int:
+        """마지막 적재 이후 저장된 청크를 벡터 인덱스에 추가합니다.
+
+        created_at은 저장 시각이므로 조회 시작보다 조금 앞(60초)부터 읽고, 이미 있는 청크는 chunk_hash로 건너뜁니다.
+        """
+        if self._vector_index_synced_at is None:
+            return 0
+        synced_at = datetime.now()
+        added = self.vector_index.load(
+            self.documents,
+            since=self._vector_index_synced_at - timedelta(seconds=60)
+        )
+        self._vector_index_synced_at = synced_at
+        if added:
+            print(f"벡터 인덱스 갱신: {added}개 청크 추가")
+        return added
+
+    def _maybe_refresh_vector_index(self):
+        # 요청 하나만 갱신하고 나머지는 기존 인덱스로 바로 검색
+        if time.monotonic() - self._vector_index_checked < self.vector_index_refresh_seconds:
+            return
+        if not self._vector_index_refresh_lock.acquire(blocking=False):
+            return
+        try:
+            self._vector_index_checked = time.monotonic()
+            self.refresh_vector_index()
+        except Exception as e:
+            print(f"벡터 인덱스 갱신 중 오류: {str(e)}")
+        finally:
+            self._vector_index_refresh_lock.release()
+
     def get_similar_chunks(self, query_embedding: List[float], doc_type: str, k: int = 3):
         """벡터 유사도 검색을 수행합니다."""
+        if self.vector_search_backend == 'local':
+            self._maybe_refresh_vector_index()
+            return self.vector_index.search(query_embedding, doc_type, k)
+
+        # Atlas Search 사용 시 doc_type 필터를 검색 단계에 포함
         pipeline = [
             {
-                "$search": {
+                "$vectorSearch": {
                     "index": "vector_index",
-                    "knnBeta": {
-                        "vector": query_embedding,
-                        "path": "embedding",
-                        "k": k
-                    }
-                }
-            },
-            {
-                "$match": {
-                    "doc_type": doc_type
+                    "path": "embedding",
+                    "queryVector": query_embedding,
+                    "numCandidates": k * 20,
+                    "limit": k,
+                    "filter": {"doc_type": doc_type}
                 }
             }
         ]
@@ -193,7 +652,7 @@ class MongoDBManager:
         return results
 
     def save_feedback(self, feedback_doc):
-        """피드백을 저장합니다."""
+        """피드백을 저장하고 통계 카운터를 갱신합니다."""
         try:
             # 입력값 검증
             if not isinstance(feedback_doc.get('rating'), (int, float)):
@@ -203,7 +662,6 @@ class MongoDBManager:
 
             if result.inserted_id:
                 print(f"피드백 저장 성공: {result.inserted_id}")
-                return result.inserted_id
             else:
                 raise Exception("피드백 저장 실패")
 
@@ -211,45 +669,353 @@ class MongoDBManager:
             print(f"피드백 저장 중 오류: {str(e)}")
             raise e
 
-    def get_feedback_statistics(self):
-        pipeline = [
-            {
-                "$group": {
-                    "_id": None,
-                    "avg_rating": {"$avg": "$rating"},
-                    "count": {"$sum": 1},
-                    "ratings": {"$push": "$rating"}
-                }
+        try:
+            if self.feedback_stats.find_one({"_id": "global"}, {"_id": 1}) is None:
+                # 카운터가 없으면 방금 저장한 피드백까지 포함해 집계로 생성
+                self.rebuild_feedback_statistics()
+            else:
+                self._increment_feedback_counters(feedback_doc)
+        except Exception as e:
+            # 카운터는 rebuild_feedback_statistics로 복구할 수 있으므로 저장은 성공으로 처리
+            print(f"피드백 통계 갱신 중 오류: {str(e)}")
+        return result.inserted_id
+
+    @staticmethod
+    def _rating_bucket(rating: float) -> str:
+        """평점을 1~5 구간으로 변환합니다 (소수점 이하 버림)."""
+        return str(min(5, max(1, int(rating // 1))))
+
+    def _increment_feedback_counters(self, feedback_doc: dict):
+        """전체/일별/사용자별 카운터 문서를 $inc로 갱신합니다."""
+        self.feedback_stats.bulk_write(self._feedback_counter_operations(feedback_doc), ordered=False)
+
+    @classmethod
+    def _feedback_counter_operations(cls, feedback_doc: dict) -> List[UpdateOne]:
+        rating = feedback_doc['rating']
+        created_at = feedback_doc.get('created_at') or datetime.utcnow()
+        increment = {
+            "$inc": {
+                "count": 1,
+                "sum": rating,
+                f"buckets.{cls._rating_bucket(rating)}": 1
             }
+        }
+
+        operations = [
+            UpdateOne({"_id": "global"}, increment, upsert=True),
+            UpdateOne(
+                {"_id": f"day:{created_at.strftime('%Y-%m-%d')}"},
+                {**increment, "$set": {"date": created_at.strftime('%Y-%m-%d')}},
+                upsert=True
+            )
+        ]
+        if feedback_doc.get('user_id'):
+            operations.append(UpdateOne(
+                {"_id": f"user:{feedback_doc['user_id']}"},
+                {**increment, "$set": {"user_id": feedback_doc['user_id']}},
+                upsert=True
+            ))
+        return operations
+
+    def rebuild_feedback_statistics(self):
+        """feedback 컬렉션 전체로부터 카운터 문서를 서버 측 집계로 다시 만듭니다."""
+        for pipeline in self._feedback_statistics_pipelines():
+            self.feedback.aggregate(pipeline)
+
+    @staticmethod
+    def _feedback_statistics_pipelines() -> List[List[dict]]:
+        """전체/일별/사용자별 카운터를 feedback_stats에 $merge하는 집계 파이프라인들입니다."""
+        bucket_expr = {"$toString": {"$toInt": {"$min": [5, {"$max": [1, {"$floor": "$rating"}]}]}}}
+        numeric = {"$match": {"rating": {"$type": "number"}}}
+
+        def merge_stage(id_prefix: str, key_field: Optional[str]):
+            # (키, 구간)별 집계를 키별 buckets 객체로 묶어 feedback_stats에 저장
+            stages = [
+                {"$group": {
+                    "_id": "$_id.key",
+                    "count": {"$sum": "$count"},
+                    "sum": {"$sum": "$sum"},
+                    "buckets": {"$push": {"k": "$_id.bucket", "v": "$count"}}
+                }},
+                {"$project": {
+                    "_id": {"$concat": [id_prefix, {"$toString": "$_id"}]} if key_field else id_prefix,
+                    "count": 1,
+                    "sum": 1,
+                    "buckets": {"$arrayToObject": "$buckets"},
+                    **({key_field: "$_id"} if key_field else {})
+                }},
+                {"$merge": {"into": "feedback_stats", "whenMatched": "replace", "whenNotMatched": "insert"}}
+            ]
+            return stages
+
+        # 전체: $bucket으로 1~5 구간 집계
+        overall = [
+            numeric,
+            {"$bucket": {
+                "groupBy": "$rating",
+                "boundaries": [float('-inf'), 2, 3, 4, 5, float('inf')],
+                "output": {"count": {"$sum": 1}, "sum": {"$sum": "$rating"}}
+            }},
+            {"$project": {
+                "_id": {"key": None, "bucket": {"$toString": {"$toInt": {"$max": [1, "$_id"]}}}},
+                "count": 1,
+                "sum": 1
+            }},
+            *merge_stage("global", None)
         ]
 
-        stats = list(self.feedback.aggregate(pipeline))
-        if stats:
-            return {
-                "average_rating": stats[0]["avg_rating"],
-                "total_feedback": stats[0]["count"],
-                "rating_distribution": np.histogram(stats[0]["ratings"], bins=5)[0].tolist()
+        # 일별
+        per_day = [
+            numeric,
+            {"$group": {
+                "_id": {
+                    "key": {"$dateToString": {"format": "%Y-%m-%d", "date": {"$ifNull": ["$created_at", "$$NOW"]}}},
+                    "bucket": bucket_expr
+                },
+                "count": {"$sum": 1},
+                "sum": {"$sum": "$rating"}
+            }},
+            *merge_stage("day:", "date")
+        ]
+
+        # 사용자별
+        per_user = [
+            numeric,
+            {"$match": {"user_id": {"$exists": True, "$ne": None}}},
+            {"$group": {
+                "_id": {"key": "$user_id", "bucket": bucket_expr},
+                "count": {"$sum": 1},
+                "sum": {"$sum": "$rating"}
+            }},
+            *merge_stage("user:", "user_id")
+        ]
+        return [overall, per_day, per_user]
+
+    @staticmethod
+    def _summarize_counters(doc: Optional[dict]) -> dict:
+        doc = doc or {}
+        count = doc.get("count", 0)
+        buckets = doc.get("buckets", {})
+        return {
+            "count": count,
+            "average_rating": doc["sum"] / count if count else None,
+            "rating_distribution": [buckets.get(str(i), 0) for i in range(1, 6)]
+        }
+
+    def get_feedback_statistics(self, user_id: Optional[str] = None, days: int = 30):
+        """카운터 문서만 읽어 피드백 통계를 반환합니다 (피드백 수와 무관하게 일정한 비용)."""
+        ids, day_ids = self._feedback_counter_ids(user_id, days)
+        counters = {doc["_id"]: doc for doc in self.feedback_stats.find({"_id": {"$in": ids}})}
+        if "global" not in counters:
+            # 카운터가 아직 없으면 기존 피드백으로부터 한 번 생성
+            if not self.feedback.find_one({"rating": {"$type": "number"}}, {"_id": 1}):
+                return None
+            self.rebuild_feedback_statistics()
+            counters = {doc["_id"]: doc for doc in self.feedback_stats.find({"_id": {"$in": ids}})}
+        return self._build_feedback_statistics(counters, day_ids, user_id)
+
+    @staticmethod
+    def _feedback_counter_ids(user_id: Optional[str], days: int) -> Tuple[List[str], List[str]]:
+        """조회할 카운터 문서 ID 목록과 그중 일별 ID 목록을 반환합니다."""
+        today = datetime.utcnow().date()
+        day_ids = [f"day:{(today - timedelta(days=i)).strftime('%Y-%m-%d')}" for i in range(days)]
+        ids = ["global", *day_ids]
+        if user_id:
+            ids.append(f"user:{user_id}")
+        return ids, day_ids
+
+    @classmethod
+    def _build_feedback_statistics(cls, counters: dict, day_ids: List[str], user_id: Optional[str]) -> dict:
+        overall = cls._summarize_counters(counters.get("global"))
+        stats = {
+            "average_rating": overall["average_rating"],
+            "total_feedback": overall["count"],
+            "rating_distribution": overall["rating_distribution"],
+            "per_day": [
+                {"date": day_id[len("day:"):], **cls._summarize_counters(counters[day_id])}
+                for day_id in reversed(day_ids) if day_id in counters
+            ]
+        }
+        if user_id:
+            stats["per_user"] = {"user_id": user_id, **cls._summarize_counters(counters.get(f"user:{user_id}"))}
+        return stats
+
+    def save_log(self, log_data) -> Optional[ObjectId]:
+        """로그를 백그라운드 저장 대기열에 넣고 미리 지정한 _id를 반환합니다.
+
+        MongoDB 왕복을 기다리지 않으며, 대기열이 가득 차 로그를 버렸으면 None을 반환합니다.
+        """
+        return self.log_writer.write(log_data)
+
+    def get_user_logs(self, user_id: str, start: Optional[datetime] = None, end: Optional[datetime] = None,
+                      limit: int = 100) -> List[dict]:
+        """사용자의 로그를 created_at 범위 [start, end)에서 최신순으로 조회합니다."""
+        return list(self.logs.find(self._log_query(user_id, start, end)).sort("created_at", -1).limit(limit))
+
+    @staticmethod
+    def _log_query(user_id: str, start: Optional[datetime], end: Optional[datetime]) -> dict:
+        query = {"user_id": user_id}
+        if start or end:
+            query["created_at"] = {}
+            if start:
+                query["created_at"]["$gte"] = start
+            if end:
+                query["created_at"]["$lt"] = end
+        return query
+
+class BestPracticesSnapshot:
+    """높은 평가를 받은 소장들의 통계를 증분 방식으로 유지합니다.
+
+    상위 window_size개의 소장만 보관하며, 소장이 추가되거나 밀려날 때
+    해당 소장의 특징만 누적 통계에 더하거나 빼므로 전체를 다시 계산하지 않습니다.
+    """
+
+    SECTIONS = ['청구취지', '청구원인', '입증방법', '첨부서류']
+    LEGAL_TERMS = ['원고', '피고', '위자료', '재산분할', '양육권', '가집행']
+
+    def __init__(self, window_size: int = 50, min_samples: int = 10, min_rating: float = 4):
+        self.window_size = window_size
+        self.min_samples = min_samples
+        self.min_rating = min_rating
+        self.version = 0
+        self.entries = []  # (rating, created_at) 오름차순으로 정렬된 항목
+        self.total_length = 0
+        self.phrase_counter = Counter()
+        self.order_counter = Counter()
+        self.term_totals = Counter()
+        self._rendered = None
+
+    @classmethod
+    def _analyze(cls, complaint: str) -> dict:
+        """소장 하나의 특징을 추출합니다."""
+        # 3단어 이상의 문장만 문구로 사용
+        phrases = [s.strip() for s in complaint.split('.') if len(s.strip().split()) >= 3]
+        return {
+            "length": len(complaint),
+            "phrases": phrases,
+            "section_order": tuple(section for section in cls.SECTIONS if section in complaint),
+            "terms": {term: complaint.count(term) for term in cls.LEGAL_TERMS}
+        }
+
+    def _apply(self, features: dict, sign: int):
+        self.total_length += sign * features["length"]
+        for phrase in features["phrases"]:
+            self.phrase_counter[phrase] += sign
+        if features["section_order"]:
+            self.order_counter[features["section_order"]] += sign
+        for term, count in features["terms"].items():
+            self.term_totals[term] += sign * count
+        if sign < 0:
+            # 0이 된 항목 제거
+            self.phrase_counter += Counter()
+            self.order_counter += Counter()
+
+    def add(self, key: str, rating: float, complaint: str, created_at: Optional[datetime] = None) -> bool:
+        """소장을 추가합니다. 상위 목록이 바뀐 경우 True를 반환합니다."""
+        if rating < self.min_rating or not complaint:
+            return False
+        if any(entry["key"] == key for entry in self.entries):
+            return False
+
+        created_at = created_at or datetime.utcnow()
+        sort_key = (rating, created_at)
+        if len(self.entries) >= self.window_size and sort_key <= self.entries[0]["sort_key"]:
+            return False
+
+        entry = {
+            "key": key,
+            "rating": rating,
+            "created_at": created_at,
+            "complaint": complaint,
+            "sort_key": sort_key,
+            "features": self._analyze(complaint)
+        }
+        position = bisect.bisect_left([e["sort_key"] for e in self.entries], sort_key)
+        self.entries.insert(position, entry)
+        self._apply(entry["features"], 1)
+
+        if len(self.entries) > self.window_size:
+            evicted = self.entries.pop(0)
+            self._apply(evicted["features"], -1)
+
+        self.version += 1
+        self._rendered = None
+        return True
+
+    def to_best_practices(self) -> Optional[Dict]:
+        """누적 통계로부터 프롬프트에 사용할 best practices를 만듭니다."""
+        if len(self.entries) < self.min_samples:
+            return None
+        if self._rendered is not None:
+            return self._rendered
+
+        count = len(self.entries)
+        ordered = list(reversed(self.entries))  # 평점 높은 순
+        most_common_order = self.order_counter.most_common(1)
+        avg_length = self.total_length / count
+
+        self._rendered = {
+            'version': self.version,
+            'avg_length': avg_length,
+            'common_phrases': [phrase for phrase, _ in self.phrase_counter.most_common(10)],
+            'section_patterns': {
+                'section_order': [list(e["features"]["section_order"]) for e in ordered if e["features"]["section_order"]],
+                'section_lengths': {},
+                'common_transitions': {},
+                'most_common_order': list(most_common_order[0][0]) if most_common_order else []
+            },
+            'successful_features': {
+                'avg_length': avg_length,
+                'common_legal_terms': {term: self.term_totals[term] / count for term in self.LEGAL_TERMS},
+                'section_coverage': {},
+                'style_patterns': {}
             }
-        return None
+        }
+        return self._rendered
+
+    def to_document(self) -> dict:
+        """MongoDB에 저장할 문서로 변환합니다."""
+        return {
+            "version": self.version,
+            "updated_at": datetime.utcnow(),
+            "entries": [
+                {
+                    "key": e["key"],
+                    "rating": e["rating"],
+                    "created_at": e["created_at"],
+                    "complaint": e["complaint"]
+                }
+                for e in self.entries
+            ],
+            "best_practices": self.to_best_practices()
+        }
 
-    def save_log(self, log_data):
-        """로그를 저장합니다."""
-        try:
-            result = self.logs.insert_one(log_data)
-            if result.inserted_id:
-                print(f"로그 저장 성공: {result.inserted_id}")
-                return result.inserted_id
-            else:
-                raise Exception("로그 저��� 실패")
+    @classmethod
+    def from_document(cls, doc: dict, **kwargs) -> 'BestPracticesSnapshot':
+        """저장된 문서로부터 스냅샷을 복원합니다."""
+        snapshot = cls(**kwargs)
+        for entry in doc.get("entries", []):
+            snapshot.add(entry["key"], entry["rating"], entry["complaint"], entry.get("created_at"))
+        snapshot.version = doc.get("version", 0)
+        snapshot._rendered = None
+        return snapshot
 
-        except Exception as e:
-            print(f"로그 저장 중 오류: {str(e)}")
-            raise e
 class ReinforcementLearner:
     def __init__(self, mongo_db):
         self.mongo_db = mongo_db
         self.scaler = StandardScaler()
         self.min_feedback_samples = 10
+        self.snapshot_window = 50
+        # 캐시된 스냅샷을 다시 읽기 전까지 허용하는 최대 시간(초)
+        self.snapshot_ttl = float(os.getenv('BEST_PRACTICES_TTL_SECONDS', '300'))
+        self.snapshots = mongo_db.db['best_practices']
+
+        self._lock = threading.Lock()
+        self._snapshot = None        # 쓰기용 전체 스냅샷
+        self._best_practices = None  # 읽기용 캐시
+        self._version = None
+        self._loaded_at = 0.0
+        self._snapshot_persisted = False
 
     def extract_features(self, complaint: str) -> List[float]:
         """소장에서 특징 추출"""
@@ -293,155 +1059,272 @@ class ReinforcementLearner:
 
         return final_reward
 
+    @property
+    def snapshot_version(self) -> Optional[int]:
+        """현재 캐시된 best practices 스냅샷의 버전입니다."""
+        self.get_best_practices()
+        return self._version
+
     def get_best_practices(self) -> Dict:
-        """높은 평가를 받은 소장들의 특징을 분석"""
+        """높은 평가를 받은 소장들의 특징을 반환합니다 (사전 계산된 스냅샷)"""
+        if self._version is not None and time.monotonic() - self._loaded_at < self.snapshot_ttl:
+            return self._best_practices
+
         try:
-            # 피드백 데이터 가져오기
-            feedback_data = list(self.mongo_db.feedback.find(
-                {"rating": {"$gte": 4}}  # 4점 이상 평가받은 소장만 선택
-            ).sort("rating", -1).limit(50))  # 상위 50개
+            doc = self.snapshots.find_one({"_id": "current"}, {"best_practices": 1, "version": 1})
+            if doc is None:
+                # 스냅샷이 아직 없으면 피드백 컬렉션으로부터 한 번 생성
+                with self._lock:
+                    snapshot = self._rebuild_snapshot()
+                    self._persist(snapshot, expected_version=None)
+                doc = {"best_practices": snapshot.to_best_practices(), "version": snapshot.version}
 
-            if len(feedback_data) < self.min_feedback_samples:
-                return None
+            self._cache(doc.get("best_practices"), doc.get("version", 0))
+            return self._best_practices
 
-            # 높은 평가를 받은 소장들만 선택 (평점 4점 이상)
-            successful_complaints = [
-                data for data in feedback_data 
-                if data.get('rating', 0) >= 4
-            ]
+        except Exception as e:
+            print(f"분석 중 오류 발생: {str(e)}")
+            return self._best_practices
 
-            if not successful_complaints:
-                return None
+    def record_feedback(self, feedback_doc: dict, complaint: Optional[str] = None) -> bool:
+        """새 평가를 스냅샷에 반영합니다. 스냅샷이 바뀌면 True를 반환합니다."""
+        try:
+            rating = float(feedback_doc.get('rating'))
+        except (TypeError, ValueError):
+            return False
 
-            # 1. 평균 문서 길이 계산
-            avg_length = sum(len(c['complaint']) for c in successful_complaints) / len(successful_complaints)
+        complaint = complaint or feedback_doc.get('complaint')
+        if isinstance(complaint, dict):
+            complaint = complaint.get('complaint')
+        if rating < 4 or not complaint:
+            return False
 
-            # 2. 자주 사용된 문구 추출
-            common_phrases = self._extract_common_phrases(successful_complaints)
+        key = str(feedback_doc.get('_id') or uuid.uuid4())
+        created_at = feedback_doc.get('created_at')
 
-            # 3. 섹션 구조 분석
-            section_patterns = self._analyze_section_patterns(successful_complaints)
+        try:
+            with self._lock:
+                # 다른 프로세스와의 동시 갱신은 버전 비교로 감지하고 재시도
+                for _ in range(3):
+                    snapshot = self._load_snapshot()
+                    previous_version = snapshot.version if self._snapshot_persisted else None
+                    if not snapshot.add(key, rating, complaint, created_at):
+                        return False
+                    if self._persist(snapshot, expected_version=previous_version):
+                        return True
+                    self._snapshot = None
+            return False
+        except Exception as e:
+            print(f"스냅샷 갱신 중 오류 발생: {str(e)}")
+            self._snapshot = None
+            return False
 
-            # 4. 성공적인 특징 분석
-            successful_features = self._analyze_successful_features(successful_complaints)
+    def _cache(self, best_practices: Optional[Dict], version: int):
+        self._best_practices = best_practices
+        self._version = version
+        self._loaded_at = time.monotonic()
 
-            return {
-                'avg_length': avg_length,
-                'common_phrases': common_phrases,
-                'section_patterns': section_patterns,
-                'successful_features': successful_features
-            }
+    def _load_snapshot(self) -> BestPracticesSnapshot:
+        """쓰기용 스냅샷을 준비합니다. 오래된 경우 저장된 문서에서 다시 읽습니다."""
+        if self._snapshot is not None and time.monotonic() - self._loaded_at < self.snapshot_ttl:
+            return self._snapshot
 
-        except Exception as e:
-            print(f"분석 중 오류 발생: {str(e)}")
-            return None
+        doc = self.snapshots.find_one({"_id": "current"})
+        if doc is None:
+            self._snapshot = self._rebuild_snapshot()
+            self._snapshot_persisted = False
+        else:
+            self._snapshot = BestPracticesSnapshot.from_document(
+                doc, window_size=self.snapshot_window, min_samples=self.min_feedback_samples
+            )
+            self._snapshot_persisted = True
+        return self._snapshot
 
-    def _extract_common_phrases(self, feedback_data: List[Dict]) -> List[str]:
-        """성공적인 소장들에서 자주 사용된 문구 추출"""
-        # 여기에 문구 추출 로직 구현
-        all_phrases = []
-        for data in feedback_data:
-            complaint = data["complaint"]
-            # 문장 단위로 분리
-            sentences = complaint.split('.')
-            # 3단어 이상의 문구만 추출
-            phrases = [s.strip() for s in sentences if len(s.strip().split()) >= 3]
-            all_phrases.extend(phrases)
-
-        # 빈도수 기준으로 상위 10개 문구 반환
-        from collections import Counter
-        phrase_counter = Counter(all_phrases)
-        return [phrase for phrase, count in phrase_counter.most_common(10)]
-
-    def _analyze_section_patterns(self, feedback_data: List[Dict]) -> Dict:
-        """성공적인 소장들의 섹션 구조 분석"""
-        sections = ['청구취지', '청구원인', '입증방법', '첨부서류']
-        section_stats = {
-            'section_order': [],
-            'section_lengths': {},
-            'common_transitions': {}
-        }
+    def _rebuild_snapshot(self) -> BestPracticesSnapshot:
+        """피드백 컬렉션 전체로부터 스냅샷을 새로 만듭니다."""
+        snapshot = BestPracticesSnapshot(window_size=self.snapshot_window, min_samples=self.min_feedback_samples)
+        feedback_data = self.mongo_db.feedback.find(
+            {"rating": {"$gte": 4}, "complaint": {"$exists": True}}  # 4점 이상 평가받은 소장만 선택
+        ).sort("rating", -1).limit(self.snapshot_window)  # 상위 50개
 
         for data in feedback_data:
-            complaint = data["complaint"]
-            # 섹션 순서 분석
-            found_sections = []
-            for section in sections:
-                if section in complaint:
-                    found_sections.append(section)
-
-            if found_sections:
-                section_stats['section_order'].append(found_sections)
-
-        # 가장 흔한 섹션 순서 찾기
-        from collections import Counter
-        order_counter = Counter(tuple(order) for order in section_stats['section_order'])
-        section_stats['most_common_order'] = list(order_counter.most_common(1)[0][0])
-
-        return section_stats
-
-    def _analyze_successful_features(self, feedback_data: List[Dict]) -> Dict:
-        """성공적인 소장들의 특징 분석"""
-        features = {
-            'avg_length': 0,
-            'common_legal_terms': {},
-            'section_coverage': {},
-            'style_patterns': {}
-        }
+            snapshot.add(str(data['_id']), float(data['rating']), data.get('complaint'), data.get('created_at'))
+        return snapshot
 
-        legal_terms = ['원고', '피고', '위자료', '재산분할', '양육권', '가집행']
-        total_complaints = len(feedback_data)
+    def _persist(self, snapshot: BestPracticesSnapshot, expected_version: Optional[int]) -> bool:
+        """스냅샷을 저장합니다. 저장된 버전이 예상과 다르면 False를 반환합니다."""
+        doc = snapshot.to_document()
+        try:
+            if expected_version is None:
+                doc["_id"] = "current"
+                self.snapshots.insert_one(doc)
+            else:
+                result = self.snapshots.replace_one({"_id": "current", "version": expected_version}, doc)
+                if result.matched_count == 0:
+                    return False
+        except DuplicateKeyError:
+            return False
 
-        for data in feedback_data:
-            complaint = data["complaint"]
+        self._snapshot = snapshot
+        self._snapshot_persisted = True
+        self._cache(doc["best_practices"], snapshot.version)
+        return True
 
-            # 길이 분석
-            features['avg_length'] += len(complaint)
+class ComplaintCache:
+    """거의 같은 상담 내용에 대해 이전에 생성한 소장을 재사용하는 캐시입니다.
 
-            # 법률 용어 ��용 빈도
-            for term in legal_terms:
-                if term not in features['common_legal_terms']:
-                    features['common_legal_terms'][term] = 0
-                features['common_legal_terms'][term] += complaint.count(term)
+    정규화된 상담 내용의 해시로 먼저 찾고, 없으면 임베딩 코사인 유사도가
+    similarity_threshold 이상인 항목을 찾습니다. 항목은 사용자별로 분리되며
+    LRU/TTL로 제거되고, best practices 스냅샷 버전이 바뀌면 모두 무효화됩니다.
+    """
 
-        # 평균 계산
-        features['avg_length'] /= total_complaints
-        for term in features['common_legal_terms']:
-            features['common_legal_terms'][term] /= total_complaints
+    def __init__(self, embed_fn, max_entries: int = 256, ttl_seconds: float = 3600,
+                 similarity_threshold: float = 0.98):
+        self.embed_fn = embed_fn
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.similarity_threshold = similarity_threshold
+        self.entries = OrderedDict()  # (scope, text_hash) -> 항목
+        self.version = None
+        self._lock = threading.Lock()
+        self._stats = {"exact_hits": 0, "semantic_hits": 0, "misses": 0, "saved_ms": 0.0, "invalidations": 0}
+
+    @staticmethod
+    def normalize(text: str) -> str:
+        """공백, 대소문자, 유니코드 표현 차이를 제거합니다."""
+        text = unicodedata.normalize('NFKC', text).lower()
+        return ' '.join(text.split())
+
+    def _key(self, scope: Optional[str], normalized: str):
+        return scope, hashlib.sha256(normalized.encode()).hexdigest()
+
+    def _sync_version(self, version):
+        # 호출 시 self._lock을 보유하고 있어야 합니다
+        if version != self.version:
+            if self.entries:
+                self._stats["invalidations"] += 1
+            self.entries.clear()
+            self.version = version
+
+    def _evict_expired(self):
+        now = time.monotonic()
+        expired = [key for key, entry in self.entries.items() if now - entry["stored_at"] > self.ttl_seconds]
+        for key in expired:
+            del self.entries[key]
+
+    def lookup(self, text: str, scope: Optional[str] = None, version=None) -> dict:
+        """캐시를 조회합니다. 반환값의 hit가 True이면 complaint가 포함됩니다."""
+        normalized = self.normalize(text)
+        key = self._key(scope, normalized)
+
+        with self._lock:
+            self._sync_version(version)
+            self._evict_expired()
+            entry = self.entries.get(key)
+            if entry:
+                self.entries.move_to_end(key)
+                return self._hit(entry, "exact", 1.0)
+            candidates = [(k, e) for k, e in self.entries.items() if k[0] == scope and e["embedding"] is not None]
+
+        # 임베딩 계산은 잠금 밖에서 수행
+        embedding = None
+        try:
+            embedding = self._embed(normalized)
+        except Exception as e:
+            print(f"캐시 임베딩 계산 중 오류: {str(e)}")
+
+        if embedding is not None and candidates:
+            matrix = np.stack([e["embedding"] for _, e in candidates])
+            similarities = matrix @ embedding
+            best = int(np.argmax(similarities))
+            if similarities[best] >= self.similarity_threshold:
+                with self._lock:
+                    best_key, best_entry = candidates[best]
+                    if best_key in self.entries:
+                        self.entries.move_to_end(best_key)
+                        return self._hit(best_entry, "semantic", float(similarities[best]))
+
+        with self._lock:
+            self._stats["misses"] += 1
+        return {"hit": False, "key": key, "embedding": embedding}
+
+    def store(self, lookup_result: dict, complaint: str, generation_ms: float, version=None):
+        """lookup에서 놓친 결과를 캐시에 저장합니다."""
+        with self._lock:
+            if version != self.version:
+                return
+            self.entries[lookup_result["key"]] = {
+                "complaint": complaint,
+                "embedding": lookup_result.get("embedding"),
+                "generation_ms": generation_ms,
+                "stored_at": time.monotonic()
+            }
+            self.entries.move_to_end(lookup_result["key"])
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def stats(self) -> dict:
+        with self._lock:
+            total = self._stats["exact_hits"] + self._stats["semantic_hits"] + self._stats["misses"]
+            hits = self._stats["exact_hits"] + self._stats["semantic_hits"]
+            return {
+                **self._stats,
+                "saved_ms": round(self._stats["saved_ms"], 1),
+                "entries": len(self.entries),
+                "hit_rate": round(hits / total, 4) if total else 0.0,
+                "snapshot_version": self.version
+            }
 
-        return features
+    def _embed(self, normalized: str) -> np.ndarray:
+        vector = np.asarray(self.embed_fn(normalized), dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def _hit(self, entry: dict, match: str, similarity: float) -> dict:
+        # 호출 시 self._lock을 보유하고 있어야 합니다
+        self._stats["exact_hits" if match == "exact" else "semantic_hits"] += 1
+        self._stats["saved_ms"] += entry["generation_ms"]
+        return {
+            "hit": True,
+            "match": match,
+            "similarity": round(similarity, 4),
+            "saved_ms": round(entry["generation_ms"], 1),
+            "complaint": entry["complaint"]
+        }
 
 class DivorceComplaintGenerator:
-    def __init__(self):
-        # 환 변수에서 값 로드
+    def __init__(self, mongo_db=None, embeddings=None, langsmith_client=None, openai_client=None,
+                 rl_learner=None, cache: Optional[ComplaintCache] = None):
+        """공유 리소스를 주입받아 생성합니다. 주입되지 않은 리소스는 새로 만듭니다."""
+        # 환경 변수에서 값 로드
         api_key = os.getenv("OPENAI_API_KEY")
         mongo_uri = os.getenv("MONGO_URI")
-        endpoint = os.getenv("LANGCHAIN_ENDPOINT", "https://api.smith.langchain.com")
-        langchain_api_key = os.getenv("LANGCHAIN_API_KEY")
         self.project_name = os.getenv("LANGCHAIN_PROJECT", "default_project")  # 기본값 설정
 
         # LangSmith 설정
-        if langchain_api_key:  # API 키가 있을 때만 LangSmith 초기화
-            print("LangSmith 클라이언트 초기화")
-            self.langsmith_client = Client(
-                api_url=endpoint,  # base_url로 변경
-                api_key=langchain_api_key,
-            )
-        else:
-            self.langsmith_client = None
-            print("LangSmith 클라이언트가 초기화되지 않았습니다. 트레이싱이 비활성화됩니다.")
+        self.langsmith_client = langsmith_client if langsmith_client is not None else create_langsmith_client()
 
-        # OpenAI Embeddings 초기화
-        self.embeddings = OpenAIEmbeddings(api_key=api_key)
+        # OpenAI 클라이언트 및 Embeddings 초기화
+        self.openai_client = openai_client or openai.OpenAI(api_key=api_key)
+        self.embeddings = embeddings or OpenAIEmbeddings(api_key=api_key)
 
         # MongoDB 연결
-        self.mongo_db = MongoDBManager(mongo_uri)
-        self.session_manager = SessionManager()
-        self.rl_learner = ReinforcementLearner(self.mongo_db)
+        self.mongo_db = mongo_db or MongoDBManager(mongo_uri)
+        self.session_manager = SessionManager(self.mongo_db)
+        self.rl_learner = rl_learner or ReinforcementLearner(self.mongo_db)
         self.user_manager = UserManager(self.mongo_db)  # UserManager 인스턴스 생성
+        self.cache = cache
+
+    def generate_complaint(self, consultation_text: str, user_id: Optional[str] = None,
+                           cache_info: Optional[dict] = None) -> dict:
+        """소장 생성
+
+        cache_info에 dict를 넘기면 응답 캐시 적중 여부가 기록됩니다.
+        """
+        cached = self._lookup_cache(consultation_text, user_id, cache_info)
+        if cached["hit"]:
+            return cached["complaint"]
 
-    def generate_complaint(self, consultation_text: str) -> dict:
-        """소장 생성"""
         run_id = None
 
         if self.langsmith_client:  # LangSmith가 설정된 경우 실행 생성
@@ -455,7 +1338,9 @@ class DivorceComplaintGenerator:
 
         try:
             # 내부 로직 실행
+            started = time.perf_counter()
             result = self._generate_complaint_internal(consultation_text)
+            self._store_cache(cached, result, started)
 
             # 실행 결과 업데이트
             if self.langsmith_client and run_id:
@@ -476,15 +1361,161 @@ class DivorceComplaintGenerator:
             raise e
 
 
-    def _generate_complaint_internal(self, consultation_text: str) -> dict:
-        """실제 소장 생성 로직 (임의로 대체 가능)"""
+    async def agenerate_complaint(self, consultation_text: str, openai_client: "openai.AsyncOpenAI",
+                                  user_id: Optional[str] = None, cache_info: Optional[dict] = None) -> dict:
+        """generate_complaint의 비동기 버전입니다 (ASGI 라우트용).
+
+        GPT 호출은 openai_client(AsyncOpenAI)로 기다리고, 캐시 조회와 LangSmith 기록처럼
+        동기 라이브러리를 쓰는 단계는 스레드에서 실행합니다.
+        """
+        cached = await asyncio.to_thread(self._lookup_cache, consultation_text, user_id, cache_info)
+        if cached["hit"]:
+            return cached["complaint"]
+
+        run_id = None
+
+        if self.langsmith_client:
+            run_id = await asyncio.to_thread(
+                self.langsmith_client.create_run,
+                name="generate_complaint",
+                run_type="tool",
+                project_name=self.project_name,
+                inputs={"consultation_text": consultation_text}
+            )
+
+        try:
+            started = time.perf_counter()
+            claim_chunks, relief_chunks = self._get_reference_chunks(consultation_text)
+            messages = await asyncio.to_thread(self._build_messages, consultation_text, claim_chunks, relief_chunks)
+            response = await openai_client.chat.completions.create(
+                model="gpt-4o",
+                messages=messages,
+                temperature=0.3
+            )
+            result = response.choices[0].message.content
+            self._store_cache(cached, result, started)
+
+            if self.langsmith_client and run_id:
+                await asyncio.to_thread(
+                    self.langsmith_client.update_run,
+                    run_id=run_id,
+                    outputs=result,
+                    status="completed"
+                )
+            return result
+        except Exception as e:
+            if self.langsmith_client and run_id:
+                await asyncio.to_thread(
+                    self.langsmith_client.update_run,
+                    run_id=run_id,
+                    error=str(e),
+                    status="failed"
+                )
+            raise e
+
+    def stream_complaint(self, consultation_text: str, user_id: Optional[str] = None,
+                         cache_info: Optional[dict] = None):
+        """소장을 생성하면서 토큰을 도착하는 대로 반환합니다."""
+        cached = self._lookup_cache(consultation_text, user_id, cache_info)
+        if cached["hit"]:
+            yield cached["complaint"]
+            return
+
+        run_id = None
+
+        if self.langsmith_client:  # LangSmith가 설정된 경우 실행 생성
+            run_id = self.langsmith_client.create_run(
+                name="stream_complaint",
+                run_type="tool",
+                project_name=self.project_name,
+                inputs={"consultation_text": consultation_text}
+            )
+
+        claim_chunks, relief_chunks = self._get_reference_chunks(consultation_text)
+        messages = self._build_messages(consultation_text, claim_chunks, relief_chunks)
+
+        stream = None
+        parts = []
+        completed = False
+        started = time.perf_counter()
+        try:
+            stream = self.openai_client.chat.completions.create(
+                model="gpt-4o",
+                messages=messages,
+                temperature=0.3,
+                stream=True
+            )
+            for chunk in stream:
+                if not chunk.choices:
+                    continue
+                delta = chunk.choices[0].delta.content
+                if delta:
+                    parts.append(delta)
+                    yield delta
+            completed = True
+            self._store_cache(cached, "".join(parts), started)
+
+            if self.langsmith_client and run_id:
+                self.langsmith_client.update_run(
+                    run_id=run_id,
+                    outputs={"complaint": "".join(parts)},
+                    status="completed"
+                )
+        except Exception as e:
+            if self.langsmith_client and run_id:
+                self.langsmith_client.update_run(
+                    run_id=run_id,
+                    error=str(e),
+                    status="failed"
+                )
+            raise e
+        finally:
+            # 클라이언트가 중간에 연결을 끊으면 OpenAI 스트림도 닫아 생성을 중단
+            if stream is not None and not completed:
+                stream.close()
+
+    def _lookup_cache(self, consultation_text: str, user_id: Optional[str], cache_info: Optional[dict]) -> dict:
+        """응답 캐시를 조회하고 결과를 cache_info에 기록합니다."""
+        if self.cache is None:
+            result = {"hit": False}
+        else:
+            result = self.cache.lookup(consultation_text, scope=user_id, version=self.rl_learner.snapshot_version)
+
+        if cache_info is not None:
+            cache_info.update({k: v for k, v in result.items() if k in ("hit", "match", "similarity", "saved_ms")})
+        return result
+
+    def _store_cache(self, lookup_result: dict, complaint: str, started: float):
+        if self.cache is not None and "key" in lookup_result:
+            generation_ms = (time.perf_counter() - started) * 1000
+            self.cache.store(lookup_result, complaint, generation_ms, version=self.rl_learner.snapshot_version)
+
+    def _get_reference_chunks(self, consultation_text: str):
+        """청구취지/청구원인 참고 문서를 반환합니다."""
         claim_chunks = ["Claim data placeholder"]
         relief_chunks = ["Relief data placeholder"]
+        return claim_chunks, relief_chunks
+
+    def _generate_complaint_internal(self, consultation_text: str) -> dict:
+        """실제 소장 생성 로직 (임의로 대체 가능)"""
+        claim_chunks, relief_chunks = self._get_reference_chunks(consultation_text)
 
         return self._generate_with_gpt(consultation_text, claim_chunks, relief_chunks)
 
     def _generate_with_gpt(self, consultation_text: str, claim_chunks: List[str], relief_chunks: List[str]) -> dict:
         """GPT로 소장 생성 (피드백 학습 적용)"""
+        messages = self._build_messages(consultation_text, claim_chunks, relief_chunks)
+
+        response = self.openai_client.chat.completions.create(
+            model="gpt-4o",
+            messages=messages,
+            temperature=0.3
+        )
+
+        return response.choices[0].message.content
+
+    def _build_messages(self, consultation_text: str, claim_chunks: List[str], relief_chunks: List[str]) -> List[dict]:
+        """피드백 학습 결과를 반영한 GPT 메시지를 구성합니다."""
         # 성공적인 소장의 특징 가져오기
         best_practices = self.rl_learner.get_best_practices()
 
@@ -538,13 +1569,21 @@ class DivorceComplaintGenerator:
             "content": prompt
         })
 
-        response = openai.chat.completions.create(
-            model="gpt-4o",
-            messages=messages,
-            temperature=0.3
-        )
+        return messages
 
-        return response.choices[0].message.content
+def create_langsmith_client() -> Optional[Client]:
+    """LANGCHAIN_API_KEY가 설정된 경우에만 LangSmith 클라이언트를 생성합니다."""
+    endpoint = os.getenv("LANGCHAIN_ENDPOINT", "https://api.smith.langchain.com")
+    langchain_api_key = os.getenv("LANGCHAIN_API_KEY")
+    if not langchain_api_key:
+        print("LangSmith 클라이언트가 초기화되지 않았습니다. 트레이싱이 비활성화됩니다.")
+        return None
+
+    print("LangSmith 클라이언트 초기화")
+    return Client(
+        api_url=endpoint,  # base_url로 변경
+        api_key=langchain_api_key,
+    )
 
 class UserManager:
     def __init__(self, mongodb_manager):
@@ -565,7 +1604,7 @@ class UserManager:
                 "user_id": user_id,
                 "username": username,
                 "email": email,
-                "password": generate_password_hash(password),
+                "password": password_hasher.hash(password),
                 "created_at": datetime.utcnow(),
                 "last_login": None,
                 "role": "user",
@@ -606,10 +1645,12 @@ class UserManager:
             updates.pop('password', None)
             updates.pop('role', None)
 
-            result = self.users_collection.update_one(
-                {"user_id": user_id},
-                {"$set": updates}
-            )
+            update = {"$set": updates}
+            if any(field in updates for field in ('level', 'status')):
+                update["$inc"] = {"role_version": 1}
+            result = self.users_collection.update_one({"user_id": user_id}, update)
+            if "$inc" in update:
+                self.mongodb.principal_cache.invalidate(user_id)
             return result.modified_count > 0
         except Exception as e:
             print(f"사용자 업데이트 중 오류: {str(e)}")
@@ -623,13 +1664,13 @@ class UserManager:
                 return False
 
             # 현재 비밀번호 확인
-            if not check_password_hash(user['password'], current_password):
+            if not password_hasher.verify(user['password'], current_password):
                 return False
 
             # 새 비밀번호로 업데이트
             result = self.users_collection.update_one(
                 {"user_id": user_id},
-                {"$set": {"password": generate_password_hash(new_password)}}
+                {"$set": {"password": password_hasher.hash(new_password)}}
             )
             return result.modified_count > 0
         except Exception as e:
@@ -641,8 +1682,12 @@ class UserManager:
         try:
             result = self.users_collection.update_one(
                 {"user_id": user_id},
-                {"$set": {"status": "inactive", "deactivated_at": datetime.utcnow()}}
+                {
+                    "$set": {"status": "inactive", "deactivated_at": datetime.utcnow()},
+                    "$inc": {"role_version": 1}
+                }
             )
+            self.mongodb.principal_cache.invalidate(user_id)
             return result.modified_count > 0
         except Exception as e:
             print(f"사용자 삭제 중 오류: {str(e)}")
@@ -652,7 +1697,7 @@ class UserManager:
         """사용자 인증을 수행합니다."""
         try:
             user = self.users_collection.find_one({"username": username})
-            if user and check_password_hash(user['password'], password):
+            if user and password_hasher.verify(user['password'], password):
                 # 마지막 로그인 시간 업데이트
                 self.users_collection.update_one(
                     {"user_id": user["user_id"]},
@@ -712,19 +1757,22 @@ class UserManager:
                 new_level = 2
 
             if new_level > 1:
+                # 레벨이 바뀔 때만 role_version을 올리고 권한 캐시를 비움
                 result = self.users_collection.update_one(
-                    {"user_id": user_id},
-                    {"$set": {"level": new_level}}
+                    {"user_id": user_id, "level": {"$ne": new_level}},
+                    {"$set": {"level": new_level}, "$inc": {"role_version": 1}}
                 )
-                return result.modified_count > 0
+                if result.modified_count > 0:
+                    self.mongodb.principal_cache.invalidate(user_id)
+                    return True
             return False
 
         except Exception as e:
             print(f"사용자 레벨 업데이트 중 오류: {str(e)}")
             return False
 class SessionManager:
-    def __init__(self):
-        self.db = mongodb_manager.db
+    def __init__(self, mongo_db=None):
+        self.db = (mongo_db or mongodb_manager).db
         self.sessions_collection = self.db['sessions']
 
     def create_session(self, user_id: str, consultation_text: str, generated_content: dict = None) -> str:
@@ -756,21 +1804,22 @@ class SessionManager:
         )
         return result.modified_count > 0
 
-    def get_user_sessions(self, user_id: str) -> List[dict]:
-        """사용자의 모든 세션을 조회합니다."""
-        return list(self.sessions_collection.find(
-            {'user_id': user_id},
-            {'_id': 0}
-        ).sort('created_at', -1))
+    def get_user_sessions(self, user_id: str, limit: int = 20,
+                          cursor: Optional[str] = None) -> Tuple[List[dict], Optional[str]]:
+        """사용자의 세션 요약을 최신순으로 한 페이지 조회합니다. (세션 목록, 다음 커서)"""
+        return query_session_page(self.sessions_collection, user_id, limit, cursor)
 
 class JWTManager:
     def __init__(self, secret_key):
         self.secret_key = secret_key
 
-    def generate_token(self, user_id: str) -> str:
-        """사용자 ID로 JWT 토큰을 생성합니다."""
+    def generate_token(self, user_id: str, role: str = 'user', level: int = 1, role_version: int = 0) -> str:
+        """사용자 ID와 권한 클레임(role, level, rv)으로 JWT 토큰을 생성합니다."""
         payload = {
             'user_id': user_id,
+            'role': role,
+            'level': level,
+            'rv': role_version,
             'exp': datetime.utcnow() + timedelta(days=1)  # 토큰 만료 시간: 1일
         }
         return jwt.encode(payload, self.secret_key, algorithm='HS256')
@@ -785,6 +1834,24 @@ class JWTManager:
         except jwt.InvalidTokenError:
             return None
 
+    @staticmethod
+    def resolve_principal(payload: dict, principal_cache: PrincipalCache) -> Optional[dict]:
+        """토큰의 권한 클레임을 반환합니다.
+
+        캐시된 role_version과 토큰의 rv가 같으면 클레임을 그대로 사용하고, 클레임이 없거나
+        토큰 발급 이후 권한이 바뀌었으면 조회한 권한 정보를 사용합니다.
+        """
+        return JWTManager.apply_principal(payload, principal_cache.get(payload['user_id']))
+
+    @staticmethod
+    def apply_principal(payload: dict, principal: Optional[dict]) -> Optional[dict]:
+        """조회한 권한 정보와 토큰 클레임으로 요청의 권한을 결정합니다."""
+        if principal is None or principal["status"] != "active":
+            return None
+        if 'role' in payload and payload.get('rv') == principal["role_version"]:
+            return {"role": payload['role'], "level": payload.get('level', 1)}
+        return {"role": principal["role"], "level": principal["level"]}
+
 # JWT 관리자 초기화
 jwt_manager = JWTManager(app.config['JWT_SECRET_KEY'])
 
@@ -794,20 +1861,382 @@ if not mongo_uri:
     raise ValueError("MONGO_URI environment variable is not set")
 mongodb_manager = MongoDBManager(mongo_uri)
 
+class JobQueueFull(Exception):
+    """작업 대기열이 가득 찬 경우 발생합니다."""
+
+    def __init__(self, retry_after: int):
+        super().__init__("작업 대기열이 가득 찼습니다.")
+        self.retry_after = retry_after
+
+class ComplaintJobQueue:
+    """소장 생성 작업을 로컬 워커 풀에서 비동기로 처리합니다.
+
+    작업 상태는 sessions 문서의 job 필드에 저장되므로 어느 프로세스에서든
+    조회할 수 있습니다. 대기열은 크기가 제한되어 있어 가득 차면 JobQueueFull을
+    발생시킵니다.
+    """
+
+    def __init__(self, mongo_db: MongoDBManager, get_generator, workers: int = 4, max_queue: int = 32):
+        self.mongo_db = mongo_db
+        self.get_generator = get_generator
+        self.workers = workers
+        self.queue = queue.Queue(maxsize=max_queue)
+        self.cancel_poll_interval = 2.0  # 다른 프로세스에서의 취소를 확인하는 주기(초)
+        self._cancelled = set()
+        self._lock = threading.Lock()
+        self._threads = []
+        self._avg_duration = 30.0  # 평균 작업 시간(초), 지수 이동 평균
+
+    def start(self):
+        """워커 스레드를 시작합니다."""
+        with self._lock:
+            if self._threads:
+                return
+            for i in range(self.workers):
+                thread = threading.Thread(target=self._worker, name=f"complaint-job-{i}", daemon=True)
+                thread.start()
+                self._threads.append(thread)
+
+    def retry_after(self) -> int:
+        """대기열이 비워질 때까지 예상 시간(초)을 반환합니다."""
+        return max(1, int(self._avg_duration * (self.queue.qsize() + 1) / self.workers))
+
+    def submit(self, user_id: str, consultation_text: str) -> dict:
+        """작업을 대기열에 추가하고 job_id와 session_id를 반환합니다."""
+        if self.queue.full():
+            raise JobQueueFull(self.retry_after())
+
+        self.start()
+        job_id = str(uuid.uuid4())
+        session_id = str(uuid.uuid4())
+        self.mongo_db.sessions.insert_one({
+            "session_id": session_id,
+            "user_id": user_id,
+            "consultation_text": consultation_text,
+            "generated_content": None,
+            "created_at": datetime.utcnow(),
+            "rating": None,
+            "feedback": None,
+            "job": {
+                "job_id": job_id,
+                "status": "queued",
+                "queued_at": datetime.utcnow()
+            }
+        })
+
+        try:
+            self.queue.put_nowait((job_id, session_id, user_id, consultation_text))
+        except queue.Full:
+            self.mongo_db.sessions.delete_one({"session_id": session_id})
+            raise JobQueueFull(self.retry_after())
+
+        return {"job_id": job_id, "session_id": session_id, "status": "queued"}
+
+    def get(self, job_id: str, user_id: str) -> Optional[dict]:
+        """작업 상태와 결과를 조회합니다."""
+        session = self.mongo_db.sessions.find_one(
+            {"job.job_id": job_id, "user_id": user_id},
+            {"_id": 0, "session_id": 1, "job": 1, "generated_content": 1}
+        )
+        if not session:
+            return None
+
+        job = session["job"]
+        result = {
+            "job_id": job_id,
+            "session_id": session["session_id"],
+            "status": job["status"],
+            "error": job.get("error")
+        }
+        for field in ("queued_at", "started_at", "finished_at"):
+            result[field] = job[field].isoformat() if job.get(field) else None
+        if job["status"] == "completed":
+            result["complaint"] = (session.get("generated_content") or {}).get("complaint")
+            result["cache"] = job.get("cache")
+        return result
+
+    def cancel(self, job_id: str, user_id: str) -> bool:
+        """대기 중이거나 실행 중인 작업을 취소합니다."""
+        result = self.mongo_db.sessions.update_one(
+            {"job.job_id": job_id, "user_id": user_id, "job.status": {"$in": ["queued", "running"]}},
+            {"$set": {"job.status": "cancelled", "job.finished_at": datetime.utcnow()}}
+        )
+        if result.modified_count > 0:
+            with self._lock:
+                self._cancelled.add(job_id)
+            return True
+        return False
+
+    def stats(self) -> dict:
+        return {
+            "workers": self.workers,
+            "queue_depth": self.queue.qsize(),
+            "queue_capacity": self.queue.maxsize,
+            "avg_duration_seconds": round(self._avg_duration, 2)
+        }
+
+    def _worker(self):
+        while True:
+            job_id, session_id, user_id, consultation_text = self.queue.get()
+            try:
+                self._run(job_id, session_id, user_id, consultation_text)
+            except Exception as e:
+                print(f"소장 생성 작업 처리 중 오류: {str(e)}")
+            finally:
+                with self._lock:
+                    self._cancelled.discard(job_id)
+                self.queue.task_done()
+
+    def _is_cancelled(self, job_id: str) -> bool:
+        with self._lock:
+            if job_id in self._cancelled:
+                return True
+        job = self.mongo_db.sessions.find_one({"job.job_id": job_id}, {"job.status": 1})
+        return not job or job["job"]["status"] == "cancelled"
+
+    def _run(self, job_id: str, session_id: str, user_id: str, consultation_text: str):
+        # 취소되지 않은 작업만 실행 상태로 전환
+        started = self.mongo_db.sessions.update_one(
+            {"job.job_id": job_id, "job.status": "queued"},
+            {"$set": {"job.status": "running", "job.started_at": datetime.utcnow()}}
+        )
+        if started.modified_count == 0:
+            return
+
+        started_at = time.monotonic()
+        last_poll = started_at
+        parts = []
+        cache_info = {}
+        tokens = None
+        try:
+            # 생성기 초기화 실패도 작업 실패로 기록 (running 상태로 남지 않도록)
+            tokens = self.get_generator().stream_complaint(consultation_text, user_id=user_id, cache_info=cache_info)
+            for token in tokens:
+                parts.append(token)
+                now = time.monotonic()
+                if job_id in self._cancelled or (now - last_poll >= self.cancel_poll_interval and self._is_cancelled(job_id)):
+                    return
+                if now - last_poll >= self.cancel_poll_interval:
+                    last_poll = now
+        except Exception as e:
+            self.mongo_db.sessions.update_one(
+                {"job.job_id": job_id, "job.status": "running"},
+                {"$set": {"job.status": "failed", "job.error": str(e), "job.finished_at": datetime.utcnow()}}
+            )
+            return
+        finally:
+            # 취소된 경우 OpenAI 스트림을 닫아 생성을 중단
+            if tokens is not None:
+                tokens.close()
+
+        self.mongo_db.sessions.update_one(
+            {"job.job_id": job_id, "job.status": "running"},
+            {"$set": {
+                "generated_content": {"complaint": "".join(parts)},
+                "job.status": "completed",
+                "job.cache": cache_info,
+                "job.finished_at": datetime.utcnow()
+            }}
+        )
+        self._avg_duration = 0.8 * self._avg_duration + 0.2 * (time.monotonic() - started_at)
+
+class ServiceContainer:
+    """프로세스 전체에서 공유하는 리소스를 한 번만 생성하고 보관합니다.
+
+    요청마다 DivorceComplaintGenerator를 새로 만들면 MongoClient, 인덱스 생성,
+    OpenAI/LangSmith 클라이언트 초기화가 매번 반복되므로, 시작 시 한 번 생성한
+    인스턴스를 모든 요청이 공유합니다.
+    """
+
+    def __init__(self, mongo_db: MongoDBManager):
+        self.mongo_db = mongo_db
+        self.rl_learner = ReinforcementLearner(mongo_db)
+        self.openai_client = None
+        self.embeddings = None
+        self.embedding_cache = None
+        self.langsmith_client = None
+        self.complaint_cache = None
+        self.complaint_generator = None
+        self.job_queue = ComplaintJobQueue(
+            mongo_db,
+            self.get_complaint_generator,
+            workers=int(os.getenv('COMPLAINT_JOB_WORKERS', '4')),
+            max_queue=int(os.getenv('COMPLAINT_JOB_QUEUE_SIZE', '32'))
+        )
+        self.transcode_pool = TranscodePool(
+            workers=int(os.getenv('TRANSCODE_WORKERS', str(max(1, (os.cpu_count() or 2) // 2)))),
+            max_queue=int(os.getenv('TRANSCODE_QUEUE_SIZE', '8')),
+            ffmpeg_threads=int(os.getenv('TRANSCODE_FFMPEG_THREADS', '1'))
+        )
+        self.stt_engine = os.getenv('STT_ENGINE', 'api')
+        self.transcription_cache = None
+        if os.getenv('TRANSCRIPTION_CACHE_ENABLED', 'true').lower() == 'true':
+            try:
+                self.transcription_cache = TranscriptionCache()
+            except Exception as e:
+                print(f"음성 인식 캐시 초기화 실패: {str(e)}")
+        self.stt_segment_pool = ThreadPoolExecutor(
+            max_workers=int(os.getenv('STT_SEGMENT_CONCURRENCY', '4')),
+            thread_name_prefix="stt-segment"
+        )
+        self.local_stt = LocalWhisperEngine(
+            model_name=os.getenv('LOCAL_WHISPER_MODEL', 'base'),
+            workers=int(os.getenv('LOCAL_WHISPER_WORKERS', '1')),
+            threads_per_worker=int(os.getenv('LOCAL_WHISPER_THREADS', '0')) or None,
+            chunk_seconds=float(os.getenv('LOCAL_WHISPER_CHUNK_SECONDS', '30')),
+            max_pending=int(os.getenv('LOCAL_WHISPER_MAX_PENDING', '0')) or None
+        )
+        self.started_at = datetime.utcnow()
+        self.warmed_at = None
+        self.last_error = None
+        self._lock = threading.Lock()
+
+    def warm_up(self) -> bool:
+        """공유 리소스를 생성하고 MongoDB 커넥션 풀을 미리 연결합니다."""
+        with self._lock:
+            if self.complaint_generator is not None:
+                return True
+            try:
+                api_key = os.getenv("OPENAI_API_KEY")
+                self.openai_client = openai.OpenAI(
+                    api_key=api_key,
+                    max_retries=int(os.getenv('OPENAI_MAX_RETRIES', '2'))
+                )
+                self.embeddings = OpenAIEmbeddings(api_key=api_key)
+                self.embedding_cache = EmbeddingCache(
+                    self.embeddings.model,
+                    mongo_collection=self.mongo_db.db['embedding_cache']
+                )
+                self.mongo_db.chunk_embeddings = CachedEmbeddings(self.embeddings, self.embedding_cache)
+                self.langsmith_client = create_langsmith_client()
+                if os.getenv('COMPLAINT_CACHE_ENABLED', 'true').lower() == 'true':
+                    self.complaint_cache = ComplaintCache(
+                        self.embeddings.embed_query,
+                        max_entries=int(os.getenv('COMPLAINT_CACHE_SIZE', '256')),
+                        ttl_seconds=float(os.getenv('COMPLAINT_CACHE_TTL_SECONDS', '3600')),
+                        similarity_threshold=float(os.getenv('COMPLAINT_CACHE_SIMILARITY', '0.98'))
+                    )
+                # gunicorn 프리로드 시에는 워커 프로세스에서 after_fork로 띄움
+                if self.stt_engine == 'local' and os.getenv('LOCAL_WHISPER_PREWARM', 'true').lower() == 'true':
+                    threading.Thread(target=self.local_stt.prewarm, name="local-stt-prewarm", daemon=True).start()
+                self.mongo_db.ping()
+                self.mongo_db.load_vector_index()
+                self.rl_learner.get_best_practices()
+
+                self.complaint_generator = DivorceComplaintGenerator(
+                    mongo_db=self.mongo_db,
+                    embeddings=self.embeddings,
+                    langsmith_client=self.langsmith_client,
+                    openai_client=self.openai_client,
+                    rl_learner=self.rl_learner,
+                    cache=self.complaint_cache
+                )
+                self.warmed_at = datetime.utcnow()
+                self.last_error = None
+                print("공유 리소스 초기화 완료")
+                return True
+            except Exception as e:
+                self.last_error = str(e)
+                print(f"공유 리소스 초기화 중 오류: {str(e)}")
+                return False
+
+    def after_fork(self):
+        """fork된 워커 프로세스에서 부모로부터 물려받으면 안 되는 자원을 다시 만듭니다.
+
+        MongoClient는 pymongo가 fork 후 커넥션을 스스로 정리하고, 스레드 풀과 작업
+        대기열은 처음 사용할 때 스레드를 띄우므로 여기서 다루지 않습니다.
+        """
+        self.local_stt.reset_after_fork()
+        # SQLite 연결은 fork 이후 공유하면 안 되므로 캐시를 다시 엶
+        if self.embedding_cache is not None:
+            self.embedding_cache = EmbeddingCache(
+                self.embedding_cache.model,
+                path=self.embedding_cache.path,
+                mongo_collection=self.embedding_cache.mongo_collection
+            )
+            self.mongo_db.chunk_embeddings = CachedEmbeddings(self.embeddings, self.embedding_cache)
+        if self.transcription_cache is not None:
+            self.transcription_cache = TranscriptionCache(
+                self.transcription_cache.directory, self.transcription_cache.max_bytes
+            )
+        if self.stt_engine == 'local':
+            threading.Thread(target=self.local_stt.prewarm, name="local-stt-prewarm", daemon=True).start()
+
+    def get_complaint_generator(self) -> DivorceComplaintGenerator:
+        """워밍업된 소장 생성기를 반환합니다."""
+        if self.complaint_generator is None and not self.warm_up():
+            raise RuntimeError(f"서비스가 준비되지 않았습니다: {self.last_error}")
+        return self.complaint_generator
+
+    def readiness(self) -> dict:
+        """준비 상태와 커넥션 풀 상태를 반환합니다."""
+        status = {
+            "ready": self.complaint_generator is not None,
+            "started_at": self.started_at.isoformat(),
+            "warmed_at": self.warmed_at.isoformat() if self.warmed_at else None,
+            "error": self.last_error
+        }
+
+        try:
+            mongo_status = self.mongo_db.pool_status()
+            mongo_status["latency_ms"] = round(self.mongo_db.ping(), 2)
+            mongo_status["ok"] = True
+        except Exception as e:
+            mongo_status = {"ok": False, "error": str(e)}
+            status["ready"] = False
+        status["mongo"] = mongo_status
+
+        status["openai"] = {
+            "ok": self.openai_client is not None,
+            "max_retries": self.openai_client.max_retries if self.openai_client else None
+        }
+        status["langsmith"] = {"enabled": self.langsmith_client is not None}
+        status["best_practices"] = {"version": self.rl_learner._version}
+        status["vector_index"] = self.mongo_db.vector_index.stats()
+        status["embedding_cache"] = self.embedding_cache.stats() if self.embedding_cache else None
+        status["jobs"] = self.job_queue.stats()
+        status["principal_cache"] = self.mongo_db.principal_cache.stats()
+        status["password_hasher"] = password_hasher.stats()
+        status["log_writer"] = self.mongo_db.log_writer.stats()
+        status["transcode"] = self.transcode_pool.stats()
+        status["stt"] = {
+            "default_engine": self.stt_engine,
+            "local": self.local_stt.stats(),
+            "cache": self.transcription_cache.stats() if self.transcription_cache else {"enabled": False}
+        }
+        status["cache"] = self.complaint_cache.stats() if self.complaint_cache else {"enabled": False}
+        return status
+
+# 공유 리소스 초기화 (프로세스당 한 번)
+services = ServiceContainer(mongodb_manager)
+services.warm_up()
+
+def authenticate_bearer(auth_header: Optional[str]) -> Tuple[Optional[dict], Optional[str]]:
+    """Authorization 헤더의 Bearer 토큰을 검증합니다.
+
+    (페이로드, 오류)를 반환하며, 오류는 헤더가 없으면 'missing', 토큰이 유효하지 않으면 'invalid'입니다.
+    Flask 데코레이터와 ASGI 라우트(asgi.py)가 함께 사용합니다.
+    """
+    if not auth_header or not auth_header.startswith('Bearer '):
+        return None, 'missing'
+    payload = jwt_manager.verify_token(auth_header.split(' ')[1])
+    if not payload or 'user_id' not in payload:
+        return None, 'invalid'
+    return payload, None
+
 def jwt_required():
     def decorator(func):
         @wraps(func)
         def decorated_function(*args, **kwargs):
-            auth_header = request.headers.get('Authorization')
-            if not auth_header or not auth_header.startswith('Bearer '):
+            payload, error = authenticate_bearer(request.headers.get('Authorization'))
+            if error == 'missing':
                 return jsonify({'error': '인증이 필요합니다.'}), 401
-
-            token = auth_header.split(' ')[1]
-            payload = jwt_manager.verify_token(token)
-            if not payload:
+            if error:
                 return jsonify({'error': '유효하지 않은 토큰입니다.'}), 401
 
             request.user_id = payload['user_id']
+            request.user_role = payload.get('role', 'user')
+            request.user_level = payload.get('level', 1)
             return func(*args, **kwargs)
         return decorated_function
     return decorator
@@ -816,21 +2245,28 @@ def jwt_required():
 def admin_required(f):
     @wraps(f)
     def decorated_function(*args, **kwargs):
-        token = request.headers.get('Authorization')
-        if not token:
+        payload, error = authenticate_bearer(request.headers.get('Authorization'))
+        if error == 'missing':
             return jsonify({'message': 'Token is missing'}), 401
-
-        try:
-            payload = jwt_manager.verify_token(token.split(' ')[1])
-            user = mongodb_manager.users.find_one({'_id': ObjectId(payload['user_id'])})
-            if not user or user.get('role') != 'admin':
-                return jsonify({'message': 'Admin privileges required'}), 403
-        except:
+        if error:
             return jsonify({'message': 'Invalid token'}), 401
 
+        principal = jwt_manager.resolve_principal(payload, mongodb_manager.principal_cache)
+        if not principal or principal['role'] != 'admin':
+            return jsonify({'message': 'Admin privileges required'}), 403
+
+        request.user_id = payload['user_id']
+        request.user_role = principal['role']
+        request.user_level = principal['level']
         return f(*args, **kwargs)
     return decorated_function
 
+@app.route('/api/ready', methods=['GET'])
+def readiness():
+    """공유 리소스와 커넥션 풀의 준비 상태를 반환합니다."""
+    status = services.readiness()
+    return jsonify(status), 200 if status["ready"] else 503
+
 # Admin routes
 @app.route('/api/admin/users', methods=['GET'])
 @admin_required
@@ -851,12 +2287,19 @@ def update_user(user_id):
         if not update_data:
             return jsonify({'message': 'No valid fields to update'}), 400
 
-        result = mongodb_manager.users.update_one(
+        update = {'$set': update_data}
+        if any(field in update_data for field in ('role', 'level', 'status')):
+            # 이전에 발급한 토큰의 권한 클레임을 무효화
+            update['$inc'] = {'role_version': 1}
+
+        user = mongodb_manager.users.find_one_and_update(
             {'_id': ObjectId(user_id)},
-            {'$set': update_data}
+            update,
+            projection={'user_id': 1}
         )
 
-        if result.modified_count:
+        if user:
+            mongodb_manager.principal_cache.invalidate(user.get('user_id'))
             return jsonify({'message': 'User updated successfully'})
         return jsonify({'message': 'User not found'}), 404
 
@@ -871,7 +2314,7 @@ def reset_user_password(user_id):
         if not new_password:
             return jsonify({'message': 'New password is required'}), 400
 
-        hashed_password = generate_password_hash(new_password)
+        hashed_password = password_hasher.hash(new_password)
         result = mongodb_manager.users.update_one(
             {'_id': ObjectId(user_id)},
             {'$set': {'password': hashed_password}}
@@ -883,16 +2326,25 @@ def reset_user_password(user_id):
 
     except InvalidId:
         return jsonify({'message': 'Invalid user ID'}), 400
+    except PasswordHasherBusy as e:
+        response = jsonify({'message': 'Too many requests'})
+        response.headers['Retry-After'] = str(e.retry_after)
+        return response, 429
 
 @app.route('/api/admin/users/<user_id>/logs', methods=['GET'])
 @admin_required
 def get_user_logs(user_id):
     try:
-        # Get logs from MongoDB (assuming we store logs in a 'logs' collection)
-        logs = list(mongodb_manager.db.logs.find({'user_id': user_id}))
+        # ?start=, ?end=는 ISO 8601 (UTC), ?limit=는 최대 1000
+        start = datetime.fromisoformat(request.args['start']) if request.args.get('start') else None
+        end = datetime.fromisoformat(request.args['end']) if request.args.get('end') else None
+        limit = min(max(int(request.args.get('limit', 100)), 1), 1000)
+        logs = mongodb_manager.get_user_logs(user_id, start=start, end=end, limit=limit)
         for log in logs:
             log['_id'] = str(log['_id'])
         return jsonify(logs)
+    except ValueError:
+        return jsonify({'message': 'Invalid start, end or limit'}), 400
     except InvalidId:
         return jsonify({'message': 'Invalid user ID'}), 400
 
@@ -922,7 +2374,7 @@ def register():
         if user_id:
             print(f"사용자 생성 성공 - ID: {user_id}")
             # JWT 토큰 생성
-            token = jwt_manager.generate_token(user_id)
+            token = jwt_manager.generate_token(user_id)  # 신규 사용자 기본 권한 (user, 1)
             return jsonify({
                 "message": "회원가입이 완료되었습니다.",
                 "token": token,
@@ -932,6 +2384,10 @@ def register():
         else:
             print("사용자 생성 실패")
             return jsonify({"error": "사용자 생성에 실패했습니다."}), 500
+    except PasswordHasherBusy as e:
+        response = jsonify({"error": "요청이 많아 잠시 후 다시 시도해주세요."})
+        response.headers['Retry-After'] = str(e.retry_after)
+        return response, 429
     except Exception as e:
         print(f"회원가입 중 오류 발생: {str(e)}")
         return jsonify({"error": str(e)}), 500
@@ -948,11 +2404,24 @@ def login():
         if not all([username, password]):
             return jsonify({"error": "사용자명과 비밀번호를 입력해세요."}), 400
 
+        # 계정별 로그인 실패 제한 (차단 중이면 KDF를 실행하지 않음)
+        retry_after = mongodb_manager.login_limiter.retry_after(username)
+        if retry_after:
+            response = jsonify({"error": "로그인 시도가 너무 많습니다. 잠시 후 다시 시도해주세요."})
+            response.headers['Retry-After'] = str(retry_after)
+            return response, 429
+
         # 사용자 인증
         user = mongodb_manager.verify_user(username, password)
         if user:
+            mongodb_manager.login_limiter.record_success(username)
             # JWT 토큰 생성
-            token = jwt_manager.generate_token(user['user_id'])
+            token = jwt_manager.generate_token(
+                user['user_id'],
+                role=user.get('role', 'user'),
+                level=user.get('level', 1),
+                role_version=user.get('role_version', 0)
+            )
             return jsonify({
                 "message": "로그인 성공",
                 "token": token,
@@ -960,17 +2429,76 @@ def login():
                 "username": user['username']
             })
         else:
+            lockout = mongodb_manager.login_limiter.record_failure(username)
+            if lockout:
+                response = jsonify({"error": "로그인 시도가 너무 많습니다. 잠시 후 다시 시도해주세요."})
+                response.headers['Retry-After'] = str(lockout)
+                return response, 429
             return jsonify({"error": "잘못된 사용자명 또는 비밀번호입니다."}), 401
+    except PasswordHasherBusy as e:
+        response = jsonify({"error": "요청이 많아 잠시 후 다시 시도해주세요."})
+        response.headers['Retry-After'] = str(e.retry_after)
+        return response, 429
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+def session_detail_query(session_id: str, user_id: str) -> dict:
+    """세션 ID(ObjectId 또는 session_id 문자열)로 사용자의 세션을 찾는 쿼리를 만듭니다."""
+    query = {
+        'user_id': user_id
+    }
+
+    # ObjectId 형식인지 확인
+    try:
+        # ObjectId로 변환 시도
+        object_id = ObjectId(session_id)
+        query['_id'] = object_id
+    except (InvalidId, TypeError):
+        # ObjectId가 아니면 session_id로 검색
+        query['session_id'] = session_id
+    return query
+
+def session_detail(session: dict) -> dict:
+    """세션 문서를 상세 조회 응답으로 변환합니다."""
+    # 날짜 처리 함수
+    def parse_date(date_obj):
+        if isinstance(date_obj, dict) and '$date' in date_obj:
+            return date_obj['$date']
+        elif isinstance(date_obj, datetime):
+            return date_obj
+        else:
+            return datetime.now()
+
+    # 세션 데이터 준비 (MongoDB ObjectId를 문자열로 변환)
+    return {
+        '_id': str(session['_id']),
+        'session_id': session.get('session_id', str(session['_id'])),
+        'created_at': parse_date(session.get('created_at', datetime.now())),
+        'summary': session.get('summary', ''),
+        'consultation_text': session.get('consultation_text', []),
+        'complaint': session.get('generated_content', ''),
+        'title': session.get('title', ''),
+        'rating': session.get('rating')
+    }
+
 @app.route('/api/sessions', methods=['GET'])
 @jwt_required()
 def get_sessions():
-    """사용자의 세션 목록을 반환합니다."""
+    """사용자의 세션 요약 목록을 페이지 단위로 반환합니다 (?limit=, ?cursor=)."""
     try:
-        sessions = mongodb_manager.get_user_sessions(request.user_id)
-        return jsonify(sessions)
+        limit = min(max(int(request.args.get('limit', 20)), 1), 100)
+        sessions, next_cursor = mongodb_manager.get_user_sessions(
+            request.user_id,
+            limit=limit,
+            cursor=request.args.get('cursor')
+        )
+        response = jsonify(sessions)
+        if next_cursor:
+            # 다음 페이지는 ?cursor=<X-Next-Cursor>로 조회
+            response.headers['X-Next-Cursor'] = next_cursor
+        return response
+    except ValueError as ve:
+        return jsonify({"error": str(ve)}), 400
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
@@ -1024,46 +2552,13 @@ def get_session_details(session_id):
         if not session_id or session_id == 'undefined':
             return jsonify({"error": "유효하지 않은 세션 ID입니다."}), 400
 
-        # 세션 조회 쿼리 준비
-        query = {
-            'user_id': request.user_id
-        }
-
-        # ObjectId 형식인지 확인
-        try:
-            # ObjectId로 변환 시도
-            object_id = ObjectId(session_id)
-            query['_id'] = object_id
-        except (InvalidId, TypeError):
-            # ObjectId가 아니면 session_id로 검색
-            query['session_id'] = session_id
-
         # 세션 조회
-        session = mongodb_manager.sessions.find_one(query)
+        session = mongodb_manager.sessions.find_one(session_detail_query(session_id, request.user_id))
 
         if not session:
             return jsonify({"error": "세션을 찾을 수 없습니다."}), 404
 
-        # 날짜 처리 함수
-        def parse_date(date_obj):
-            if isinstance(date_obj, dict) and '$date' in date_obj:
-                return date_obj['$date']
-            elif isinstance(date_obj, datetime):
-                return date_obj
-            else:
-                return datetime.now()
-
-        # 세션 데이터 준비 (MongoDB ObjectId를 문자열로 변환)
-        session_data = {
-            '_id': str(session['_id']),
-            'session_id': session.get('session_id', str(session['_id'])),
-            'created_at': parse_date(session.get('created_at', datetime.now())),
-            'summary': session.get('summary', ''),
-            'consultation_text': session.get('consultation_text', []),
-            'complaint': session.get('generated_content', ''),
-            'title': session.get('title', ''),
-            'rating': session.get('rating')
-        }
+        session_data = session_detail(session)
 
         return jsonify(session_data), 200
 
@@ -1077,7 +2572,7 @@ def generate_complaint():
 
     try:
         # 요청 데이터 검증
-        complaint_generator = DivorceComplaintGenerator()
+        complaint_generator = services.get_complaint_generator()
         data = request.get_json()
         if not data:
             return jsonify({"error": "요청 데이터가 없습니다."}), 400
@@ -1089,9 +2584,25 @@ def generate_complaint():
         # 현재 사용자 정보 가져오기
         current_user = request.user_id
 
+        # 비동기 모드: 작업을 대기열에 넣고 즉시 job_id 반환
+        if data.get('async') or request.args.get('async') in ('1', 'true'):
+            try:
+                job = services.job_queue.submit(current_user, user_input)
+            except JobQueueFull as e:
+                response = jsonify({"error": "요청이 많아 잠시 후 다시 시도해주세요."})
+                response.headers['Retry-After'] = str(e.retry_after)
+                return response, 429
+            job["status_url"] = f"/api/jobs/{job['job_id']}"
+            return jsonify(job), 202
+
         try:
             # DivorceComplaintGenerator를 사용하여 소장 생성
-            generated_complaint = complaint_generator.generate_complaint(user_input)
+            cache_info = {}
+            generated_complaint = complaint_generator.generate_complaint(
+                user_input,
+                user_id=current_user,
+                cache_info=cache_info
+            )
 
             try:
                 # 세션 저장
@@ -1108,7 +2619,8 @@ def generate_complaint():
 
             return jsonify({
                 "complaint": generated_complaint,
-                "session_id": session_id
+                "session_id": session_id,
+                "cache": cache_info
             }), 200
 
         except Exception as e:
@@ -1119,6 +2631,128 @@ def generate_complaint():
         print(f"서버 오류: {str(e)}")
         return jsonify({"error": str(e)}), 500
 
+@app.route('/api/jobs/<job_id>', methods=['GET'])
+@jwt_required()
+def get_job(job_id):
+    """소장 생성 작업의 상태와 결과를 반환합니다."""
+    try:
+        job = services.job_queue.get(job_id, request.user_id)
+        if not job:
+            return jsonify({"error": "작업을 찾을 수 없습니다."}), 404
+        return jsonify(job), 200
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/api/jobs/<job_id>', methods=['DELETE'])
+@jwt_required()
+def cancel_job(job_id):
+    """대기 중이거나 실행 중인 소장 생성 작업을 취소합니다."""
+    try:
+        if services.job_queue.cancel(job_id, request.user_id):
+            return jsonify({"message": "작업이 취소되었습니다.", "job_id": job_id}), 200
+        return jsonify({"error": "취소할 수 있는 작업을 찾을 수 없습니다."}), 404
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+def _sse_event(event: str, data: dict) -> str:
+    """Server-Sent Events 형식의 메시지를 만듭니다."""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+def stream_complaint_events(user_id: str, user_input: str):
+    """소장 생성 토큰을 (이벤트, 데이터) 형태로 반환하고, 완료되면 세션을 저장합니다."""
+    complaint_generator = services.get_complaint_generator()
+    parts = []
+    cache_info = {}
+    for token in complaint_generator.stream_complaint(user_input, user_id=user_id, cache_info=cache_info):
+        parts.append(token)
+        yield "token", {"text": token}
+
+    generated_complaint = "".join(parts)
+    session_id = None
+    try:
+        # 세션 저장
+        session_id = mongodb_manager.save_session(
+            user_id,
+            user_input,
+            {
+                "complaint": generated_complaint
+            }
+        )
+    except Exception as db_error:
+        print(f"데이터베이스 저장 오류: {str(db_error)}")
+
+    yield "done", {"complaint": generated_complaint, "session_id": session_id, "cache": cache_info}
+
+@app.route('/api/generate-complaint/stream', methods=['POST'])
+@jwt_required()
+def generate_complaint_stream():
+    """소장 생성 결과를 Server-Sent Events로 스트리밍합니다."""
+    data = request.get_json(silent=True)
+    if not data:
+        return jsonify({"error": "요청 데이터가 없습니다."}), 400
+
+    user_input = data.get('user_input')
+    if not user_input:
+        return jsonify({"error": "사용자 입력이 없습니다."}), 400
+
+    user_id = request.user_id
+
+    def event_stream():
+        try:
+            for event, payload in stream_complaint_events(user_id, user_input):
+                yield _sse_event(event, payload)
+        except Exception as e:
+            print(f"소장 스트리밍 오류: {str(e)}")
+            yield _sse_event("error", {"error": f"소장 생성 중 오류가 발생했습니다: {str(e)}"})
+
+    return Response(
+        stream_with_context(event_stream()),
+        mimetype='text/event-stream',
+        headers={
+            'Cache-Control': 'no-cache',
+            'X-Accel-Buffering': 'no'  # nginx 버퍼링 비활성화
+        }
+    )
+
+@sock.route('/api/ws/generate-complaint')
+def ws_generate_complaint(ws):
+    """
+    소장 생성 결과를 WebSocket으로 스트리밍합니다.
+
+    첫 메시지 예시:
+    {
+        "token": "JWT 토큰 (Authorization 헤더가 없는 경우)",
+        "user_input": "상담 내용"
+    }
+    """
+    run_complaint_socket(ws, request.headers.get('Authorization', ''))
+
+def run_complaint_socket(ws, auth_header: str):
+    """ws_generate_complaint의 본문입니다. ASGI 서버(asgi.py)도 같은 함수를 스레드에서 실행합니다."""
+    try:
+        data = json.loads(ws.receive())
+    except (TypeError, ValueError):
+        ws.send(json.dumps({"type": "error", "error": "요청 데이터가 없습니다."}))
+        return
+
+    token = auth_header.split(' ')[1] if auth_header.startswith('Bearer ') else data.get('token')
+    payload = jwt_manager.verify_token(token) if token else None
+    if not payload:
+        ws.send(json.dumps({"type": "error", "error": "유효하지 않은 토큰입니다."}))
+        return
+
+    user_input = data.get('user_input')
+    if not user_input:
+        ws.send(json.dumps({"type": "error", "error": "사용자 입력이 없습니다."}))
+        return
+
+    try:
+        for event, event_data in stream_complaint_events(payload['user_id'], user_input):
+            ws.send(json.dumps({"type": event, **event_data}, ensure_ascii=False))
+    except Exception as e:
+        print(f"소장 스트리밍 오류: {str(e)}")
+        ws.send(json.dumps({"type": "error", "error": f"소장 생성 중 오류가 발생했습니다: {str(e)}"}))
+
 @app.route('/api/rating', methods=['POST'])
 @jwt_required()
 def save_feedback():
@@ -1143,6 +2777,7 @@ def save_feedback():
         # 피드백 문서 생성
         feedback_doc = {
             "session_id": session_id,
+            "user_id": request.user_id,
             "complaint": complaint,
             "rating": rating,
             "created_at": datetime.utcnow()
@@ -1151,6 +2786,9 @@ def save_feedback():
         # MongoDB에 피드백 저장
         feedback_id = mongodb_manager.save_feedback(feedback_doc)
 
+        # best practices 스냅샷에 반영
+        services.rl_learner.record_feedback(feedback_doc)
+
         # 세션 업데이트
         mongodb_manager.update_session(
             session_id=session_id,
@@ -1175,57 +2813,245 @@ def save_feedback():
 @jwt_required()
 def get_feedback_statistics():
     try:
-        stats = mongodb_manager.get_feedback_statistics()
+        days = min(max(request.args.get('days', 30, type=int), 1), 365)
+        stats = mongodb_manager.get_feedback_statistics(user_id=request.user_id, days=days)
         if stats:
             return jsonify(stats)
         return jsonify({"error": "No feedback data available"}), 404
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+def transcribe_with_api(pcm: bytes) -> str:
+    """16kHz mono PCM을 메모리에서 WAV로 감싸 whisper-1 API로 인식합니다.
+
+    API 업로드 제한(25MB)을 넘지 않도록 긴 오디오는 나누어 보냅니다.
+    """
+    client = services.openai_client or openai.OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+    texts = []
+    for chunk in split_pcm(pcm, float(os.getenv('API_WHISPER_CHUNK_SECONDS', '600'))):
+        texts.append(client.audio.transcriptions.create(
+            model="whisper-1",
+            file=("audio.wav", pcm_to_wav(chunk), "audio/wav"),
+            language="ko",
+            response_format="text"
+        ).strip())
+    return " ".join(text for text in texts if text)
+
+def transcribe_pcm(pcm: bytes, engine: str) -> Tuple[str, str]:
+    """선택한 엔진으로 인식하고 (텍스트, 실제 사용한 엔진)을 반환합니다.
+
+    로컬 엔진이 포화 상태이면 API 엔진으로 대체합니다.
+    """
+    if engine == 'local':
+        try:
+            return services.local_stt.transcribe(pcm), 'local'
+        except EngineSaturated as e:
+            print(f"로컬 STT 포화, API로 대체: {str(e)}")
+    return transcribe_with_api(pcm), 'api'
+
+def transcribe_segment(index: int, start: float, pcm: bytes, engine: str) -> dict:
+    """조각 하나를 인식합니다. 실패하면 STT_SEGMENT_RETRIES번까지 다시 시도합니다."""
+    retries = int(os.getenv('STT_SEGMENT_RETRIES', '2'))
+    result = {
+        "index": index,
+        "start": round(start, 2),
+        "end": round(start + pcm_duration(pcm), 2),
+        "text": "",
+        "attempts": 0
+    }
+    for attempt in range(retries + 1):
+        result["attempts"] = attempt + 1
+        try:
+            result["text"], result["engine"] = transcribe_pcm(pcm, engine)
+            result.pop("error", None)
+            break
+        except Exception as e:
+            print(f"조각 {index} 인식 실패 ({attempt + 1}회): {str(e)}")
+            result["error"] = str(e)
+            if attempt < retries:
+                time.sleep(min(8.0, 0.5 * 2 ** attempt))
+    return result
+
+def transcribe_segmented(pcm: bytes, engine: str) -> dict:
+    """긴 오디오를 조용한 지점에서 나누어 동시에 인식하고 순서대로 합칩니다."""
+    target = float(os.getenv('STT_SEGMENT_SECONDS', '30' if engine == 'local' else '60'))
+    segments = split_at_silence(pcm, target, target * 1.5)
+    futures = [
+        services.stt_segment_pool.submit(transcribe_segment, index, start, segment, engine)
+        for index, (start, segment) in enumerate(segments)
+    ]
+    results = [future.result() for future in futures]
+
+    failed = [result["index"] for result in results if "error" in result]
+    if len(failed) == len(results):
+        raise RuntimeError(results[0]["error"])
+
+    return {
+        "text": " ".join(result["text"] for result in results if result["text"]),
+        "engine": ",".join(sorted({result["engine"] for result in results if "engine" in result})),
+        "segments": results,
+        "failed_segments": failed
+    }
+
+def transcribe_preprocessed(pcm: bytes, engine: str) -> dict:
+    """무음 제거와 음량 정규화 후 인식하고, 조각 시각을 원본 오디오 기준으로 되돌립니다."""
+    if os.getenv('AUDIO_PREPROCESS', 'true').lower() != 'true':
+        return transcribe_segmented(pcm, engine)
+
+    processed, report = preprocess_pcm(
+        pcm,
+        max_gap_seconds=float(os.getenv('AUDIO_MAX_SILENCE_SECONDS', '1.0')),
+        gap_seconds=float(os.getenv('AUDIO_SILENCE_GAP_SECONDS', '0.5'))
+    )
+    spans = report.pop("spans")
+    print(f"오디오 전처리: {report['original_seconds']}초 → {report['processed_seconds']}초 "
+          f"({report['removed_seconds']}초 제거, {report['gain_db']}dB)")
+    if not processed:
+        return {"text": "", "engine": engine, "segments": [], "failed_segments": [], "preprocessing": report}
+
+    result = transcribe_segmented(processed, engine)
+    for segment in result["segments"]:
+        segment["start"] = round(map_time(segment["start"], spans), 2)
+        segment["end"] = round(map_time(segment["end"], spans), 2)
+    result["preprocessing"] = report
+    return result
+
 @app.route('/api/upload-audio', methods=['POST'])
 @jwt_required()
 def upload_audio():
-    if 'audio' not in request.files:
-        return jsonify({"error": "No audio file uploaded"}), 400
+    """업로드된 오디오를 디스크에 저장하지 않고 ffmpeg 파이프로 변환해 인식합니다.
 
-    audio_file = request.files['audio']
+    multipart의 audio 필드 또는 audio/* 본문을 그대로 받을 수 있습니다.
+    인식 엔진은 engine 필드(또는 쿼리)로 선택하며 기본값은 STT_ENGINE입니다.
+    """
+    engine = request.args.get('engine')
+    if request.mimetype.startswith('audio/') or request.mimetype == 'application/octet-stream':
+        # 본문을 읽는 대로 ffmpeg에 전달
+        source = request.stream
+    elif 'audio' in request.files:
+        source = request.files['audio'].stream
+        engine = engine or request.form.get('engine')
+    else:
+        return jsonify({"error": "No audio file uploaded"}), 400
 
-    # 안전한 파일명 생성
-    input_filename = secure_filename(audio_file.filename)
-    input_filepath = os.path.join(app.config['UPLOAD_FOLDER'], input_filename)
-    audio_file.save(input_filepath)
+    engine = engine or services.stt_engine
+    if engine not in ('api', 'local'):
+        return jsonify({"error": f"지원하지 않는 엔진입니다: {engine}"}), 400
 
     try:
-        # 오디오 파일을 WAV 16kHz mono로 변환
-        converted_filepath = convert_audio_to_wav(input_filepath)
+        pcm = services.transcode_pool.transcode(source, max_input_bytes=app.config['MAX_CONTENT_LENGTH'])
+
+        # 같은 오디오를 같은 엔진으로 인식한 결과가 있으면 재사용
+        # (클라이언트가 저장한 항목은 text, engine만 있으므로 나머지 필드를 채움)
+        cache = services.transcription_cache
+        cached = cache.get(pcm_key(pcm, engine, "ko")) if cache else None
+        if cached is not None:
+            return jsonify({**complete_entry(cached, engine), "cached": True}), 200
+
+        result = transcribe_preprocessed(pcm, engine)
+        # 실제로 인식한 엔진으로 저장 (local 요청이 API로 대체된 경우 api 키, 엔진이 섞이면 저장하지 않음)
+        used_engine = result.get("engine")
+        if cache and not result["failed_segments"] and used_engine in ('api', 'local'):
+            cache.put(pcm_key(pcm, used_engine, "ko"), cache_entry(
+                result["text"],
+                used_engine,
+                segments=result["segments"],
+                failed_segments=result["failed_segments"],
+                preprocessing=result.get("preprocessing")
+            ))
+        return jsonify({**result, "cached": False}), 200
+
+    except TranscodeQueueFull as e:
+        response = jsonify({"error": "요청이 많아 잠시 후 다시 시도해주세요."})
+        response.headers['Retry-After'] = str(e.retry_after)
+        return response, 429
+    except AudioTooLarge as e:
+        return jsonify({"error": str(e)}), 413
+    except AudioConversionError as e:
+        print(f"오디오 변환 실패: {str(e)}")
+        return jsonify({"error": "오디오 파일 변환에 실패했습니다."}), 400
+    except Exception as e:
+        print(f"음성 인식 중 오류 발생: {str(e)}")
+        return jsonify({"error": f"음성 인식 중 오류가 발생했습니다: {str(e)}"}), 500
 
-        if not converted_filepath:
-            os.remove(input_filepath)
-            return jsonify({"error": "오디오 파일 변환에 실패했습니다."}), 400
+@sock.route('/api/ws/transcribe')
+def ws_transcribe(ws):
+    """
+    녹음 중인 오디오를 받아 발화 단위로 인식 결과를 스트리밍합니다.
 
-        # Whisper 모델을 사용하여 음성 인식 수행
-        model = openai.audio.transcriptions.create(
-            model="whisper-1",
-            file=open(converted_filepath, "rb"),
-            language="ko",
-            response_format="text"
-        )
+    첫 메시지 예시:
+    {
+        "token": "JWT 토큰 (Authorization 헤더가 없는 경우)",
+        "format": "pcm16 | webm | ogg",
+        "engine": "api | local"
+    }
 
-        # 임시 파일들 삭제
-        os.remove(input_filepath)
-        os.remove(converted_filepath)
+    이후 오디오는 바이너리 메시지로 보내며 (pcm16은 16kHz mono s16le),
+    {"type": "stop"}을 보내면 남은 발화를 인식한 뒤 done 메시지를 보냅니다.
+    서버는 partial / final / done / error 메시지를 보냅니다.
+    """
+    run_transcribe_socket(ws, request.headers.get('Authorization', ''))
 
-        return jsonify({"text": model}), 200
+def run_transcribe_socket(ws, auth_header: str):
+    """ws_transcribe의 본문입니다. ASGI 서버(asgi.py)도 같은 함수를 스레드에서 실행합니다."""
+    try:
+        data = json.loads(ws.receive())
+    except (TypeError, ValueError):
+        ws.send(json.dumps({"type": "error", "error": "요청 데이터가 없습니다."}))
+        return
+
+    token = auth_header.split(' ')[1] if auth_header.startswith('Bearer ') else data.get('token')
+    if not token or not jwt_manager.verify_token(token):
+        ws.send(json.dumps({"type": "error", "error": "유효하지 않은 토큰입니다."}))
+        return
+
+    audio_format = data.get('format', 'pcm16')
+    engine = data.get('engine') or services.stt_engine
+    if audio_format not in ('pcm16', 'webm', 'ogg') or engine not in ('api', 'local'):
+        ws.send(json.dumps({"type": "error", "error": "지원하지 않는 형식 또는 엔진입니다."}))
+        return
+
+    send_lock = threading.Lock()
+
+    def send_event(event: dict):
+        with send_lock:
+            try:
+                ws.send(json.dumps(event, ensure_ascii=False))
+            except Exception as e:
+                print(f"인식 결과 전송 실패: {str(e)}")
+
+    session = StreamingTranscriptionSession(
+        transcribe=lambda pcm: transcribe_pcm(pcm, engine)[0],
+        on_event=send_event,
+        partial_interval=float(os.getenv('STREAM_PARTIAL_INTERVAL', '2.0')),
+        segmenter=VadSegmenter(
+            aggressiveness=int(os.getenv('STREAM_VAD_AGGRESSIVENESS', '2')),
+            max_segment_seconds=float(os.getenv('STREAM_MAX_SEGMENT_SECONDS', '30'))
+        )
+    )
+    decoder = FfmpegStreamDecoder(audio_format, session.feed) if audio_format != 'pcm16' else None
+    send_event({"type": "ready", "format": audio_format, "engine": engine})
 
+    try:
+        while True:
+            message = ws.receive()
+            if message is None:
+                break
+            if isinstance(message, str):
+                if json.loads(message).get('type') == 'stop':
+                    break
+                continue
+            if decoder is not None:
+                decoder.write(message)
+            else:
+                session.feed(message)
     except Exception as e:
-        # 임시 파일들 삭제
-        if os.path.exists(input_filepath):
-            os.remove(input_filepath)
-        if 'converted_filepath' in locals() and os.path.exists(converted_filepath):
-            os.remove(converted_filepath)
-
-        print(f"음성 인식 중 오류 발생: {str(e)}")
-        return jsonify({"error": f"음성 인식 중 오류가 발생했습니다: {str(e)}"}), 500
+        print(f"스트리밍 인식 수신 오류: {str(e)}")
+    finally:
+        if decoder is not None:
+            decoder.close()
+        result = session.finish()
+        send_event({"type": "done", **result})
 
 @app.route('/api/rate-session', methods=['POST'])
 @jwt_required()
@@ -1250,6 +3076,11 @@ def rate_session():
         if not session:
             return jsonify({"error": "해당 세션을 찾을 수 없습니다."}), 404
 
+        try:
+            rating = float(rating)
+        except (TypeError, ValueError):
+            return jsonify({"error": "평점은 숫자여야 합니다."}), 400
+
         # 이미 평가했는지 확인
         existing_rating = mongodb_manager.feedback.find_one({
             'session_id': session_id,
@@ -1277,8 +3108,11 @@ def rate_session():
             }}
         )
 
-        # 피드백 저장
-        mongodb_manager.feedback.insert_one(feedback_doc)
+        # 피드백 저장 (통계 카운터도 함께 갱신)
+        mongodb_manager.save_feedback(feedback_doc)
+
+        # best practices 스냅샷에 반영
+        services.rl_learner.record_feedback(feedback_doc, complaint=session.get('generated_content'))
 
         return jsonify({
             "message": "평가가 성공적으로 제출되었습니다.",
@@ -1445,47 +3279,5 @@ def start_consultation():
         print(f"상담 시작 중 오류 발생: {str(e)}")
         return jsonify({"error": "상담 시작 중 오류가 발생했습니다.", "details": str(e)}), 500
 
-
-
-def convert_audio_to_wav(input_file):
-    """
-    Convert input audio file to WAV 16kHz mono using FFmpeg
-    
-    Args:
-        input_file (str): Path to the input audio file
-    
-    Returns:
-        str: Path to the converted WAV file, or None if conversion fails
-    """
-    try:
-        # Generate a unique filename for the converted file
-        output_filename = f"{uuid.uuid4()}.wav"
-        output_file = os.path.join(app.config['UPLOAD_FOLDER'], output_filename)
-
-        # FFmpeg command to convert audio to WAV 16kHz mono
-        ffmpeg_command = [
-            'ffmpeg', 
-            '-i', input_file,  # Input file
-            '-acodec', 'pcm_s16le',  # 16-bit PCM
-            '-ar', '16000',  # Sample rate 16kHz
-            '-ac', '1',  # Mono audio
-            output_file
-        ]
-
-        # Run FFmpeg conversion
-        result = subprocess.run(ffmpeg_command, capture_output=True, text=True)
-
-        # Check if conversion was successful
-        if result.returncode == 0 and os.path.exists(output_file):
-            return output_file
-        else:
-            # Log FFmpeg error output
-            print(f"FFmpeg conversion error: {result.stderr}")
-            return None
-
-    except Exception as e:
-        print(f"Audio conversion error: {e}")
-        return None
-
 if __name__ == '__main__':
     app.run(host='0.0.0.0', port=5000)
@@ -0,0 +1,256 @@
+import queue
+import subprocess
+import threading
+import time
+from collections import deque
+from typing import Callable, List, Optional
+
+import webrtcvad
+
+from audio_pipeline import SAMPLE_RATE, SAMPLE_WIDTH, pcm_duration
+
+
+class VadSegmenter:
+    """16kHz PCM을 30ms 프레임 단위로 webrtcvad에 넣어 발화 구간을 나눕니다.
+
+    최근 padding_ms 동안의 프레임 중 음성 비율로 발화 시작과 끝을 판단하며,
+    비율은 프레임이 들어오고 나갈 때마다 갱신하므로 프레임당 O(1)입니다.
+    """
+
+    def __init__(self, aggressiveness: int = 2, frame_ms: int = 30, padding_ms: int = 300,
+                 trigger_ratio: float = 0.8, max_segment_seconds: float = 30.0,
+                 sample_rate: int = SAMPLE_RATE):
+        self.vad = webrtcvad.Vad(aggressiveness)
+        self.sample_rate = sample_rate
+        self.frame_bytes = int(sample_rate * frame_ms / 1000) * SAMPLE_WIDTH
+        self.window = max(1, padding_ms // frame_ms)
+        self.trigger_ratio = trigger_ratio
+        self.max_segment_bytes = int(max_segment_seconds * sample_rate) * SAMPLE_WIDTH
+
+        self._pending = bytearray()
+        self._ring = deque()
+        self._ring_voiced = 0
+        self._triggered = False
+        self._segment = bytearray()
+        self._segment_start = 0  # 발화 시작 위치 (바이트)
+        self._position = 0  # 지금까지 처리한 바이트 수
+
+    @property
+    def in_speech(self) -> bool:
+        return self._triggered
+
+    def current_segment(self) -> bytes:
+        """진행 중인 발화의 PCM을 반환합니다."""
+        return bytes(self._segment)
+
+    def current_start(self) -> float:
+        return self._segment_start / (self.sample_rate * SAMPLE_WIDTH)
+
+    def feed(self, pcm: bytes) -> List[tuple]:
+        """PCM을 추가하고 끝난 발화들을 (시작 초, PCM) 목록으로 반환합니다."""
+        self._pending.extend(pcm)
+        finished = []
+        offset = 0
+        while len(self._pending) - offset >= self.frame_bytes:
+            frame = bytes(self._pending[offset:offset + self.frame_bytes])
+            offset += self.frame_bytes
+            segment = self._process_frame(frame)
+            if segment is not None:
+                finished.append(segment)
+        del self._pending[:offset]
+        return finished
+
+    def flush(self) -> Optional[tuple]:
+        """남은 발화를 끝난 것으로 처리합니다."""
+        segment = None
+        if self._triggered and self._segment:
+            segment = self._finish()
+        self._pending.clear()
+        self._ring.clear()
+        self._ring_voiced = 0
+        return segment
+
+    def _process_frame(self, frame: bytes) -> Optional[tuple]:
+        voiced = self.vad.is_speech(frame, self.sample_rate)
+        frame_start = self._position
+        self._position += len(frame)
+
+        self._ring.append((frame, voiced))
+        self._ring_voiced += voiced
+        if len(self._ring) > self.window:
+            _, dropped_voiced = self._ring.popleft()
+            self._ring_voiced -= dropped_voiced
+
+        if not self._triggered:
+            if self._ring_voiced >= self.trigger_ratio * self.window:
+                # 발화 시작: 직전 패딩 프레임부터 포함
+                self._triggered = True
+                self._segment_start = frame_start - (len(self._ring) - 1) * self.frame_bytes
+                for ring_frame, _ in self._ring:
+                    self._segment.extend(ring_frame)
+                self._ring.clear()
+                self._ring_voiced = 0
+            return None
+
+        self._segment.extend(frame)
+        unvoiced = len(self._ring) - self._ring_voiced
+        if unvoiced >= self.trigger_ratio * self.window or len(self._segment) >= self.max_segment_bytes:
+            return self._finish()
+        return None
+
+    def _finish(self) -> tuple:
+        segment = (self.current_start(), bytes(self._segment))
+        self._triggered = False
+        self._segment = bytearray()
+        self._ring.clear()
+        self._ring_voiced = 0
+        return segment
+
+
+class FfmpegStreamDecoder:
+    """webm/ogg(Opus) 조각을 하나의 ffmpeg 프로세스로 계속 디코딩합니다.
+
+    write로 받은 바이트를 stdin에 쓰고, stdout에서 읽은 16kHz PCM을 on_pcm으로 전달합니다.
+    """
+
+    def __init__(self, input_format: str, on_pcm: Callable[[bytes], None], sample_rate: int = SAMPLE_RATE):
+        self.on_pcm = on_pcm
+        self.process = subprocess.Popen(
+            [
+                'ffmpeg', '-hide_banner', '-loglevel', 'error',
+                '-threads', '1',
+                '-f', input_format,
+                '-i', 'pipe:0',
+                '-f', 's16le',
+                '-acodec', 'pcm_s16le',
+                '-ar', str(sample_rate),
+                '-ac', '1',
+                'pipe:1'
+            ],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL
+        )
+        self._reader = threading.Thread(target=self._read, name="stream-decoder", daemon=True)
+        self._reader.start()
+
+    def _read(self):
+        while True:
+            # read1은 준비된 만큼만 반환하므로 지연 없이 PCM을 전달
+            chunk = self.process.stdout.read1(4096)
+            if not chunk:
+                break
+            self.on_pcm(chunk)
+
+    def write(self, data: bytes):
+        self.process.stdin.write(data)
+        self.process.stdin.flush()
+
+    def close(self, timeout: float = 10.0):
+        """입력을 닫고 남은 PCM을 모두 전달할 때까지 기다립니다."""
+        try:
+            self.process.stdin.close()
+        except (BrokenPipeError, OSError):
+            pass
+        self._reader.join(timeout)
+        if self.process.poll() is None:
+            self.process.kill()
+        self.process.wait()
+
+
+class StreamingTranscriptionSession:
+    """들어오는 PCM을 발화 단위로 나누어 백그라운드에서 인식합니다.
+
+    끝난 발화는 순서대로 인식하여 final 이벤트로, 진행 중인 발화는
+    partial_interval초마다 인식하여 partial 이벤트로 on_event에 전달합니다.
+    """
+
+    def __init__(self, transcribe: Callable[[bytes], str], on_event: Callable[[dict], None],
+                 partial_interval: float = 2.0, segmenter: Optional[VadSegmenter] = None):
+        self.transcribe = transcribe
+        self.on_event = on_event
+        self.partial_interval = partial_interval
+        self.segmenter = segmenter or VadSegmenter()
+        self.segments = queue.Queue()
+        self.results: List[dict] = []
+        self._lock = threading.Lock()
+        self._segment_index = 0
+        self._partial_running = False
+        self._last_partial = 0.0
+        self._received_bytes = 0
+        self._worker = threading.Thread(target=self._run, name="stream-stt", daemon=True)
+        self._worker.start()
+
+    def feed(self, pcm: bytes):
+        with self._lock:
+            self._received_bytes += len(pcm)
+            for start, segment in self.segmenter.feed(pcm):
+                self._enqueue(start, segment)
+            self._maybe_partial()
+
+    def finish(self) -> dict:
+        """남은 발화를 처리하고 모든 인식이 끝나면 전체 결과를 반환합니다."""
+        with self._lock:
+            segment = self.segmenter.flush()
+            if segment is not None:
+                self._enqueue(*segment)
+        self.segments.put(None)
+        self._worker.join()
+        return {
+            "text": " ".join(result["text"] for result in self.results if result["text"]),
+            "segments": self.results,
+            "audio_seconds": round(self._received_bytes / (SAMPLE_RATE * SAMPLE_WIDTH), 2)
+        }
+
+    def _enqueue(self, start: float, segment: bytes):
+        self.segments.put((self._segment_index, start, segment))
+        self._segment_index += 1
+
+    def _maybe_partial(self):
+        # 이전 partial 인식이 끝나지 않았으면 건너뜀
+        if (self.partial_interval <= 0 or self._partial_running or not self.segmenter.in_speech
+                or time.monotonic() - self._last_partial < self.partial_interval):
+            return
+        self._partial_running = True
+        self._last_partial = time.monotonic()
+        threading.Thread(
+            target=self._partial,
+            args=(self._segment_index, self.segmenter.current_segment()),
+            name="stream-stt-partial",
+            daemon=True
+        ).start()
+
+    def _partial(self, index: int, pcm: bytes):
+        try:
+            text = self.transcribe(pcm)
+            with self._lock:
+                # 이미 final이 나간 발화의 partial은 보내지 않음
+                stale = index < self._segment_index
+            if text and not stale:
+                self.on_event({"type": "partial", "segment": index, "text": text})
+        except Exception as e:
+            print(f"partial 인식 중 오류: {str(e)}")
+        finally:
+            self._partial_running = False
+
+    def _run(self):
+        while True:
+            item = self.segments.get()
+            if item is None:
+                break
+            index, start, pcm = item
+            try:
+                text = self.transcribe(pcm)
+            except Exception as e:
+                print(f"발화 인식 중 오류: {str(e)}")
+                self.on_event({"type": "error", "segment": index, "error": str(e)})
+                text = ""
+
+            result = {
+                "segment": index,
+                "start": round(start, 2),
+                "end": round(start + pcm_duration(pcm), 2),
+                "text": text
+            }
+            self.results.append(result)
+            self.on_event({"type": "final", **result})
@@ -0,0 +1,128 @@
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional
+
+import numpy as np
+
+from audio_pipeline import pcm_duration, split_at_silence
+
+# 워커 프로세스마다 한 번 로드되는 Whisper 모델
+_model = None
+
+
+def _init_worker(model_name: str, threads: int):
+    """워커 프로세스 시작 시 스레드 수를 제한하고 모델을 로드합니다."""
+    for var in ("OMP_NUM_THREADS", "MKL_NUM_THREADS", "OPENBLAS_NUM_THREADS"):
+        os.environ[var] = str(threads)
+
+    import torch
+    import whisper
+
+    torch.set_num_threads(threads)
+    torch.set_num_interop_threads(1)
+
+    global _model
+    _model = whisper.load_model(model_name, device="cpu")
+
+
+def _transcribe_chunk(pcm: bytes, language: str) -> str:
+    audio = np.frombuffer(pcm, dtype=np.int16).astype(np.float32) / 32768.0
+    result = _model.transcribe(audio, language=language, fp16=False)
+    return result["text"].strip()
+
+
+class EngineSaturated(Exception):
+    """로컬 엔진의 대기 작업이 가득 찬 경우 발생합니다."""
+
+
+class LocalWhisperEngine:
+    """CPU 워커 프로세스 풀에서 Whisper 모델로 음성을 인식합니다.
+
+    각 워커는 시작할 때 모델을 한 번만 로드하고, 긴 오디오는 chunk_seconds를
+    넘지 않도록 조용한 지점에서 나누어 여러 워커에서 동시에 처리합니다. 대기 중인 조각이 max_pending을
+    넘으면 EngineSaturated를 발생시켜 호출자가 API 엔진으로 대체할 수 있게 합니다.
+    """
+
+    def __init__(self, model_name: str = "base", workers: int = 1, threads_per_worker: Optional[int] = None,
+                 chunk_seconds: float = 30.0, max_pending: Optional[int] = None):
+        self.model_name = model_name
+        self.workers = workers
+        self.threads_per_worker = threads_per_worker or max(1, (os.cpu_count() or 1) // workers)
+        self.chunk_seconds = chunk_seconds
+        self.max_pending = max_pending or workers * 2
+        self._executor = None
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._stats = {"requests": 0, "chunks": 0, "saturated": 0, "audio_seconds": 0.0, "wall_seconds": 0.0}
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                # torch와 서버 스레드가 있는 프로세스를 fork하지 않도록 spawn 사용
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=_init_worker,
+                    initargs=(self.model_name, self.threads_per_worker)
+                )
+            return self._executor
+
+    def prewarm(self):
+        """워커 프로세스를 미리 띄워 모델을 로드합니다."""
+        executor = self._get_executor()
+        for future in [executor.submit(_transcribe_chunk, b"\0\0" * 1600, "ko") for _ in range(self.workers)]:
+            future.result()
+
+    def transcribe(self, pcm: bytes, language: str = "ko") -> str:
+        """16kHz mono PCM을 인식합니다. 포화 상태이면 EngineSaturated를 발생시킵니다."""
+        chunks = [chunk for _, chunk in split_at_silence(pcm, self.chunk_seconds, self.chunk_seconds)]
+        with self._lock:
+            if self._pending + len(chunks) > self.max_pending and self._pending > 0:
+                self._stats["saturated"] += 1
+                raise EngineSaturated(f"로컬 STT 대기 작업이 가득 찼습니다 ({self._pending}/{self.max_pending})")
+            self._pending += len(chunks)
+
+        started = time.monotonic()
+        try:
+            executor = self._get_executor()
+            futures = [executor.submit(_transcribe_chunk, chunk, language) for chunk in chunks]
+            texts = [future.result() for future in futures]
+        finally:
+            with self._lock:
+                self._pending -= len(chunks)
+
+        with self._lock:
+            self._stats["requests"] += 1
+            self._stats["chunks"] += len(chunks)
+            self._stats["audio_seconds"] += pcm_duration(pcm)
+            self._stats["wall_seconds"] += time.monotonic() - started
+        return " ".join(text for text in texts if text)
+
+    def stats(self) -> dict:
+        with self._lock:
+            audio_seconds = self._stats["audio_seconds"]
+            return {
+                "model": self.model_name,
+                "workers": self.workers,
+                "threads_per_worker": self.threads_per_worker,
+                "started": self._executor is not None,
+                "pending_chunks": self._pending,
+                "max_pending": self.max_pending,
+                **self._stats,
+                "real_time_factor": round(self._stats["wall_seconds"] / audio_seconds, 4) if audio_seconds else None
+            }
+
+    def reset_after_fork(self):
+        """fork된 자식 프로세스에서 부모의 워커 풀을 버립니다. 다음 사용 시 새로 띄웁니다."""
+        self._lock = threading.Lock()
+        self._executor = None
+        self._pending = 0
+
+    def shutdown(self):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
@@ -0,0 +1,26 @@
+import numpy as np
+import pytest
+
+from audio_pipeline import SAMPLE_RATE, SAMPLE_WIDTH, split_at_silence
+
+
+def make_pcm(seconds: float, seed: int = 0) -> bytes:
+    rng = np.random.default_rng(seed)
+    return (rng.normal(0, 3000, int(seconds * SAMPLE_RATE))).astype(np.int16).tobytes()
+
+
+@pytest.mark.parametrize("seconds", [45.05, 45.5, 46.0, 60.01, 90.03])
+def test_split_at_silence_has_no_short_tail(seconds):
+    pcm = make_pcm(seconds)
+    pieces = split_at_silence(pcm, target_seconds=30, max_seconds=45)
+
+    assert len(pieces) > 1
+    for _, piece in pieces:
+        piece_seconds = len(piece) / (SAMPLE_RATE * SAMPLE_WIDTH)
+        assert 15 <= piece_seconds <= 45 + 0.03
+    assert b"".join(piece for _, piece in pieces) == pcm
+
+
+def test_split_at_silence_keeps_short_input_whole():
+    pcm = make_pcm(44.9)
+    assert split_at_silence(pcm, target_seconds=30, max_seconds=45) == [(0.0, pcm)]
@@ -0,0 +1,129 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Callable, Optional, Tuple
+
+
+def pcm_key(pcm: bytes, engine: str, language: Optional[str]) -> str:
+    """디코딩된 PCM과 엔진, 언어로 캐시 키(SHA-256)를 만듭니다."""
+    digest = hashlib.sha256(pcm)
+    digest.update(f"|{engine}|{language or 'auto'}".encode())
+    return digest.hexdigest()
+
+
+def cache_entry(text: str, engine: str, segments: Optional[list] = None,
+                failed_segments: Optional[list] = None, preprocessing: Optional[dict] = None) -> dict:
+    """캐시에 저장하는 공통 형식입니다.
+
+    서버, 데모 클라이언트, Streamlit 앱이 모두 이 형식으로 저장합니다.
+    engine은 실제로 인식한 엔진이며 키(pcm_key)의 엔진과 같아야 합니다.
+    """
+    return {
+        "text": text,
+        "engine": engine,
+        "segments": segments or [],
+        "failed_segments": failed_segments or [],
+        "preprocessing": preprocessing
+    }
+
+
+def complete_entry(entry: dict, engine: str) -> dict:
+    """text만 있는 예전 항목 등 빠진 필드를 cache_entry의 기본값으로 채웁니다."""
+    return {**cache_entry(entry.get("text", ""), engine), **entry}
+
+
+class TranscriptionCache:
+    """음성 인식 결과를 PCM 해시로 찾는 디스크 캐시입니다.
+
+    TRANSCRIPTION_CACHE_DIR의 SQLite 파일에 저장하므로 같은 호스트의 서버와
+    Streamlit 앱이 함께 사용할 수 있습니다. 전체 크기가 max_bytes를 넘으면
+    가장 오래 사용하지 않은 항목부터 지웁니다.
+    """
+
+    def __init__(self, directory: Optional[str] = None, max_bytes: Optional[int] = None):
+        self.directory = directory or os.getenv(
+            'TRANSCRIPTION_CACHE_DIR',
+            os.path.join(os.path.expanduser('~'), '.cache', 'herelaw', 'transcriptions')
+        )
+        self.max_bytes = max_bytes or int(os.getenv('TRANSCRIPTION_CACHE_MAX_MB', '256')) * 1024 * 1024
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "stores": 0, "evictions": 0}
+
+        os.makedirs(self.directory, exist_ok=True)
+        self._conn = sqlite3.connect(
+            os.path.join(self.directory, 'transcriptions.sqlite3'),
+            check_same_thread=False,
+            timeout=10
+        )
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS transcriptions ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, size INTEGER NOT NULL, last_access REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_last_access ON transcriptions (last_access)")
+        self._conn.commit()
+
+    def get(self, key: str) -> Optional[dict]:
+        """캐시된 결과를 반환하고 최근 사용 시각을 갱신합니다."""
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM transcriptions WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self._stats["misses"] += 1
+                return None
+            self._conn.execute("UPDATE transcriptions SET last_access = ? WHERE key = ?", (time.time(), key))
+            self._conn.commit()
+            self._stats["hits"] += 1
+        return json.loads(row[0])
+
+    def put(self, key: str, value: dict):
+        """결과를 저장하고 크기 제한을 넘으면 오래된 항목을 지웁니다."""
+        data = json.dumps(value, ensure_ascii=False)
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO transcriptions (key, value, size, last_access) VALUES (?, ?, ?, ?)",
+                (key, data, len(data.encode()), time.time())
+            )
+            self._stats["stores"] += 1
+            self._evict()
+            self._conn.commit()
+
+    def _evict(self):
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM transcriptions").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        for key, size in self._conn.execute(
+            "SELECT key, size FROM transcriptions ORDER BY last_access"
+        ).fetchall():
+            self._conn.execute("DELETE FROM transcriptions WHERE key = ?", (key,))
+            self._stats["evictions"] += 1
+            total -= size
+            if total <= self.max_bytes:
+                break
+
+    def get_or_transcribe(self, pcm: bytes, engine: str, language: Optional[str],
+                          transcribe: Callable[[], dict]) -> Tuple[dict, bool]:
+        """캐시에 있으면 그 결과를, 없으면 transcribe()의 결과를 저장해 반환합니다."""
+        key = pcm_key(pcm, engine, language)
+        cached = self.get(key)
+        if cached is not None:
+            return cached, True
+        value = transcribe()
+        self.put(key, value)
+        return value, False
+
+    def stats(self) -> dict:
+        with self._lock:
+            entries, size = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM transcriptions"
+            ).fetchone()
+            lookups = self._stats["hits"] + self._stats["misses"]
+            return {
+                **self._stats,
+                "entries": entries,
+                "size_bytes": size,
+                "max_bytes": self.max_bytes,
+                "hit_rate": round(self._stats["hits"] / lookups, 4) if lookups else 0.0
+            }
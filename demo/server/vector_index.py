@@ -0,0 +1,219 @@
+import threading
+from datetime import datetime
+from typing import Dict, List, Optional
+
+import numpy as np
+
+
+class _Partition:
+    """하나의 doc_type에 속한 벡터들을 보관합니다.
+
+    벡터 수가 ivf_threshold보다 작으면 전체 내적으로 정확하게 검색하고,
+    그 이상이면 k-means 중심점으로 나눈 IVF 구조에서 nprobe개의 리스트만 검색합니다.
+    """
+
+    def __init__(self, dim: int, ivf_threshold: int, nprobe: int):
+        self.dim = dim
+        self.ivf_threshold = ivf_threshold
+        self.nprobe = nprobe
+        self.vectors = np.zeros((0, dim), dtype=np.float32)
+        self.size = 0
+        self.docs: List[dict] = []
+        self.hashes = set()
+        self.centroids: Optional[np.ndarray] = None
+        self.lists: List[List[int]] = []
+
+    def add(self, vectors: np.ndarray, docs: List[dict]):
+        # 용량을 두 배씩 늘려 증분 추가 비용을 상각
+        needed = self.size + len(vectors)
+        if needed > len(self.vectors):
+            capacity = max(needed, 2 * len(self.vectors), 64)
+            grown = np.zeros((capacity, self.dim), dtype=np.float32)
+            grown[:self.size] = self.vectors[:self.size]
+            self.vectors = grown
+
+        start = self.size
+        self.vectors[start:needed] = vectors
+        self.docs.extend(docs)
+        self.hashes.update(doc["chunk_hash"] for doc in docs)
+        self.size = needed
+
+        if self.centroids is not None:
+            assignments = np.argmax(vectors @ self.centroids.T, axis=1)
+            for offset, cluster in enumerate(assignments):
+                self.lists[cluster].append(start + offset)
+            # 처음 학습했을 때보다 크게 늘어나면 다시 학습
+            if self.size > 4 * self._trained_size:
+                self.train()
+        elif self.size >= self.ivf_threshold:
+            self.train()
+
+    def train(self, iterations: int = 10, seed: int = 0):
+        """구형(spherical) k-means로 IVF 중심점을 학습합니다."""
+        data = self.vectors[:self.size]
+        n_lists = max(1, int(np.sqrt(self.size)))
+        rng = np.random.default_rng(seed)
+        sample = data[rng.choice(self.size, size=min(self.size, n_lists * 64), replace=False)]
+        centroids = sample[rng.choice(len(sample), size=n_lists, replace=False)].copy()
+
+        for _ in range(iterations):
+            assignments = np.argmax(sample @ centroids.T, axis=1)
+            for cluster in range(n_lists):
+                members = sample[assignments == cluster]
+                if len(members):
+                    centroid = members.sum(axis=0)
+                    norm = np.linalg.norm(centroid)
+                    centroids[cluster] = centroid / norm if norm else centroid
+
+        assignments = np.argmax(data @ centroids.T, axis=1)
+        self.lists = [[] for _ in range(n_lists)]
+        for index, cluster in enumerate(assignments):
+            self.lists[cluster].append(index)
+        self.centroids = centroids
+        self._trained_size = self.size
+
+    def search(self, query: np.ndarray, k: int) -> List[tuple]:
+        if self.size == 0:
+            return []
+
+        if self.centroids is None:
+            candidates = np.arange(self.size)
+        else:
+            nprobe = min(self.nprobe, len(self.centroids))
+            nearest_lists = np.argsort(-(self.centroids @ query))[:nprobe]
+            candidates = np.fromiter(
+                (i for cluster in nearest_lists for i in self.lists[cluster]), dtype=np.int64
+            )
+            # 탐색한 리스트에 k개가 없으면 전체 검색으로 대체
+            if len(candidates) < k:
+                candidates = np.arange(self.size)
+
+        scores = self.vectors[candidates] @ query
+        if len(candidates) > k:
+            top = np.argpartition(-scores, k)[:k]
+        else:
+            top = np.arange(len(candidates))
+        top = top[np.argsort(-scores[top])]
+        return [(int(candidates[i]), float(scores[i])) for i in top]
+
+
+class VectorIndex:
+    """document_chunks 임베딩에 대한 프로세스 내 근사 최근접 이웃 인덱스입니다.
+
+    doc_type별로 파티션을 나누므로 요청한 doc_type의 청크만 k개 반환합니다.
+    벡터는 정규화하여 저장하므로 점수는 코사인 유사도입니다.
+    """
+
+    def __init__(self, ivf_threshold: int = 20000, nprobe: int = 8):
+        self.ivf_threshold = ivf_threshold
+        self.nprobe = nprobe
+        self.partitions: Dict[str, _Partition] = {}
+        self.dim: Optional[int] = None
+        self._lock = threading.RLock()
+
+    @staticmethod
+    def _normalize(vectors: np.ndarray) -> np.ndarray:
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        norms[norms == 0] = 1
+        return vectors / norms
+
+    def add(self, doc_type: str, chunk_hash: str, content: str, embedding, doc_id=None) -> bool:
+        """청크 하나를 추가합니다. 이미 있는 chunk_hash이면 False를 반환합니다."""
+        return self.add_many([{
+            "_id": doc_id,
+            "doc_type": doc_type,
+            "chunk_hash": chunk_hash,
+            "content": content,
+            "embedding": embedding
+        }]) > 0
+
+    def add_many(self, docs: List[dict]) -> int:
+        """여러 청크를 doc_type별로 묶어 추가하고 추가된 개수를 반환합니다."""
+        grouped: Dict[str, List[dict]] = {}
+        for doc in docs:
+            if doc.get("embedding") is None:
+                continue
+            grouped.setdefault(doc.get("doc_type"), []).append(doc)
+
+        added = 0
+        with self._lock:
+            for doc_type, group in grouped.items():
+                vectors = np.asarray([doc["embedding"] for doc in group], dtype=np.float32)
+                if self.dim is None:
+                    self.dim = vectors.shape[1]
+                if vectors.shape[1] != self.dim:
+                    raise ValueError(f"임베딩 차원이 일치하지 않습니다: {vectors.shape[1]} != {self.dim}")
+
+                partition = self.partitions.get(doc_type)
+                if partition is None:
+                    partition = self.partitions[doc_type] = _Partition(self.dim, self.ivf_threshold, self.nprobe)
+
+                keep = []
+                seen = set()
+                for i, doc in enumerate(group):
+                    if doc["chunk_hash"] not in partition.hashes and doc["chunk_hash"] not in seen:
+                        seen.add(doc["chunk_hash"])
+                        keep.append(i)
+                if not keep:
+                    continue
+
+                metadata = [
+                    {
+                        "_id": group[i].get("_id"),
+                        "content": group[i].get("content"),
+                        "doc_type": doc_type,
+                        "chunk_hash": group[i]["chunk_hash"]
+                    }
+                    for i in keep
+                ]
+                partition.add(self._normalize(vectors[keep]), metadata)
+                added += len(keep)
+        return added
+
+    def search(self, query_embedding, doc_type: str, k: int = 3) -> List[dict]:
+        """doc_type 파티션에서 query와 가장 유사한 청크 k개를 반환합니다."""
+        query = np.asarray(query_embedding, dtype=np.float32)
+        norm = np.linalg.norm(query)
+        if norm:
+            query = query / norm
+
+        with self._lock:
+            partition = self.partitions.get(doc_type)
+            if partition is None:
+                return []
+            hits = partition.search(query, k)
+            return [{**partition.docs[i], "score": score} for i, score in hits]
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "dim": self.dim,
+                "partitions": {
+                    doc_type: {
+                        "size": partition.size,
+                        "ivf_lists": len(partition.lists) if partition.centroids is not None else 0
+                    }
+                    for doc_type, partition in self.partitions.items()
+                }
+            }
+
+    def load(self, collection, batch_size: int = 1000, since: Optional[datetime] = None) -> int:
+        """MongoDB 컬렉션의 embedding 필드로 인덱스를 구성합니다. since가 있으면 그 이후 저장된 청크만 읽습니다."""
+        query = {"embedding": {"$exists": True}}
+        if since is not None:
+            query["created_at"] = {"$gte": since}
+        cursor = collection.find(
+            query,
+            {"content": 1, "doc_type": 1, "chunk_hash": 1, "embedding": 1}
+        ).batch_size(batch_size)
+
+        loaded = 0
+        batch = []
+        for doc in cursor:
+            batch.append(doc)
+            if len(batch) >= batch_size:
+                loaded += self.add_many(batch)
+                batch = []
+        if batch:
+            loaded += self.add_many(batch)
+        return loaded
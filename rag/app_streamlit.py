@@ -24,9 +24,11 @@ from typing import List, Dict, Optional
 import json
 import sys
 sys.path.append("../stt")
+sys.path.append("../demo/server")
 from gcpApi import record_audio as gcp_record
 from gcpApi import audio_to_text as gcp_transcribe
 from whisperApi import AudioTranscriber
+from transcription_cache import TranscriptionCache, cache_entry, pcm_key
 import extra_streamlit_components as stx
 from datetime import timedelta
 import requests
@@ -237,6 +239,15 @@ class SessionManager:
                     return True
         return False
 
+@st.cache_resource
+def get_transcription_cache():
+    """프로세스에서 공유하는 음성 인식 캐시를 반환합니다."""
+    try:
+        return TranscriptionCache()
+    except Exception as e:
+        print(f"음성 인식 캐시 초기화 실패: {str(e)}")
+        return None
+
 class STTManager:
     def __init__(self, openai_api_key=None):
         """
@@ -246,20 +257,31 @@ class STTManager:
             openai_api_key (str, optional): OpenAI API 키
         """
         self.openai_api_key = openai_api_key
+        self.cache = get_transcription_cache()
 
     def convert_webm_to_wav(self, webm_path, wav_path):
         """
-        WebM 파일을 WAV 형식으로 변환합니다.
+        WebM 파일을 서버, 데모 클라이언트와 같은 16kHz mono s16le WAV로 변환합니다.
         
         Args:
             webm_path (str): WebM 파일 경로
             wav_path (str): 저장할 WAV 파일 경로
         """
-        from moviepy.editor import AudioFileClip
+        import subprocess
         
-        audio = AudioFileClip(webm_path)
-        audio.write_audiofile(wav_path)
-        audio.close()
+        command = [
+            'ffmpeg',
+            '-i', webm_path,
+            '-acodec', 'pcm_s16le',  # WAV 포맷
+            '-ac', '1',              # 모노
+            '-ar', '16000',          # 16kHz
+            '-y',                    # 기존 파일 덮어쓰기
+            wav_path
+        ]
+        result = subprocess.run(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        if result.returncode != 0:
+            print(f"FFmpeg 오류: {result.stderr.decode(errors='replace')}")
+            raise Exception("오디오 변환 실패")
 
     def transcribe_with_whisper(self, audio_path):
         """
@@ -281,7 +303,8 @@ class STTManager:
         with open(audio_path, "rb") as audio_file:
             transcript = openai.Audio.transcribe(
                 model="whisper-1",
-                file=audio_file
+                file=audio_file,
+                language="ko"
             )
         
         return transcript["text"]
@@ -304,9 +327,19 @@ class STTManager:
         try:
             # WebM을 WAV로 변환
             self.convert_webm_to_wav(webm_path, wav_path)
+
+            # 디코딩한 PCM이 같으면 이전 인식 결과를 재사용 (서버와 같은 키)
+            import wave
+            with wave.open(wav_path, "rb") as wav_file:
+                cache_key = pcm_key(wav_file.readframes(wav_file.getnframes()), "api", "ko")
+            cached = self.cache.get(cache_key) if self.cache else None
+            if cached is not None:
+                return cached["text"]
             
             # WAV 파일을 텍스트로 변환
             text = self.transcribe_with_whisper(wav_path)
+            if self.cache and text:
+                self.cache.put(cache_key, cache_entry(text, "api"))
             
             return text
             
@@ -7,6 +7,9 @@ from langchain.embeddings import GPT4AllEmbeddings
 from langchain.embeddings import OllamaEmbeddings  
 
 import os
+import sys
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "demo", "server"))
+from embedding_cache import CachedEmbeddings
 
 DATA_PATH = "data/"
 DB_PATH = "vectorstores/db/"
@@ -17,7 +20,7 @@ def create_vector_db():
     print(f"Processed {len(documents)} pdf files")
     text_splitter = RecursiveCharacterTextSplitter(chunk_size=1000, chunk_overlap=50)
     texts = text_splitter.split_documents(documents)
-    vectorstore = Chroma.from_documents(documents=texts, embedding=GPT4AllEmbeddings(), persist_directory=DB_PATH)      
+    vectorstore = Chroma.from_documents(documents=texts, embedding=CachedEmbeddings(GPT4AllEmbeddings()), persist_directory=DB_PATH)      
     vectorstore.persist()
 
 if __name__ == "__main__":
@@ -8,20 +8,27 @@ import gradio as gr
 import os
 import glob
 from gradio.themes.base import Base
-import docx import Document
+from docx import Document
+import sys
 from dotenv import load_dotenv
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "demo", "server"))
+from embedding_cache import CachedEmbeddings
 
-client = MongoClient(key_param.MONGO_URI)
+load_dotenv()
+client = MongoClient(os.getenv("MONGO_URI"))
 dbName = "langchain_demo"
 collectionName = "collection_of_text_blobs"
 collection = client[dbName][collectionName]
 
-load_dotenv()
 api_key = os.getenv("OPENAI_API_KEY")
 loader = DirectoryLoader( './embedding', glob="./*.docx", show_progress=True)
 data = loader.load()
 
-embeddings = OpenAIEmbeddings(openai_api_key=api_key)
+# 임베딩 캐시는 서버와 같은 DB의 embedding_cache 컬렉션을 공유
+embeddings = CachedEmbeddings(
+    OpenAIEmbeddings(openai_api_key=api_key),
+    mongo_collection=client[os.getenv('MONGODB_DB', 'herelaw')]['embedding_cache']
+)
 
 vectorStore = MongoDBAtlasVectorSearch.from_documents( data, embeddings, collection=collection )
 
@@ -1,11 +1,14 @@
 import streamlit as st
 import openai
 import os
+import sys
 from dotenv import load_dotenv
 import docx
 from langchain.embeddings import OpenAIEmbeddings
 from langchain.vectorstores import FAISS
 from langchain.text_splitter import CharacterTextSplitter
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "demo", "server"))
+from embedding_cache import CachedEmbeddings
 
 # Load environment variables
 load_dotenv()
@@ -29,7 +32,8 @@ def load_and_embed_documents(file_paths):
     text_splitter = CharacterTextSplitter(chunk_size=1000, chunk_overlap=200)
     texts = text_splitter.create_documents(documents)
 
-    embeddings = OpenAIEmbeddings()
+    # 이미 임베딩한 청크는 캐시에서 재사용
+    embeddings = CachedEmbeddings(OpenAIEmbeddings())
     vectorstore = FAISS.from_documents(texts, embeddings)
     return vectorstore
 
@@ -0,0 +1,133 @@
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Optional
+
+import whisper
+
+
+def _resident_memory_mb() -> Optional[float]:
+    """현재 프로세스의 상주 메모리(MB)를 반환합니다."""
+    try:
+        import psutil
+        return psutil.Process().memory_info().rss / (1024 * 1024)
+    except ImportError:
+        try:
+            import resource
+            # Linux에서 ru_maxrss는 KB 단위 (최대값)
+            return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+        except ImportError:
+            return None
+
+
+class _Entry:
+    def __init__(self):
+        self.load_lock = threading.Lock()  # 모델 로드는 한 번만
+        self.use_lock = threading.Lock()  # Whisper 디코딩은 모델 상태(kv 캐시 훅)를 바꾸므로 한 번에 하나씩
+        self.model = None
+        self.info = {}
+
+
+class ModelRegistry:
+    """프로세스 안에서 Whisper 모델을 크기별로 한 번만 로드하여 공유합니다.
+
+    모델은 처음 사용할 때 로드하며, 같은 모델을 쓰는 스레드들은 모델별 락으로
+    순서대로 추론합니다.
+    """
+
+    def __init__(self):
+        self._entries: Dict[tuple, _Entry] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(name: str, device: Optional[str]) -> tuple:
+        if device is None:
+            import torch
+            device = "cuda" if torch.cuda.is_available() else "cpu"
+        return name, device
+
+    def _entry(self, key: tuple) -> _Entry:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                entry = self._entries[key] = _Entry()
+            return entry
+
+    def get(self, name: str = "base", device: Optional[str] = None):
+        """모델을 반환합니다. 아직 로드하지 않았으면 로드합니다."""
+        key = self._key(name, device)
+        entry = self._entry(key)
+        if entry.model is not None:
+            return entry.model
+
+        with entry.load_lock:
+            if entry.model is None:
+                print(f"Loading Whisper model: {name} ({key[1]})")
+                rss_before = _resident_memory_mb()
+                started = time.perf_counter()
+                model = whisper.load_model(name, device=key[1])
+                load_seconds = time.perf_counter() - started
+                rss_after = _resident_memory_mb()
+
+                entry.info = {
+                    "model": name,
+                    "device": key[1],
+                    "load_seconds": round(load_seconds, 2),
+                    "loaded_at": time.time(),
+                    "parameters_mb": round(
+                        sum(p.numel() * p.element_size() for p in model.parameters()) / (1024 * 1024), 1
+                    ),
+                    "rss_delta_mb": round(rss_after - rss_before, 1) if rss_before is not None else None
+                }
+                entry.model = model
+                print(f"Whisper model loaded: {entry.info}")
+        return entry.model
+
+    @contextmanager
+    def use(self, name: str = "base", device: Optional[str] = None):
+        """모델을 독점적으로 사용하는 컨텍스트입니다."""
+        model = self.get(name, device)
+        entry = self._entry(self._key(name, device))
+        with entry.use_lock:
+            yield model
+
+    def transcribe(self, name: str, audio, device: Optional[str] = None, **kwargs) -> dict:
+        with self.use(name, device) as model:
+            return model.transcribe(audio, **kwargs)
+
+    def shared(self, name: str = "base", device: Optional[str] = None) -> "SharedModel":
+        """로드를 미루는 공유 모델 핸들을 반환합니다."""
+        return SharedModel(self, name, device)
+
+    def prewarm(self, names=None):
+        """모델을 미리 로드합니다. names가 없으면 WHISPER_PREWARM(쉼표 구분)을 사용합니다."""
+        if names is None:
+            names = [name.strip() for name in os.getenv("WHISPER_PREWARM", "").split(",") if name.strip()]
+        for name in names:
+            self.get(name)
+
+    def stats(self) -> dict:
+        with self._lock:
+            entries = list(self._entries.items())
+        return {
+            "rss_mb": _resident_memory_mb(),
+            "models": {f"{name}@{device}": entry.info for (name, device), entry in entries if entry.model is not None}
+        }
+
+
+class SharedModel:
+    """whisper 모델처럼 transcribe를 호출할 수 있는 레지스트리 핸들입니다."""
+
+    def __init__(self, registry: ModelRegistry, name: str, device: Optional[str] = None):
+        self.registry = registry
+        self.name = name
+        self.device = device
+
+    def transcribe(self, audio, **kwargs) -> dict:
+        return self.registry.transcribe(self.name, audio, self.device, **kwargs)
+
+
+# 프로세스 전역 레지스트리
+registry = ModelRegistry()
+registry.prewarm()
@@ -1,4 +1,4 @@
-import whisper
+import argparse
 import torch
 import sounddevice as sd
 import numpy as np
@@ -8,28 +8,99 @@ import time
 import webrtcvad
 import wave
 import datetime
+import collections
+import difflib
+
+from model_registry import registry
+
+
+def stitch_overlap(previous: str, current: str, overlap_ratio: float = 0.0, min_match: int = 2) -> str:
+    """겹치는 구간을 인식한 두 텍스트를 중복 없이 이어 붙입니다.
+
+    previous의 끝부분과 current의 앞부분에서 가장 긴 공통 단어열을 찾아 그 지점에서
+    잇습니다. 공통 부분이 없으면 current 앞쪽 overlap_ratio 비율의 단어를 버립니다.
+    """
+    previous_words = previous.split()
+    current_words = current.split()
+    if not previous_words:
+        return current.strip()
+    if not current_words:
+        return previous.strip()
+
+    # current가 겹칠 수 있는 previous의 끝부분만 비교
+    tail_start = max(0, len(previous_words) - len(current_words))
+    tail = previous_words[tail_start:]
+    match = difflib.SequenceMatcher(None, tail, current_words, autojunk=False).find_longest_match(
+        0, len(tail), 0, len(current_words)
+    )
+    if match.size >= min(min_match, len(current_words)):
+        return " ".join(previous_words[:tail_start + match.a] + current_words[match.b:])
+
+    skip = int(round(len(current_words) * overlap_ratio))
+    return " ".join(previous_words + current_words[skip:])
+
 
 class AudioTranscriber:
-    def __init__(self, model_name: str = "base", sample_rate: int = 16000):
-        self.model = whisper.load_model(model_name)
+    def __init__(self, model_name: str = "base", sample_rate: int = 16000,
+                 buffer_seconds: float = 120.0, max_segment_seconds: float = 30.0,
+                 frame_ms: int = 30, vad_aggressiveness: int = 3,
+                 low_latency: bool = False, window_seconds: float = 5.0, hop_seconds: float = 1.0,
+                 silence_seconds: float = 2.0):
+        # 모델은 프로세스 전역 레지스트리에서 공유 (처음 인식할 때 로드)
+        self.model_name = model_name
+        self.model = registry.shared(model_name)
         self.sample_rate = sample_rate
-        self.audio_queue = queue.Queue()
         self.text_queue = queue.Queue()  # 텍스트 전달을 위한 큐 추가
+        self.segment_queue = queue.Queue()  # 인식할 발화 구간
         self.keep_running = True
-        self.vad = webrtcvad.Vad(3)  # Aggressiveness mode 3
-        self.buffer = []
+        self.vad = webrtcvad.Vad(vad_aggressiveness)
         self.recording = False
-        self.silence_threshold = 0.01
-        self.silence_duration = 0
-        self.max_silence_duration = 2.0  # 침묵 감지 시간을 2초로 증가
+        self.max_silence_duration = silence_seconds  # 발화가 끝났다고 판단하는 침묵 시간
+        self.max_segment_seconds = max_segment_seconds
         self.transcription_callback: callable = None
-        
+
+        # 미리 할당한 float32 링 버퍼 (샘플 위치는 녹음 시작부터의 절대 위치)
+        self.capacity = int(buffer_seconds * sample_rate)
+        self.ring = np.zeros(self.capacity, dtype=np.float32)
+        self.write_pos = 0
+        self.data_ready = threading.Event()
+
+        # 30ms 프레임 단위 VAD 상태
+        self.frame_size = int(sample_rate * frame_ms / 1000)
+        self.padding_frames = max(1, 300 // frame_ms)
+        self.segment_id = 0
+        self.reset_vad()
+
+        # 저지연 모드: 발화 중에도 window_seconds 창을 hop_seconds마다 인식하여
+        # callback(text, is_final=False)로 임시 결과를 보내고, 겹친 구간을 이어 붙여 최종 결과를 만듭니다
+        self.low_latency = low_latency
+        self.window = int(window_seconds * sample_rate)
+        self.hop = int(hop_seconds * sample_rate)
+        self.overlap = max(0, self.window - self.hop)
+        self.reset_partial()
+
+    def reset_vad(self):
+        """VAD 상태를 초기화합니다."""
+        self.read_pos = self.write_pos
+        self.vad_window = collections.deque(maxlen=self.padding_frames)
+        self.voiced_in_window = 0
+        self.in_speech = False
+        self.segment_start = 0
+        self.last_voiced_end = 0
+
+    def reset_partial(self, segment_id: int = None):
+        """발화 하나에 대한 임시 결과 상태를 초기화합니다."""
+        self.partial_segment = segment_id
+        self.partial_text = ""
+        self.covered_end = 0  # 임시 결과가 인식한 마지막 샘플 위치
+
     def start_streaming(self, callback: callable = None):
         """스트리밍 녹음을 시작합니다."""
         try:
             print("Starting audio streaming...")
             self.transcription_callback = callback
-            self.buffer = []
+            self.write_pos = 0
+            self.reset_vad()
             self.recording = True
             self.keep_running = True
             
@@ -51,6 +122,12 @@ class AudioTranscriber:
             self.process_thread.daemon = True
             self.process_thread.start()
             print("Processing thread started")
+
+            # 인식 스레드 시작
+            self.transcribe_thread = threading.Thread(target=self.transcribe_segments)
+            self.transcribe_thread.daemon = True
+            self.transcribe_thread.start()
+            print("Transcription thread started")
             
             # 콜백 처리 스레드 시작
             self.callback_thread = threading.Thread(target=self.handle_callbacks)
@@ -67,71 +144,195 @@ class AudioTranscriber:
             raise
             
     def handle_callbacks(self):
-        """콜백을 메인 스레드에서 처리하기 위한 함수"""
-        while self.keep_running:
+        """콜백을 메인 스레드에서 처리하기 위한 함수 (stop_streaming이 넣는 None을 받으면 종료)"""
+        while True:
             try:
-                text = self.text_queue.get(timeout=1.0)
-                if self.transcription_callback and text:
-                    self.transcription_callback(text)
+                item = self.text_queue.get(timeout=1.0)
+                if item is None:
+                    break
+                if self.transcription_callback and item:
+                    if isinstance(item, tuple):
+                        self.transcription_callback(*item)
+                    else:
+                        self.transcription_callback(item)
             except queue.Empty:
                 continue
             except Exception as e:
                 print(f"Error in callback handler: {str(e)}")
-                
+
+    def emit(self, text: str, is_final: bool = True):
+        """인식 결과를 콜백 큐에 넣습니다. 저지연 모드에서는 (text, is_final)로 전달합니다."""
+        if not text:
+            return
+        if self.low_latency:
+            self.text_queue.put((text, is_final))
+        elif is_final:
+            self.text_queue.put(text)
+
+    def read_ring(self, start: int, end: int) -> np.ndarray:
+        """절대 샘플 위치 [start, end) 구간을 링 버퍼에서 복사합니다."""
+        start = max(start, self.write_pos - self.capacity)
+        if end <= start:
+            return np.zeros(0, dtype=np.float32)
+        first = start % self.capacity
+        last = first + (end - start)
+        if last <= self.capacity:
+            return self.ring[first:last].copy()
+        return np.concatenate((self.ring[first:], self.ring[:last - self.capacity]))
+
+    def process_frame(self, frame: np.ndarray, frame_start: int):
+        """30ms 프레임 하나로 발화 상태를 갱신합니다 (프레임당 O(1))."""
+        pcm = (np.clip(frame, -1.0, 1.0) * 32767).astype(np.int16).tobytes()
+        voiced = self.vad.is_speech(pcm, self.sample_rate)
+        frame_end = frame_start + self.frame_size
+
+        if len(self.vad_window) == self.vad_window.maxlen:
+            self.voiced_in_window -= self.vad_window[0]
+        self.vad_window.append(voiced)
+        self.voiced_in_window += voiced
+
+        if not self.in_speech:
+            if self.voiced_in_window >= 0.8 * self.padding_frames:
+                # 발화 시작: 판단에 사용한 직전 프레임부터 포함
+                self.in_speech = True
+                self.segment_id += 1
+                self.segment_start = frame_end - len(self.vad_window) * self.frame_size
+                self.last_voiced_end = frame_end
+            return
+
+        if voiced:
+            self.last_voiced_end = frame_end
+
+        silence = (frame_end - self.last_voiced_end) / self.sample_rate
+        length = (frame_end - self.segment_start) / self.sample_rate
+        if silence >= self.max_silence_duration or length >= self.max_segment_seconds:
+            self.finish_segment(self.last_voiced_end if silence >= self.max_silence_duration else frame_end)
+
+    def finish_segment(self, end: int):
+        """발화 구간만 잘라 인식 큐에 넣습니다."""
+        # 끝부분 침묵은 패딩 길이만큼만 포함
+        end = min(end + self.padding_frames * self.frame_size, self.write_pos)
+        segment = self.read_ring(self.segment_start, end)
+        if len(segment):
+            self.segment_queue.put((self.segment_id, self.segment_start, segment))
+        self.in_speech = False
+        self.vad_window.clear()
+        self.voiced_in_window = 0
+
     def process_audio(self):
-        """오디오를 처리하고 텍스트로 변환하는 백그라운드 스레드"""
+        """새로 들어온 오디오를 프레임 단위로 VAD에 넣는 백그라운드 스레드"""
         while self.keep_running:
             try:
-                # 침묵 감지
-                if len(self.buffer) > 0:
-                    audio_data = np.array(self.buffer, dtype=np.float32)
-                    energy = np.mean(np.abs(audio_data))
-                    
-                    if energy < self.silence_threshold:
-                        self.silence_duration += len(audio_data) / self.sample_rate
-                        if self.silence_duration >= self.max_silence_duration:
-                            # 현재까지의 버퍼를 처리
-                            if len(self.buffer) > 0:
-                                audio_data = np.array(self.buffer, dtype=np.float32)
-                                try:
-                                    result = self.model.transcribe(audio_data)
-                                    transcribed_text = result["text"].strip()
-                                    if transcribed_text:
-                                        self.text_queue.put(transcribed_text)
-                                        print(f"Transcribed: {transcribed_text}")
-                                except Exception as e:
-                                    print(f"Error in transcription: {str(e)}")
-                            self.buffer = []
-                            self.silence_duration = 0
-                    else:
-                        self.silence_duration = 0
-                        
-                time.sleep(0.1)  # CPU 사용량 감소
-                    
+                self.data_ready.wait(timeout=0.5)
+                self.data_ready.clear()
+                self.process_available()
             except Exception as e:
                 print(f"Error in processing: {str(e)}")
-                
+
+    def process_available(self):
+        """아직 VAD에 넣지 않은 완전한 프레임들을 처리합니다."""
+        available = self.write_pos
+        if available - self.read_pos > self.capacity:
+            # 처리가 밀려 덮어쓴 구간은 건너뜀
+            print("Warning: audio ring buffer overrun")
+            self.read_pos = available - self.capacity
+
+        while available - self.read_pos >= self.frame_size:
+            frame = self.read_ring(self.read_pos, self.read_pos + self.frame_size)
+            self.process_frame(frame, self.read_pos)
+            self.read_pos += self.frame_size
+
+    def transcribe_segments(self):
+        """발화 구간을 Whisper로 인식하는 백그라운드 스레드"""
+        while self.keep_running or not self.segment_queue.empty():
+            try:
+                item = self.segment_queue.get(timeout=0.05 if self.low_latency else 0.5)
+            except queue.Empty:
+                if self.low_latency:
+                    self.transcribe_partial()
+                continue
+            if item is None:
+                break
+            try:
+                transcribed_text = self.transcribe_final(*item)
+                if transcribed_text:
+                    self.emit(transcribed_text, is_final=True)
+                    print(f"Transcribed: {transcribed_text}")
+            except Exception as e:
+                print(f"Error in transcription: {str(e)}")
+
+    def transcribe_partial(self):
+        """진행 중인 발화에서 아직 인식하지 않은 hop 이상이 쌓이면 창 하나를 인식합니다."""
+        if not self.in_speech:
+            return
+        segment_id, segment_start, available = self.segment_id, self.segment_start, self.read_pos
+        if self.partial_segment != segment_id:
+            self.reset_partial(segment_id)
+            self.covered_end = segment_start
+        if available - self.covered_end < self.hop:
+            return
+
+        # 이전 창과 overlap만큼 겹치도록 시작 위치를 정함 (인식이 밀리면 창이 길어짐)
+        start = max(segment_start, self.covered_end - self.overlap)
+        start = max(start, available - int(self.max_segment_seconds * self.sample_rate))
+        audio = self.read_ring(start, available)
+        try:
+            text = self.model.transcribe(audio)["text"].strip()
+        except Exception as e:
+            print(f"Error in partial transcription: {str(e)}")
+            return
+
+        if self.partial_segment != segment_id:
+            return  # 인식하는 동안 발화가 끝나 최종 결과로 처리됨
+        overlap_ratio = (self.covered_end - start) / max(1, available - start)
+        self.partial_text = stitch_overlap(self.partial_text, text, overlap_ratio)
+        self.covered_end = available
+        self.emit(self.partial_text, is_final=False)
+
+    def transcribe_final(self, segment_id: int, segment_start: int, audio: np.ndarray) -> str:
+        """끝난 발화를 인식합니다.
+
+        저지연 모드에서 임시 결과가 있으면 마지막 창만 인식해 이어 붙이므로
+        긴 발화 전체를 다시 인식하지 않습니다.
+        """
+        if self.low_latency and self.partial_segment == segment_id and self.partial_text:
+            offset = max(0, self.covered_end - self.overlap - segment_start)
+            overlap_ratio = min(1.0, (self.covered_end - segment_start - offset) / max(1, len(audio) - offset))
+            text = self.model.transcribe(audio[offset:])["text"].strip()
+            final_text = stitch_overlap(self.partial_text, text, overlap_ratio)
+        else:
+            final_text = self.model.transcribe(audio)["text"].strip()
+        self.reset_partial()
+        return final_text
+
     def stop_streaming(self):
         """스트리밍을 중지하고 마지막 텍스트를 반환합니다."""
         print("Stopping streaming...")
         if self.recording:
-            self.keep_running = False
             self.recording = False
             self.stream.stop()
             self.stream.close()
-            
-            # 마지막 버퍼 처리
-            if len(self.buffer) > 0:
+            self.keep_running = False
+            self.data_ready.set()
+            self.process_thread.join()
+            self.process_available()
+            self.segment_queue.put(None)
+            self.transcribe_thread.join()
+            # 인식 스레드가 남긴 결과까지 콜백으로 전달한 뒤 콜백 스레드를 멈춤
+            self.text_queue.put(None)
+            self.callback_thread.join()
+
+            # 마지막 발화 처리
+            if self.in_speech:
                 try:
-                    audio_data = np.array(self.buffer, dtype=np.float32)
-                    result = self.model.transcribe(audio_data)
-                    transcribed_text = result["text"].strip()
+                    audio_data = self.read_ring(self.segment_start, self.write_pos)
+                    transcribed_text = self.transcribe_final(self.segment_id, self.segment_start, audio_data)
                     print(f"Final transcription: {transcribed_text}")
                     return transcribed_text
                 except Exception as e:
                     print(f"Error in final transcription: {str(e)}")
                 finally:
-                    self.buffer = []
+                    self.reset_vad()
             
         return None
         
@@ -143,16 +344,15 @@ class AudioTranscriber:
             
         if self.recording:
             try:
-                # 오디오 데이터를 float32로 변환
-                audio_data = indata.flatten().astype(np.float32)
-                
-                # 오디오 큐에 데이터 추가
-                self.buffer.extend(audio_data.tolist())
-                
-                # 디버그: 오디오 레벨 출력
-                energy = np.mean(np.abs(audio_data))
-                if energy > self.silence_threshold:
-                    print(f"Audio level: {energy:.4f}")
+                # 링 버퍼에 그대로 복사 (파이썬 객체로 변환하지 않음)
+                audio_data = indata[:, 0] if indata.ndim > 1 else indata
+                audio_data = audio_data[-self.capacity:]
+                start = self.write_pos % self.capacity
+                first = min(len(audio_data), self.capacity - start)
+                self.ring[start:start + first] = audio_data[:first]
+                self.ring[:len(audio_data) - first] = audio_data[first:]
+                self.write_pos += len(audio_data)
+                self.data_ready.set()
                     
             except Exception as e:
                 print(f"Error in audio callback: {str(e)}")
@@ -169,9 +369,15 @@ class AudioTranscriber:
         print("녹음을 시작합니다...")
         
         # Initialize recording
-        self.buffer = []
-        self.recording = False
-        self.silence_duration = 0
+        # 링 버퍼가 녹음 길이보다 짧으면 앞부분이 덮어써지므로 이번 녹음 동안만 늘림 (콜백 블록 여유 1초)
+        saved_ring = None
+        required = int((duration + 1) * self.sample_rate)
+        if required > self.capacity:
+            saved_ring = (self.ring, self.capacity)
+            self.capacity = required
+            self.ring = np.zeros(self.capacity, dtype=np.float32)
+        self.write_pos = 0
+        self.recording = True
         
         # Start recording
         with sd.InputStream(callback=self.audio_callback,
@@ -181,9 +387,11 @@ class AudioTranscriber:
                 # Record for specified duration
                 time.sleep(duration)
                 
-                # Convert buffer to numpy array
-                if self.buffer:
-                    audio_data = np.array(self.buffer, dtype=np.float32)
+                self.recording = False
+
+                # 녹음한 구간을 링 버퍼에서 복사
+                if self.write_pos > 0:
+                    audio_data = self.read_ring(0, self.write_pos)
                     
                     # Transcribe using Whisper
                     result = self.model.transcribe(audio_data)
@@ -198,15 +406,24 @@ class AudioTranscriber:
             except Exception as e:
                 print(f"녹음 중 오류 발생: {str(e)}")
                 return None
+            finally:
+                self.recording = False
+                if saved_ring is not None:
+                    self.ring, self.capacity = saved_ring
+                    self.write_pos = 0
 
 def main():
+    parser = argparse.ArgumentParser(description="마이크 입력을 실시간으로 인식합니다.")
+    parser.add_argument("--low-latency", action="store_true", help="발화 중에도 임시 결과(partial)를 출력")
+    args = parser.parse_args()
+
     device = "cuda" if torch.cuda.is_available() else "cpu"
     print(f"Using device: {device}")
     
-    def transcription_callback(text):
-        print(f"Transcription: {text}")
+    def transcription_callback(text, is_final=True):
+        print(f"Transcription{'' if is_final else ' (partial)'}: {text}")
         
-    transcriber = AudioTranscriber(model_name="base")
+    transcriber = AudioTranscriber(model_name="base", low_latency=args.low_latency)
     transcriber.start_streaming(callback=transcription_callback)
     
     try: